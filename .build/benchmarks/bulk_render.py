@@ -0,0 +1,76 @@
+"""
+Measure bulk render throughput (docs per second) for one compiled template.
+
+Builds a template from the JSA sample by turning every non-blank paragraph
+and cell into a placeholder, then renders N contexts sequentially and on a
+process pool.
+
+Run from the repo root:  python .build/benchmarks/bulk_render.py
+"""
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", ".."))
+
+from tools.doc_parser.docx_patch import patch_docx  # noqa: E402
+from tools.doc_parser.docx_render import render_docx  # noqa: E402
+from tools.doc_parser.docx_stream import parse_docx_stream  # noqa: E402
+from tools.doc_parser.element_index import ElementIndex  # noqa: E402
+
+SAMPLE = "tools/doc_parser/jsa_blank.docx"
+DOCUMENTS = int(os.getenv("DOCUMENTS", "400"))
+WORKERS = int(os.getenv("WORKERS", str(os.cpu_count() or 1)))
+
+
+def build_template(dest: str) -> list:
+    structure, index_dict = parse_docx_stream(SAMPLE)
+    index = ElementIndex.from_dict(index_dict)
+    paragraph_texts = {}
+    cell_texts = {}
+    names = []
+    for i, p in enumerate(structure["paragraphs"]):
+        if not p["is_blank"]:
+            paragraph_texts[i] = f"{{{{ p_{i} }}}}"
+            names.append(f"p_{i}")
+    for t_idx, table in enumerate(structure["tables"]):
+        for r_idx, row in enumerate(table["rows"]):
+            for c_idx, cell in enumerate(row):
+                if not cell["is_blank"]:
+                    name = f"t{t_idx}_{r_idx}_{c_idx}"
+                    cell_texts[(t_idx, *index.cell_location(t_idx, r_idx, c_idx))] = f"{{{{ {name} }}}}"
+                    names.append(name)
+    patch_docx(SAMPLE, dest, index, paragraph_texts, cell_texts)
+    return names
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        template = os.path.join(tmp, "template.docx")
+        names = build_template(template)
+        contexts = [{"metadata": {name: f"site {n} {name}" for name in names}} for n in range(DOCUMENTS)]
+        print(f"template: {len(names)} placeholders, {DOCUMENTS} documents")
+
+        start = time.perf_counter()
+        render_docx(template, contexts[0])
+        print(f"first render (compile + render): {(time.perf_counter() - start) * 1000:.1f} ms")
+
+        start = time.perf_counter()
+        for context in contexts:
+            render_docx(template, context)
+        elapsed = time.perf_counter() - start
+        print(f"sequential: {DOCUMENTS / elapsed:8.1f} docs/s")
+
+        with ProcessPoolExecutor(max_workers=WORKERS) as pool:
+            # Warm every worker's template cache before timing
+            list(pool.map(render_docx, [template] * WORKERS, contexts[:WORKERS]))
+            start = time.perf_counter()
+            total = sum(len(doc) for doc in pool.map(render_docx, [template] * DOCUMENTS, contexts))
+            elapsed = time.perf_counter() - start
+        print(f"{WORKERS} processes: {DOCUMENTS / elapsed:8.1f} docs/s ({total / elapsed / 1e6:.1f} MB/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+Benchmark BM25 top-k queries over crawled chunks against an exhaustive scan.
+
+Builds ``PAGES`` synthetic regulation pages from a Zipf-distributed
+vocabulary, headed by everyday job step words and mixed with safety terms,
+chunks them with ``chunk_text``, and indexes them with ``ChunkIndex``. Each
+job step query is answered by ``ChunkIndex.search``, which stops early, and
+by a reference scorer that scores every posting. The benchmark checks that
+both return the same top-k scores and reports build, query, and
+remove/re-add timings.
+
+Run from the repo root:  python .build/benchmarks/chunk_index.py
+"""
+import heapq
+import math
+import os
+import random
+import statistics
+import sys
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", ".."))
+
+from tools.web_crawler.chunk_index import ChunkIndex, tokenize  # noqa: E402
+from tools.web_crawler.crawl_osha import chunk_text  # noqa: E402
+
+PAGES = int(os.getenv("PAGES", "6000"))
+WORDS_PER_PAGE = int(os.getenv("WORDS_PER_PAGE", "3000"))
+TOP_K = int(os.getenv("TOP_K", "5"))
+
+SAFETY_TERMS = ("ladder scaffold guardrail harness anchorage trench excavation shoring crane rigging "
+                "sling forklift respirator silica asbestos lockout tagout energized conductor welding "
+                "fall protection hazard employer employee standard inspection competent person").split()
+COMMON_WORDS = ("work install use before place move set up edge roof line water material "
+                "platform panel replace lift operate cut dust steel block").split()
+STEPS = [
+    "Set up extension ladder and climb to roof edge to install gutters",
+    "Excavate trench for water line and install shoring before entry",
+    "Rig steel beams with slings and lift into place with the crane",
+    "Cut concrete block with a masonry saw producing silica dust",
+    "Lock out and tag out the energized panel before replacing the breaker",
+    "Erect scaffold and install guardrail on the working platform",
+    "Operate forklift to move pallets of roofing material",
+    "Weld handrail brackets on the mezzanine",
+]
+
+
+def make_pages(rng):
+    # Everyday job step words sit at the head of the Zipf curve, like in real pages
+    vocabulary = COMMON_WORDS + [f"w{i}" for i in range(20000)]
+    weights = [1 / (rank + 1) for rank in range(len(vocabulary))]
+    pages = []
+    for page in range(PAGES):
+        words = rng.choices(vocabulary, weights, k=WORDS_PER_PAGE)
+        topic = rng.sample(SAFETY_TERMS, 4)
+        for _ in range(WORDS_PER_PAGE // 25):
+            words[rng.randrange(WORDS_PER_PAGE)] = rng.choice(topic)
+        pages.append((f"https://www.osha.gov/laws-regs/{page}", " ".join(words)))
+    return pages
+
+
+def exhaustive(index, query, k):
+    # Reference BM25: score every posting of every query term
+    norms = index._length_norms()
+    scores = Counter()
+    for term, weight in Counter(tokenize(query)).items():
+        df = index._df.get(term, 0)
+        if not df:
+            continue
+        idf = weight * math.log(1 + (index._live - df + 0.5) / (df + 0.5))
+        docs, tfs = index._postings[term]
+        for doc_id, tf in zip(docs, tfs):
+            if index._chunks[doc_id] is not None:
+                scores[doc_id] += idf * tf * (index.k1 + 1) / (tf + norms[doc_id])
+    return heapq.nlargest(k, scores.values())
+
+
+def timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    rng = random.Random(7)
+    pages = make_pages(rng)
+    chunks = [chunk_text(text, source_url=url) for url, text in pages]
+
+    index = ChunkIndex()
+    start = time.perf_counter()
+    for page_chunks in chunks:
+        index.add_chunks(page_chunks)
+    build_s = time.perf_counter() - start
+    stats = index.stats()
+    print(f"{stats['chunks']} chunks from {PAGES} pages, {stats['terms']} terms, "
+          f"{stats['postings']} postings ({stats['posting_bytes'] / 2 ** 20:.1f} MiB of arrays)")
+    print(f"build: {build_s:.1f} s")
+
+    mismatches = 0
+    early, full = [], []
+    for step in STEPS:
+        got = [round(score, 9) for score, _ in index.search(step, TOP_K)]
+        mismatches += got != [round(score, 9) for score in exhaustive(index, step, TOP_K)]
+        early.append(timed(lambda: index.search(step, TOP_K), 5))
+        full.append(timed(lambda: exhaustive(index, step, TOP_K), 5))
+    print(f"top-{TOP_K} per job step, median of {len(STEPS)} steps:")
+    print(f"  exhaustive scan   : {statistics.median(full):7.2f} ms")
+    print(f"  early termination : {statistics.median(early):7.2f} ms (max {max(early):.2f} ms)")
+    print(f"  identical top-{TOP_K} scores: {len(STEPS) - mismatches}/{len(STEPS)}")
+
+    recrawled = chunks[: PAGES // 10]
+    start = time.perf_counter()
+    for page_chunks in recrawled:
+        index.add_chunks(page_chunks)
+    print(f"re-add {len(recrawled)} recrawled pages (remove + add): {time.perf_counter() - start:.2f} s")
+    start = time.perf_counter()
+    for url, _ in pages[: PAGES // 3]:
+        index.remove_source(url)
+    print(f"remove {PAGES // 3} pages (includes compaction): {time.perf_counter() - start:.2f} s, "
+          f"{len(index)} chunks left")
+    mismatches = sum(
+        [round(s, 9) for s, _ in index.search(step, TOP_K)] != [round(s, 9) for s in exhaustive(index, step, TOP_K)]
+        for step in STEPS)
+    print(f"  identical top-{TOP_K} scores after removal: {len(STEPS) - mismatches}/{len(STEPS)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+Compare the memory held by cached documents as nested dicts vs ``DocumentModel``.
+
+Each sample is parsed once and then decoded ``COPIES`` times, the way the
+structure store's hot tier fills up with many uploads of similar templates.
+
+Run from the repo root:  python .build/benchmarks/doc_model_memory.py
+"""
+import glob
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", ".."))
+
+from tools.doc_parser.doc_model import DocumentModel  # noqa: E402
+from tools.doc_parser.docx_stream import parse_docx_stream  # noqa: E402
+
+COPIES = int(os.getenv("COPIES", "32"))
+SAMPLES = sorted(set(glob.glob(".build/test_data/*.docx") + glob.glob("tools/*/*.docx")))
+
+
+def measure(build):
+    tracemalloc.start()
+    start = time.perf_counter()
+    held = [build() for _ in range(COPIES)]
+    elapsed = (time.perf_counter() - start) * 1000 / COPIES
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del held
+    return size / COPIES, elapsed
+
+
+def main():
+    print(f"{'document':45} {'dict KiB':>9} {'model KiB':>10} {'ratio':>6} {'decode ms':>10} {'to_dict ms':>11}")
+    total_dict = total_model = 0
+    for path in SAMPLES:
+        payload = json.dumps(parse_docx_stream(path)[0])
+        dict_bytes, _ = measure(lambda: json.loads(payload))
+        model_bytes, decode_ms = measure(lambda: DocumentModel.from_dict(json.loads(payload)))
+
+        document = DocumentModel.from_dict(json.loads(payload))
+        start = time.perf_counter()
+        document.to_dict()
+        to_dict_ms = (time.perf_counter() - start) * 1000
+
+        total_dict += dict_bytes
+        total_model += model_bytes
+        print(f"{path:45} {dict_bytes / 1024:>9.1f} {model_bytes / 1024:>10.1f} "
+              f"{dict_bytes / model_bytes:>5.1f}x {decode_ms:>10.2f} {to_dict_ms:>11.2f}")
+
+    print(f"\nper cached copy of every sample: {total_dict / 1024:.1f} KiB as dicts, "
+          f"{total_model / 1024:.1f} KiB as DocumentModel ({total_dict / total_model:.1f}x smaller)")
+
+
+if __name__ == "__main__":
+    main()
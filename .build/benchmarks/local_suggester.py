@@ -0,0 +1,42 @@
+"""
+Count how many LLM naming calls the local suggester saves on the sample documents.
+
+Run from the repo root:  python .build/benchmarks/local_suggester.py
+"""
+import glob
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", ".."))
+
+from tools.doc_parser.doc_model import DocumentModel  # noqa: E402
+from tools.doc_parser.docx_stream import parse_docx_stream  # noqa: E402
+from tools.variable_names import suggest_structure_names  # noqa: E402
+
+THRESHOLD = float(os.getenv("LOCAL_SUGGESTION_MIN_CONFIDENCE", "0.75"))
+SAMPLES = sorted(set(glob.glob(".build/test_data/*.docx") + glob.glob("tools/*/*.docx")))
+
+
+def main():
+    print(f"{'document':45} {'fields':>6} {'local':>6} {'llm':>5} {'saved':>6} {'ms':>7}")
+    total_fields = total_local = 0
+    for path in SAMPLES:
+        document = DocumentModel.from_dict(*parse_docx_stream(path))
+        start = time.perf_counter()
+        suggestions = suggest_structure_names(document)
+        elapsed = (time.perf_counter() - start) * 1000
+        local = sum(1 for s in suggestions if s["confidence"] >= THRESHOLD)
+        fields = len(suggestions)
+        total_fields += fields
+        total_local += local
+        saved = f"{local / fields:.0%}" if fields else "-"
+        print(f"{path:45} {fields:>6} {local:>6} {fields - local:>5} {saved:>6} {elapsed:>7.2f}")
+
+    # With POST /suggest every field is one LLM call, so each local answer saves one
+    print(f"\nper-field LLM calls: {total_fields} -> {total_fields - total_local} "
+          f"({total_local} saved at confidence >= {THRESHOLD})")
+
+
+if __name__ == "__main__":
+    main()
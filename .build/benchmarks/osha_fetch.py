@@ -0,0 +1,75 @@
+"""
+Compare serial fetch+extract with the concurrent page fetcher against local stub servers.
+
+``HOSTS`` stub servers (one per port, so each counts as its own host) serve
+generated regulation-style pages after ``LATENCY`` seconds. ``PAGES`` URLs are
+spread over them, plus a 404 and an unreachable port to exercise failures.
+
+Run from the repo root:  python .build/benchmarks/osha_fetch.py
+"""
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", ".."))
+
+from trafilatura import extract, fetch_url  # noqa: E402
+
+from tools.web_crawler.page_fetcher import PageFetcher, fetch_plain_texts  # noqa: E402
+
+HOSTS = int(os.getenv("HOSTS", "3"))
+PAGES = int(os.getenv("PAGES", "30"))
+LATENCY = float(os.getenv("LATENCY", "0.2"))
+
+PARAGRAPH = ("Employers must provide fall protection for each employee on a walking or working "
+             "surface with an unprotected side or edge six feet or more above a lower level. ")
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        time.sleep(LATENCY)
+        if self.path.startswith("/missing"):
+            self.send_error(404)
+            return
+        body = ("<html><head><title>1926.501 Duty to have fall protection</title></head><body>"
+                "<nav>Home | Regulations</nav><article><h1>Standard " + self.path + "</h1>"
+                + "".join(f"<p>{PARAGRAPH * 4}({i})</p>" for i in range(40))
+                + "</article><footer>OSHA</footer></body></html>").encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def main():
+    servers = [ThreadingHTTPServer(("127.0.0.1", 0), StubHandler) for _ in range(HOSTS)]
+    for server in servers:
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+    urls = [f"http://127.0.0.1:{servers[i % HOSTS].server_port}/page/{i}" for i in range(PAGES)]
+    urls += [f"http://127.0.0.1:{servers[0].server_port}/missing", "http://127.0.0.1:9/closed"]
+
+    start = time.perf_counter()
+    serial = [extract(fetch_url(url), output_format="json", include_comments=False) for url in urls]
+    serial_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    concurrent = fetch_plain_texts(urls, PageFetcher(per_host_delay=0.05))
+    concurrent_s = time.perf_counter() - start
+
+    same = sum(a == b for a, b in zip(serial, concurrent))
+    print(f"{len(urls)} urls over {HOSTS} hosts, {LATENCY * 1000:.0f} ms latency")
+    print(f"serial fetch_url + extract : {serial_s:6.2f} s")
+    print(f"PageFetcher + process pool : {concurrent_s:6.2f} s (includes pool start-up)")
+    print(f"identical results          : {same}/{len(urls)}, failures {concurrent.count(None)}")
+    for server in servers:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
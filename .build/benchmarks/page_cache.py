@@ -0,0 +1,124 @@
+"""
+Measure repeat crawls with the revalidating page cache against local stub servers.
+
+The stub servers answer conditional requests with 304 when the ETag matches.
+A quarter of the pages carry Last-Modified only, and ``CHANGED`` pages get a
+new body between crawls. The benchmark runs a cold crawl, a revalidating
+crawl, and an offline crawl, and reports wall time, body bytes transferred
+and extractions run for each.
+
+Run from the repo root:  python .build/benchmarks/page_cache.py
+"""
+import hashlib
+import os
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", ".."))
+
+from tools.web_crawler import page_fetcher  # noqa: E402
+from tools.web_crawler.page_cache import PageCache  # noqa: E402
+from tools.web_crawler.page_fetcher import PageFetcher, extract_page, fetch_plain_texts  # noqa: E402
+
+HOSTS = int(os.getenv("HOSTS", "3"))
+PAGES = int(os.getenv("PAGES", "30"))
+CHANGED = int(os.getenv("CHANGED", "3"))
+LATENCY = float(os.getenv("LATENCY", "0.2"))
+
+PARAGRAPH = ("Employers must provide fall protection for each employee on a walking or working "
+             "surface with an unprotected side or edge six feet or more above a lower level. ")
+LAST_MODIFIED = "Mon, 06 Jan 2025 00:00:00 GMT"
+
+revision = {"n": 0}
+sent_bytes = {"n": 0}
+extractions = {"n": 0}
+
+
+def page_body(path):
+    page = int(path.rsplit("/", 1)[1])
+    version = revision["n"] if page < CHANGED else 0
+    return ("<html><head><title>1926.501 Duty to have fall protection</title></head><body>"
+            "<article><h1>Standard " + path + f" rev {version}</h1>"
+            + "".join(f"<p>{PARAGRAPH * 4}({i})</p>" for i in range(40))
+            + "</article></body></html>").encode("utf-8")
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        time.sleep(LATENCY)
+        body = page_body(self.path)
+        etag = '"' + hashlib.md5(body).hexdigest() + '"'
+        page = int(self.path.rsplit("/", 1)[1])
+        uses_etag = page % 4 != 0
+        if uses_etag and self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+        modified = revision["n"] > 0 and page < CHANGED
+        if not uses_etag and not modified and self.headers.get("If-Modified-Since") == LAST_MODIFIED:
+            self.send_response(304)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        if uses_etag:
+            self.send_header("ETag", etag)
+        else:
+            self.send_header("Last-Modified", LAST_MODIFIED)
+        self.end_headers()
+        self.wfile.write(body)
+        sent_bytes["n"] += len(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def counting_extract(html):
+    extractions["n"] += 1
+    return extract_page(html)
+
+
+def crawl(label, urls, fetcher):
+    sent_bytes["n"] = extractions["n"] = 0
+    start = time.perf_counter()
+    texts = fetch_plain_texts(urls, fetcher)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<26}: {elapsed:6.2f} s, {sent_bytes['n'] / 1024:8.0f} KiB sent, "
+          f"{extractions['n']:3d} extractions, {sum(t is not None for t in texts)}/{len(urls)} pages")
+    return texts
+
+
+def main():
+    servers = [ThreadingHTTPServer(("127.0.0.1", 0), StubHandler) for _ in range(HOSTS)]
+    for server in servers:
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+    urls = [f"http://127.0.0.1:{servers[i % HOSTS].server_port}/page/{i}" for i in range(PAGES)]
+
+    # Extract in threads so the counter sees every call; a process pool would hide them
+    page_fetcher.ProcessPoolExecutor = ThreadPoolExecutor
+    page_fetcher.extract_page = counting_extract
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = PageCache(os.path.join(tmp, "pages.sqlite3"))
+        print(f"{PAGES} pages over {HOSTS} hosts, {LATENCY * 1000:.0f} ms latency, {CHANGED} change between crawls")
+        crawl("no cache", urls, PageFetcher(per_host_delay=0.05))
+        cold = crawl("cold cache", urls, PageFetcher(per_host_delay=0.05, cache=cache))
+        revision["n"] = 1
+        warm = crawl("revalidating crawl", urls, PageFetcher(per_host_delay=0.05, cache=cache))
+        offline = crawl("offline crawl", urls, PageFetcher(cache=cache, offline=True))
+        print(f"unchanged pages identical : {sum(a == b for a, b in zip(cold[CHANGED:], warm[CHANGED:]))}"
+              f"/{PAGES - CHANGED}, offline matches revalidated: {offline == warm}")
+        stats = cache.stats()
+        print(f"cache: {stats['pages']} pages, {stats['bodies']} bodies, "
+              f"{stats['stored_bytes'] / 1024:.0f} KiB compressed")
+    for server in servers:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Compare append latency of the legacy JSON input file and the SQLite input store.
+
+Both stores are filled with ``ENTRIES`` hazards, then ``APPENDS`` more are
+timed one call at a time. The JSON path re-creates the old behaviour: load the
+whole file, append, rewrite it with ``indent=2``.
+
+Run from the repo root:  python .build/benchmarks/template_input_append.py
+"""
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", ".."))
+
+from tools.sqlite_wal import wal_connection  # noqa: E402
+from tools.template_input_store import APPEND_ENTRY, TemplateInputStore  # noqa: E402
+from tools.user_input_jinja import default_template_payload, force_template_payload_format  # noqa: E402
+
+ENTRIES = int(os.getenv("ENTRIES", "10000"))
+APPENDS = int(os.getenv("APPENDS", "200"))
+
+
+def json_append(path: str, entry: str) -> list:
+    with open(path, "r", encoding="utf-8") as f:
+        data = force_template_payload_format(json.load(f))
+    data["hazards"].append(entry)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(force_template_payload_format(data), f, indent=2)
+    return data["hazards"]
+
+
+def timed(append) -> list:
+    samples = []
+    for i in range(APPENDS):
+        start = time.perf_counter()
+        append(f"appended hazard {i}: falling objects near the excavation edge")
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def report(name: str, samples: list) -> None:
+    samples = sorted(samples)
+    print(f"{name:22} median {statistics.median(samples):7.2f} ms   "
+          f"p95 {samples[int(len(samples) * 0.95)]:7.2f} ms")
+
+
+def main():
+    hazards = [f"hazard {i}: struck by equipment while moving materials" for i in range(ENTRIES)]
+    with tempfile.TemporaryDirectory() as tmp:
+        json_path = os.path.join(tmp, "template_input.json")
+        payload = default_template_payload()
+        payload["hazards"] = list(hazards)
+        with open(json_path, "w", encoding="utf-8") as f:
+            json.dump(payload, f, indent=2)
+
+        store = TemplateInputStore(os.path.join(tmp, "template_input.sqlite3"))
+        store.replace({"hazards": hazards})
+
+        print(f"{ENTRIES} existing entries, {APPENDS} timed appends")
+        report("json rewrite", timed(lambda entry: json_append(json_path, entry)))
+        report("sqlite append", timed(lambda entry: store.append("hazards", entry)))
+
+        # The insert alone, without returning the updated section
+        def insert_only(entry):
+            with wal_connection(store.path) as conn:
+                conn.execute(APPEND_ENTRY, ("hazards", json.dumps(entry), "hazards"))
+
+        report("sqlite insert only", timed(insert_only))
+
+if __name__ == "__main__":
+    main()
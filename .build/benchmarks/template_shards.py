@@ -0,0 +1,61 @@
+"""
+Measure template write throughput when writers share one project vs use their own.
+
+``WRITERS`` processes each append ``APPENDS`` steps, first all to the same
+project, then each to a project of its own. Every process opens the stores
+the way a uvicorn worker would.
+
+Run from the repo root:  python .build/benchmarks/template_shards.py
+"""
+import os
+import sys
+import tempfile
+import time
+from multiprocessing import get_context
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", ".."))
+
+WRITERS = int(os.getenv("WRITERS", "4"))
+APPENDS = int(os.getenv("APPENDS", "500"))
+
+
+def write(project_id: str) -> None:
+    from tools.sqlite_wal import wal_connection  # noqa: E402
+    from tools.template_input_store import APPEND_ENTRY  # noqa: E402
+    from tools.user_input_jinja import get_template_input_store  # noqa: E402
+
+    store = get_template_input_store(project_id)
+    for i in range(APPENDS):
+        # The insert alone, so the figure is not dominated by returning the section
+        with wal_connection(store.path) as conn:
+            conn.execute(APPEND_ENTRY, ("steps", f'"step {i}"', "steps"))
+
+
+def run(projects) -> float:
+    pool = get_context("spawn").Pool(len(projects))
+    # Open every store before timing
+    pool.map(write_warm, projects)
+    start = time.perf_counter()
+    pool.map(write, projects)
+    elapsed = time.perf_counter() - start
+    pool.close()
+    pool.join()
+    return len(projects) * APPENDS / elapsed
+
+
+def write_warm(project_id: str) -> None:
+    from tools.user_input_jinja import get_template_input_store  # noqa: E402
+    get_template_input_store(project_id)
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["TEMPLATE_INPUT_DB"] = os.path.join(tmp, "default.sqlite3")
+        os.environ["TEMPLATE_INPUT_SHARD_DIR"] = os.path.join(tmp, "shards")
+        print(f"{WRITERS} writer processes x {APPENDS} appends, {os.cpu_count()} CPUs")
+        print(f"one project each   : {run([f'p{i}' for i in range(WRITERS)]):8.0f} appends/s")
+        print(f"one shared project : {run(['shared'] * WRITERS):8.0f} appends/s")
+
+
+if __name__ == "__main__":
+    main()
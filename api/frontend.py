@@ -1,19 +1,77 @@
 import os
 import uuid
+import asyncio
 import json
-from typing import List, Dict, Any, Optional
-from fastapi import FastAPI, UploadFile, File, HTTPException
+import time
+import zipfile
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import List, Dict, Any, Optional, Tuple
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, Response, StreamingResponse
 from pydantic import BaseModel
+import jinja2
 from docx import Document
-import openai
 from dotenv import load_dotenv
 
+from api.openai_client import openai_client_from_env
+from api.parse_cache import ParseCache, link_or_copy
+from api.structure_store import structure_store_from_env
+from api.suggestion_cache import SuggestionCache
+from api.upload_stream import receive_docx_upload
+from api.worker_pool import PoolSaturatedError, worker_pool_from_env
+from tools.doc_parser.doc_model import DocumentModel, Table
+from tools.doc_parser.docx_patch import RowLoop, patch_docx
+from tools.doc_parser.docx_render import check_template, render_docx, template_cache
+from tools.doc_parser.docx_stream import parse_docx_stream
+from tools.doc_parser.element_index import CellLocation, ElementIndex, TableIndex, parse_element_id
+from tools.user_input_jinja import (
+    DEFAULT_PROJECT_ID,
+    PROJECT_ID_PATTERN,
+    build_template_context,
+    table_row_field,
+    template_context_from_payload,
+)
+from tools.variable_names import suggest_name, suggest_structure_names, table_header_row
+
 load_dotenv(os.path.join(os.path.dirname(__file__), "..", "config", ".env"))
 
-app = FastAPI()
+# CPU-bound document work (parse, load, save) runs here, off the event loop
+doc_pool = worker_pool_from_env()
+
+# Bulk renders fan out over processes so Jinja evaluation isn't bound by the GIL
+render_pool = worker_pool_from_env("RENDER_POOL", default_kind="process")
+# One slot per running or queued render_pool task, so bulk renders wait for room; set in lifespan
+render_slots: Optional[asyncio.Semaphore] = None
+MAX_BULK_RENDER = int(os.getenv("MAX_BULK_RENDER", "1000"))
+bulk_render_counts = {"documents": 0, "failed": 0, "seconds": 0.0, "last_docs_per_second": 0.0}
+
+# One pooled async OpenAI client shared by all suggestion requests
+openai_clients = openai_client_from_env()
+
+SUGGESTION_MODEL = os.getenv("SUGGESTION_MODEL", "gpt-4o")
+
+# Local names at or above this confidence are returned without asking the LLM
+LOCAL_SUGGESTION_MIN_CONFIDENCE = float(os.getenv("LOCAL_SUGGESTION_MIN_CONFIDENCE", "0.75"))
+# Fields answered by the local suggester vs. forwarded to the LLM
+local_suggestion_counts = {"local": 0, "llm": 0}
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global render_slots
+    openai_clients.start()
+    # Bound to the running loop, so made here rather than at import
+    render_slots = asyncio.Semaphore(render_pool.max_workers + render_pool.max_queue)
+    yield
+    await openai_clients.close()
+    doc_pool.shutdown()
+    render_pool.shutdown()
+
+
+app = FastAPI(lifespan=lifespan)
 
 # Enable CORS for frontend interaction
 # In production, replace ["*"] with specific origins
@@ -24,12 +82,36 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# In-memory storage for document structures (cleared on restart)
-document_structures: Dict[str, Dict[str, Any]] = {}
-
 UPLOAD_DIR = "api/uploads"
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 
+DOCX_MEDIA_TYPE = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+# Written by /process, filled by /render
+TEMPLATE_PATH = os.path.join(os.path.dirname(__file__), "..", "data", "doc_template.docx")
+
+# Document structures shared by all workers, with a small hot tier per worker
+structure_store = structure_store_from_env(UPLOAD_DIR)
+
+# Uploads are parsed from the request stream and written to disk as they arrive
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(50 * 1024 * 1024)))
+
+# Bump whenever parse output changes so cached structures are invalidated.
+PARSER_VERSION = "2"
+
+# Content-addressed cache so re-uploads of the same template skip parsing
+parse_cache = ParseCache(
+    os.path.join(UPLOAD_DIR, "parse_cache"),
+    version=PARSER_VERSION,
+    max_entries=int(os.getenv("PARSE_CACHE_MAX_ENTRIES", "256")),
+)
+
+# Variable-name suggestions keyed on normalized text, shared across workers
+suggestion_cache = SuggestionCache(
+    os.path.join(UPLOAD_DIR, "suggestions.sqlite3"),
+    ttl_seconds=float(os.getenv("SUGGESTION_CACHE_TTL", str(30 * 24 * 3600))),
+    max_entries=int(os.getenv("SUGGESTION_CACHE_MAX_ENTRIES", "10000")),
+)
+
 
 class Selection(BaseModel):
     id: str  # e.g., "p_0", "t_0_r_1_c_2", or "t_0_col_2"
@@ -80,12 +162,17 @@ def extract_checkboxes(text: str) -> bool:
     return False
 
 
-def parse_docx(filepath: str) -> Dict[str, Any]:
+def parse_docx(filepath: str) -> Tuple[Dict[str, Any], Dict[str, Any]]:
     doc = Document(filepath)
+    # Record where each element sits under w:body for the element index
+    body_positions = {child: pos for pos, child in enumerate(doc.element.body)}
+
     paragraphs = []
+    paragraph_positions = []
     for i, p in enumerate(doc.paragraphs):
         text = p.text
         has_checkbox = extract_checkboxes(text)
+        paragraph_positions.append(body_positions[p._p])
         paragraphs.append({
             "id": f"p_{i}",
             "text": text,
@@ -97,13 +184,23 @@ def parse_docx(filepath: str) -> Dict[str, Any]:
         })
 
     tables = []
+    table_positions = []
+    cell_locations = []
     for i, t in enumerate(doc.tables):
+        tc_locations = {
+            tc: (r_idx, tc_idx)
+            for r_idx, tr in enumerate(t._tbl.tr_lst)
+            for tc_idx, tc in enumerate(tr.tc_lst)
+        }
         rows = []
+        row_locations = []
         for r_idx, row in enumerate(t.rows):
             cells = []
+            locations = []
             for c_idx, cell in enumerate(row.cells):
                 text = cell.text
                 has_checkbox = extract_checkboxes(text)
+                locations.append(tc_locations[cell._tc])
 
                 # We need cell paragraphs formatting as well
                 cell_paragraphs = []
@@ -123,87 +220,310 @@ def parse_docx(filepath: str) -> Dict[str, Any]:
                     "is_blank": not text.strip()
                 })
             rows.append(cells)
+            row_locations.append(locations)
         tables.append({
             "id": f"t_{i}",
             "rows": rows,
             "num_columns": len(t.columns)
         })
+        table_positions.append(body_positions[t._tbl])
+        cell_locations.append(row_locations)
 
-    return {"paragraphs": paragraphs, "tables": tables}
+    structure = {"paragraphs": paragraphs, "tables": tables}
+    index = ElementIndex.from_parse(structure, paragraph_positions, table_positions, cell_locations)
+    return structure, index.to_dict()
 
 
-@app.post("/upload")
-async def upload_document(file: UploadFile = File(...)):
-    if not file.filename.endswith(".docx"):
+async def run_document_task(fn, *args):
+    """Run document CPU work on ``doc_pool``, answering 503 when it is saturated."""
+    try:
+        return await doc_pool.run(fn, *args)
+    except PoolSaturatedError:
         raise HTTPException(
-            status_code=400, detail="Only .docx files are supported")
+            status_code=503,
+            detail="Document workers are busy, please retry shortly",
+            headers={"Retry-After": "1"})
+
+
+# Structure extractors selectable per upload via the ``engine`` query param.
+# "docx" walks the python-docx object model, "stream" iterparses document.xml.
+# Both return ``(structure, element_index_dict)``.
+PARSE_ENGINES = {
+    "docx": parse_docx,
+    "stream": parse_docx_stream,
+}
+
+
+def restore_cached_parse(content_hash: str, filepath: str) -> Optional[Tuple[Dict[str, Any], Dict[str, Any]]]:
+    """Return the cached ``(structure, index)`` for an upload, linking its stored copy to ``filepath``."""
+    cached = parse_cache.get(content_hash)
+    if cached is not None:
+        # Share the stored copy instead of keeping a duplicate on disk
+        try:
+            parse_cache.restore(content_hash, filepath)
+        except FileNotFoundError:
+            # Evicted by another upload since the lookup; the upload itself is untouched
+            return None
+    return cached
+
+
+def store_document(doc_id: str, structure: Dict[str, Any], index: Dict[str, Any]) -> None:
+    # Store structure and element index so any worker can serve the follow-up requests
+    structure_store.put(doc_id, DocumentModel.from_dict(structure, index))
+
+
+# The body is read by receive_docx_upload, so describe the form for the OpenAPI schema here
+UPLOAD_REQUEST_BODY = {
+    "required": True,
+    "content": {"multipart/form-data": {"schema": {
+        "type": "object",
+        "properties": {"file": {"type": "string", "format": "binary"}},
+        "required": ["file"],
+    }}},
+}
+
+
+@app.post("/upload", openapi_extra={"requestBody": UPLOAD_REQUEST_BODY})
+async def upload_document(request: Request, engine: str = "docx"):
+    """
+    Store an uploaded ``.docx`` (form field ``file``) and return its parsed structure.
+
+    The body is streamed to disk by ``receive_docx_upload``, which rejects an
+    oversized, misnamed or non-zip upload before reading the rest of it.
+    """
+    if engine not in PARSE_ENGINES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown parse engine. Supported values are {sorted(PARSE_ENGINES)}.")
 
     doc_id = str(uuid.uuid4())
     filepath = os.path.join(UPLOAD_DIR, f"{doc_id}.docx")
 
-    with open(filepath, "wb") as buffer:
-        buffer.write(await file.read())
+    # Hash the bytes as they are written so the parse cache can be consulted
+    _, content_hash = await receive_docx_upload(request, "file", filepath, MAX_UPLOAD_BYTES)
 
-    structure = parse_docx(filepath)
+    # Cache and store calls do SQLite, JSON and file work, so they run in a thread
+    cached = await asyncio.to_thread(restore_cached_parse, content_hash, filepath)
+    if cached is None:
+        structure, index = await run_document_task(PARSE_ENGINES[engine], filepath)
+        await asyncio.to_thread(parse_cache.put, content_hash, filepath, structure, index)
+    else:
+        structure, index = cached
 
-    # Store structure in memory
-    document_structures[doc_id] = structure
+    await asyncio.to_thread(store_document, doc_id, structure, index)
 
     return {"doc_id": doc_id, "structure": structure}
 
 
 @app.get("/suggest/{doc_id}")
 async def suggest_regions(doc_id: str):
-    if doc_id not in document_structures:
+    # A hot tier miss reads SQLite and decodes JSON, so store lookups run in a thread
+    document = await asyncio.to_thread(structure_store.get, doc_id)
+    if document is None:
         raise HTTPException(status_code=404, detail="Document not found")
 
-    structure = document_structures[doc_id]
+    # Name what we can locally; only uncertain fields are worth an LLM call
+    local = await asyncio.to_thread(suggest_structure_names, document)
+    confident = {s["id"] for s in local if s["confidence"] >= LOCAL_SUGGESTION_MIN_CONFIDENCE}
+
+    client = openai_clients.client
+    if client is None:
+        # No model configured: every field falls back to its local name
+        local_suggestion_counts["local"] += len(local)
+        return {"suggestions": [
+            {"id": s["id"], "suggested_name": s["suggested_name"]} for s in local]}
+
+    local_suggestions = [
+        {"id": s["id"], "suggested_name": s["suggested_name"]} for s in local if s["id"] in confident]
+    local_suggestion_counts["local"] += len(local_suggestions)
 
     # Filter the structure to only include areas WITH text (non-blank) to suggest variable names
     # Note: the user asked to ONLY add suggestions to areas that HAVE TEXT on the document.
-    non_blank_paragraphs = [p for p in structure.get(
-        'paragraphs', []) if not p.get('is_blank', True)]
+    non_blank_paragraphs = [{"id": p_id, "text": p.text} for p_id, p in document.iter_paragraphs()
+                            if not p.is_blank and p_id not in confident]
     non_blank_tables = []
-    for t in structure.get('tables', []):
+    for t_idx, t in enumerate(document.tables):
         non_blank_rows = []
-        for row in t.get('rows', []):
-            non_blank_cells = [c for c in row if not c.get('is_blank', True)]
+        header = None
+        for r_idx, row in enumerate(t.rows):
+            if header is None and any(not c.is_blank for c in row):
+                header = [c.text for c in row]
+            non_blank_cells = []
+            for c_idx, c in enumerate(row):
+                cell_id = f"t_{t_idx}_r_{r_idx}_c_{c_idx}"
+                if not c.is_blank and cell_id not in confident:
+                    non_blank_cells.append({"id": cell_id, "text": c.text})
             if non_blank_cells:
                 non_blank_rows.append(non_blank_cells)
         if non_blank_rows:
-            non_blank_tables.append({"id": t['id'], "rows": non_blank_rows})
-
-    filtered_structure = {
-        "paragraphs": non_blank_paragraphs, "tables": non_blank_tables}
-
-    # Prepare prompt for OpenAI
+            non_blank_tables.append({"id": f"t_{t_idx}", "header": header, "rows": non_blank_rows})
+
+    if not non_blank_paragraphs and not non_blank_tables:
+        return {"suggestions": local_suggestions}
+    local_suggestion_counts["llm"] += len(local) - len(local_suggestions)
+
+    # Split into token-budgeted chunks and name them concurrently, so large
+    # documents get full coverage instead of being cut off
+    chunks = chunk_structure(non_blank_paragraphs, non_blank_tables)
+    limiter = asyncio.Semaphore(SUGGESTION_BATCH_CONCURRENCY)
+
+    async def suggest_chunk(chunk: Dict[str, Any]) -> List[Dict[str, Any]]:
+        async with limiter:
+            return await generate_region_suggestions(client, chunk)
+
+    outcomes = await asyncio.gather(*(suggest_chunk(c) for c in chunks), return_exceptions=True)
+
+    merged = {s["id"]: s for s in local_suggestions}
+    errors = []
+    for outcome in outcomes:
+        if isinstance(outcome, Exception):
+            errors.append(str(outcome))
+            continue
+        for suggestion in outcome:
+            if isinstance(suggestion, dict) and suggestion.get("id") not in merged:
+                merged[suggestion["id"]] = suggestion
+
+    response = {"suggestions": list(merged.values())}
+    if errors:
+        response["error"] = "; ".join(errors)
+    return response
+
+
+def chunk_structure(paragraphs: List[Dict[str, Any]], tables: List[Dict[str, Any]],
+                    budget: int = None) -> List[Dict[str, Any]]:
+    """
+    Split a filtered structure into chunks whose estimated prompt size fits ``budget``.
+
+    Chunks break only between paragraphs or between table rows. A table split
+    across chunks repeats its header row in each piece so every chunk keeps
+    the column context the model needs.
+    """
+    budget = budget or SUGGESTION_CHUNK_TOKEN_BUDGET
+    chunks = []
+    current = {"paragraphs": [], "tables": []}
+    used = 0
+
+    def flush() -> None:
+        nonlocal current, used
+        if used:
+            chunks.append(current)
+        current = {"paragraphs": [], "tables": []}
+        used = 0
+
+    for p in paragraphs:
+        cost = estimate_tokens(json.dumps(p))
+        if used and used + cost > budget:
+            flush()
+        current["paragraphs"].append(p)
+        used += cost
+
+    for t in tables:
+        header_cost = estimate_tokens(json.dumps(t["header"]))
+        piece = None
+        for row in t["rows"]:
+            cost = estimate_tokens(json.dumps(row))
+            if piece is not None and used + cost > budget:
+                flush()
+                piece = None
+            if piece is None:
+                if used and used + header_cost + cost > budget:
+                    flush()
+                piece = {"id": t["id"], "header": t["header"], "rows": []}
+                current["tables"].append(piece)
+                used += header_cost
+            piece["rows"].append(row)
+            used += cost
+
+    flush()
+    return chunks
+
+
+async def generate_region_suggestions(client, chunk: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Ask the model to name the fields in one structure chunk."""
     prompt_content = "Identify potential fillable fields in this Word document structure. ONLY CONSIDER THE PROVIDED TEXT (WHICH IS NON-BLANK). "
     prompt_content += "Suggest a clean, snake_case variable name based on the content of the field itself and its surrounding context (e.g. headers). "
+    prompt_content += "Each table's 'header' lists its first row's text as context only; name the cells listed in 'rows'. "
     prompt_content += "Return a JSON object with a key 'suggestions' which is a list of objects with 'id' (the identifier from the structure) and 'suggested_name'.\n\n"
-    prompt_content += json.dumps(filtered_structure)[:8000]
+    prompt_content += json.dumps(chunk)
 
-    api_key = os.getenv("OPEN_AI_KEY") or os.getenv("OPENAI_API_KEY")
-    client = openai.OpenAI(api_key=api_key)
-
-    try:
-        response = client.chat.completions.create(
-            model="gpt-4o",
-            messages=[
-                {"role": "system", "content": "You are a document analysis assistant. Return only valid JSON."},
-                {"role": "user", "content": prompt_content}
-            ],
-            response_format={"type": "json_object"}
-        )
-        suggestions = json.loads(response.choices[0].message.content)
-        return suggestions
-    except Exception as e:
-        return {"suggestions": [], "error": str(e)}
+    response = await client.chat.completions.create(
+        model=SUGGESTION_MODEL,
+        messages=[
+            {"role": "system", "content": "You are a document analysis assistant. Return only valid JSON."},
+            {"role": "user", "content": prompt_content}
+        ],
+        response_format={"type": "json_object"}
+    )
+    return json.loads(response.choices[0].message.content).get("suggestions", [])
 
 
 class SuggestionRequest(BaseModel):
     text: str
 
 
+class BatchField(BaseModel):
+    id: str
+    text: str
+
+
+class BatchSuggestionRequest(BaseModel):
+    fields: List[BatchField]
+
+
+VARIABLE_NAME_EXAMPLES = '(e.g., "project_name", "employee_id", "date_submitted", "item_description")'
+VARIABLE_NAME_GUIDANCE = "The variable name should be concise, descriptive, and represent the overall purpose of these fields."
+
+# Input-token budget per batched naming call and how many such calls run at once
+SUGGESTION_BATCH_TOKEN_BUDGET = int(os.getenv("SUGGESTION_BATCH_TOKEN_BUDGET", "3000"))
+SUGGESTION_BATCH_CONCURRENCY = int(os.getenv("SUGGESTION_BATCH_CONCURRENCY", "8"))
+# Input-token budget per chunk when naming a whole document in /suggest/{doc_id}
+SUGGESTION_CHUNK_TOKEN_BUDGET = int(os.getenv("SUGGESTION_CHUNK_TOKEN_BUDGET", "3000"))
+
+
+def estimate_tokens(text: str) -> int:
+    # Roughly four characters per token for English text, plus JSON framing
+    return len(text) // 4 + 8
+
+
+def pack_by_token_budget(texts: List[str], budget: int = None) -> List[List[str]]:
+    """Greedily group texts, in order, so each group's estimated tokens fit the budget."""
+    budget = budget or SUGGESTION_BATCH_TOKEN_BUDGET
+    batches, current, used = [], [], 0
+    for text in texts:
+        cost = estimate_tokens(text)
+        if current and used + cost > budget:
+            batches.append(current)
+            current, used = [], 0
+        current.append(text)
+        used += cost
+    if current:
+        batches.append(current)
+    return batches
+
+
+async def generate_variable_name(client, text: str) -> Tuple[Dict[str, Any], int]:
+    """Ask the model for one variable name; returns the parsed JSON and tokens used."""
+    prompt_content = f"""Based on the following text content from document fields (possibly multiple cells in a column), suggest a single clean, descriptive variable name in snake_case format that represents what ALL these fields are for.
+        
+Text content from fields:
+{text}
+
+Return a JSON object with a single key 'suggestion' containing only the variable name {VARIABLE_NAME_EXAMPLES}.
+{VARIABLE_NAME_GUIDANCE}"""
+
+    response = await client.chat.completions.create(
+        model=SUGGESTION_MODEL,
+        messages=[
+            {"role": "system", "content": "You are a variable naming assistant. Return only valid JSON with a 'suggestion' key."},
+            {"role": "user", "content": prompt_content}
+        ],
+        response_format={"type": "json_object"}
+    )
+
+    tokens = response.usage.total_tokens if response.usage else 0
+    return json.loads(response.choices[0].message.content), tokens
+
+
 @app.post("/suggest")
 async def suggest_variable_name(request: SuggestionRequest):
     """Generate a variable name suggestion based on the provided text."""
@@ -212,35 +532,195 @@ async def suggest_variable_name(request: SuggestionRequest):
     if not text:
         raise HTTPException(status_code=400, detail="Text cannot be empty")
 
-    api_key = os.getenv("OPEN_AI_KEY") or os.getenv("OPENAI_API_KEY")
-    if not api_key:
-        raise HTTPException(
-            status_code=500, detail="OpenAI API key not configured")
-
-    client = openai.OpenAI(api_key=api_key)
+    name, confidence = suggest_name(text)
+    client = openai_clients.client
+    if client is None or confidence >= LOCAL_SUGGESTION_MIN_CONFIDENCE:
+        # Trivial labels, or no model configured, are answered locally
+        local_suggestion_counts["local"] += 1
+        return {"suggestion": name}
+    local_suggestion_counts["llm"] += 1
 
     try:
-        prompt_content = f"""Based on the following text content from document fields (possibly multiple cells in a column), suggest a single clean, descriptive variable name in snake_case format that represents what ALL these fields are for.
-        
-Text content from fields:
-{text}
+        # Identical texts are served from cache or share one in-flight call
+        return await suggestion_cache.get_or_compute(
+            text, SUGGESTION_MODEL, lambda: generate_variable_name(client, text))
+    except Exception as e:
+        return {"suggestion": "", "error": str(e)}
 
-Return a JSON object with a single key 'suggestion' containing only the variable name (e.g., "project_name", "employee_id", "date_submitted", "item_description").
-The variable name should be concise, descriptive, and represent the overall purpose of these fields."""
 
-        response = client.chat.completions.create(
-            model="gpt-4o",
-            messages=[
-                {"role": "system", "content": "You are a variable naming assistant. Return only valid JSON with a 'suggestion' key."},
-                {"role": "user", "content": prompt_content}
-            ],
-            response_format={"type": "json_object"}
-        )
+async def generate_variable_names(client, texts: List[str]) -> Tuple[Dict[str, Dict[str, Any]], int]:
+    """
+    Name several independent fields with one model call.
+
+    Uses the same instructions as ``generate_variable_name`` applied to each
+    keyed field, and returns per-text results in the single-field shape.
+    """
+    keyed = {f"f{i}": text for i, text in enumerate(texts)}
+    prompt_content = f"""Each entry in the following JSON object is the text content of one document field (possibly multiple cells in a column). For EACH entry independently, suggest a single clean, descriptive variable name in snake_case format that represents what that field is for.
+
+Fields:
+{json.dumps(keyed, ensure_ascii=False)}
+
+Return a JSON object with a single key 'suggestions' mapping every field key (e.g., "f0") to only its variable name {VARIABLE_NAME_EXAMPLES}.
+{VARIABLE_NAME_GUIDANCE}"""
+
+    response = await client.chat.completions.create(
+        model=SUGGESTION_MODEL,
+        messages=[
+            {"role": "system", "content": "You are a variable naming assistant. Return only valid JSON with a 'suggestions' key."},
+            {"role": "user", "content": prompt_content}
+        ],
+        response_format={"type": "json_object"}
+    )
+
+    tokens = response.usage.total_tokens if response.usage else 0
+    names = json.loads(response.choices[0].message.content).get("suggestions", {})
+    results = {}
+    for field_key, text in keyed.items():
+        name = names.get(field_key) if isinstance(names, dict) else None
+        if isinstance(name, str) and name:
+            results[text] = {"suggestion": name}
+    return results, tokens
+
+
+@app.post("/suggest/batch")
+async def suggest_variable_names_batch(request: BatchSuggestionRequest):
+    """
+    Suggest variable names for many fields in one request.
+
+    Identical texts are named once, confident local names and cached names are
+    reused, and the rest are packed into as few model calls as the token
+    budget allows, which run concurrently. Each result has the same shape as
+    ``POST /suggest``.
+    """
+    client = openai_clients.client
+
+    # One representative text per cache key, so duplicates are named once
+    unique_texts = {}
+    field_texts = []
+    for field in request.fields:
+        text = field.text.strip()
+        if not text:
+            raise HTTPException(status_code=400, detail=f"Text cannot be empty (field {field.id})")
+        key = suggestion_cache.key(text, SUGGESTION_MODEL)
+        unique_texts.setdefault(key, text)
+        field_texts.append((field.id, unique_texts[key]))
+
+    # Confident local names (or all of them, without a model) skip the LLM
+    results = {}
+    for text in unique_texts.values():
+        name, confidence = suggest_name(text)
+        if client is None or confidence >= LOCAL_SUGGESTION_MIN_CONFIDENCE:
+            results[text] = {"suggestion": name}
+    remote_texts = [text for text in unique_texts.values() if text not in results]
+    local_suggestion_counts["local"] += len(results)
+    local_suggestion_counts["llm"] += len(remote_texts)
+
+    limiter = asyncio.Semaphore(SUGGESTION_BATCH_CONCURRENCY)
+
+    async def compute_batch(texts: List[str]):
+        async with limiter:
+            return await generate_variable_names(client, texts)
+
+    results.update(await suggestion_cache.get_or_compute_many(
+        remote_texts, SUGGESTION_MODEL, compute_batch, pack_by_token_budget))
+
+    return {"suggestions": [{"id": field_id, **results[text]} for field_id, text in field_texts]}
+
+
+def table_data_rows(table: Table, table_index: TableIndex, start: int) -> List[int]:
+    """
+    Return the rows of a table that a ``table_rows`` loop replaces.
+
+    The data rows are the run of rows from ``start`` that share its cell
+    layout, up to the last blank one. Rows after that run, such as a merged
+    signature row or a filled-in totals row, stay in the document.
+    """
+    def layout(r_idx: int) -> Tuple[CellLocation, ...]:
+        # Relative to the row, so two rows with the same merges compare equal
+        return tuple((tr - r_idx, tc) for tr, tc in table_index.cells[r_idx])
+
+    rows = []
+    for r_idx in range(start, table_index.num_rows):
+        if layout(r_idx) != layout(start):
+            break
+        rows.append(r_idx)
+    blank = [r_idx for r_idx in rows if r_idx < len(table.rows) and all(c.is_blank for c in table.rows[r_idx])]
+    return rows[:rows.index(blank[-1]) + 1] if blank else rows
+
+
+def apply_selections(doc_path: str, output_paths: List[str], index: ElementIndex,
+                     selections: List[Selection], column_fields: Dict[str, str],
+                     column_cells: Dict[str, str], cell_overrides: Dict[str, str],
+                     data_rows: Dict[int, List[int]]) -> None:
+    """
+    Write Jinja placeholders for the selections into the document and save it to each output path.
+
+    Only the selected ``w:p``/``w:tc`` nodes of ``word/document.xml`` are
+    rewritten, keeping their first run's formatting; every other archive
+    member is copied as-is. The document is written once and the remaining
+    output paths are linked to (or copied from) the first.
+
+    Column selections in ``column_fields`` turn a table's data rows into a
+    single ``{%tr for row in table_rows %}`` row whose selected cells read
+    ``row["<key>"]``, with ``column_fields`` mapping each column id to its
+    key. ``data_rows`` gives the rows of each table the loop replaces, see
+    ``table_data_rows``; rows with an individually assigned cell in a
+    selected column are kept as they are, and so is a table none of whose
+    selected columns exist. ``column_cells`` maps cell ids of columns that
+    are not looped to the placeholder name of each cell.
+    """
+    paragraph_texts: Dict[int, str] = {}
+    cell_texts: Dict[Tuple[int, int, int], str] = {}
+
+    def set_cell(t_idx: int, r_idx: int, c_idx: int, text: str) -> bool:
+        # Merged grid cells share one w:tc, so key by its location
+        location = index.cell_location(t_idx, r_idx, c_idx)
+        if location is None:
+            return False
+        cell_texts[(t_idx, *location)] = text
+        return True
+
+    # First, handle columns: one looped row per table
+    table_columns: Dict[int, List[Tuple[int, str]]] = {}
+    for column_id, field in column_fields.items():
+        t_idx, col_idx = parse_element_id(column_id)
+        table_columns.setdefault(t_idx, []).append((col_idx, field))
+
+    row_loops: Dict[int, RowLoop] = {}
+    for t_idx, columns in table_columns.items():
+        # Rows with an overridden cell in a selected column stay static
+        rows = [
+            r_idx for r_idx in data_rows.get(t_idx, [])
+            if not any(f"t_{t_idx}_r_{r_idx}_c_{col_idx}" in cell_overrides for col_idx, _ in columns)
+        ]
+        if not rows:
+            continue
+        loop_row, *repeated_rows = rows
+        placed = [set_cell(t_idx, loop_row, col_idx, f"{{{{ row[{json.dumps(field)}] }}}}")
+                  for col_idx, field in columns]
+        if any(placed):
+            row_loops[t_idx] = RowLoop(loop_row, repeated_rows)
+
+    for cell_id, name in column_cells.items():
+        set_cell(*parse_element_id(cell_id), f"{{{{ {name} }}}}")
 
-        result = json.loads(response.choices[0].message.content)
-        return result
-    except Exception as e:
-        return {"suggestion": "", "error": str(e)}
+    # Then handle individual elements
+    for selection in selections:
+        parts = parse_element_id(selection.id)
+        if parts is None or len(parts) == 2:
+            continue
+        if len(parts) == 1:
+            paragraph_texts[parts[0]] = f"{{{{ {selection.variable_name} }}}}"
+        else:
+            set_cell(*parts, f"{{{{ {selection.variable_name} }}}}")
+
+    first, *others = output_paths
+    partial = f"{first}.part"
+    patch_docx(doc_path, partial, index, paragraph_texts, cell_texts, row_loops)
+    os.replace(partial, first)
+    for output_path in others:
+        link_or_copy(first, output_path)
 
 
 @app.post("/process")
@@ -249,27 +729,20 @@ async def process_document(request: ProcessRequest):
     if not os.path.exists(doc_path):
         raise HTTPException(status_code=404, detail="Document not found")
 
-    doc = Document(doc_path)
-
     # We want a flat dictionary for data.json: { "variable_name": "description (and checkbox context)" }
     data_dict = {}
 
-    # Get structure from memory
-    if request.doc_id not in document_structures:
+    # Get structure from the shared store
+    document = await asyncio.to_thread(structure_store.get, request.doc_id)
+    if document is None:
         raise HTTPException(status_code=404, detail="Document not found")
-    
-    structure = document_structures[request.doc_id]
-    
-    # Read structure to identify checkboxes
-    checkbox_ids = set()
-    for p in structure.get("paragraphs", []):
-        if p.get("has_checkbox"):
-            checkbox_ids.add(p["id"])
-    for t in structure.get("tables", []):
-        for row in t.get("rows", []):
-            for cell in row:
-                if cell.get("has_checkbox"):
-                    checkbox_ids.add(cell["id"])
+
+    # The element index answers checkbox, row-count and location lookups
+    index = document.index
+    if index is None:
+        # Uploaded before indexes were stored; rebuild it from the file
+        _, index_dict = await run_document_task(parse_docx_stream, doc_path)
+        index = ElementIndex.from_dict(index_dict)
 
     # Collect individual cell assignments first, so they take precedence over columns
     # We'll map cell ID to its assigned variable
@@ -278,11 +751,13 @@ async def process_document(request: ProcessRequest):
 
     for selection in request.selections:
         is_checkbox = False
+        parts = parse_element_id(selection.id)
+        is_column = parts is not None and len(parts) == 2
 
         # Check if selection corresponds to a checkbox
-        if selection.id in checkbox_ids:
+        if index.is_checkbox(selection.id):
             is_checkbox = True
-        elif selection.id.startswith("t_") and "col" in selection.id:
+        elif is_column:
             # Need to check if any cell in the column has a checkbox (complex, simplify to description)
             # Actually, col selections don't map directly to a single element's checkbox flag easily.
             pass
@@ -293,75 +768,51 @@ async def process_document(request: ProcessRequest):
                 " (Field is a checkbox)" if context_val else "Field is a checkbox"
 
         # Determine behavior based on selection type
-        if selection.id.startswith("t_") and "col" in selection.id:
+        if is_column:
             col_assignments.append(selection)
         else:
             cell_overrides[selection.id] = selection.variable_name
             data_dict[selection.variable_name] = context_val
 
-    # Also add column assignments to data_dict with all their individual variables
+    # A table with a column named for a table_rows field is filled once per entry of
+    # table_rows; columns of any other table keep one placeholder per row
+    loop_tables = {parse_element_id(s.id)[0] for s in col_assignments if table_row_field(s.variable_name)}
+    column_fields = {}
+    column_cells = {}
+    data_rows = {}
     for selection in col_assignments:
+        t_idx, col_idx = parse_element_id(selection.id)
         context_val = selection.description or ""
-        # For columns, we need to add all individual row variables
-        # Parse the column info to get number of rows
-        parts = selection.id.split("_")
-        if len(parts) >= 4:
-            t_idx = int(parts[1])
-            col_idx = int(parts[3])
-
-            # Get row count from in-memory structure
-            row_count = 0
-            for t in structure.get("tables", []):
-                if t.get("id") == f"t_{t_idx}":
-                    row_count = len(t.get("rows", []))
-                    break
-
-            # Add each row variable to data_dict
-            for r_idx in range(row_count):
-                var_name = f"{selection.variable_name}||{r_idx + 1}"
-                data_dict[var_name] = context_val
-        else:
+        if t_idx >= len(document.tables) or t_idx >= len(index.tables):
             data_dict[selection.variable_name] = context_val
-
-    # Apply formatting
-    # First, handle columns
-    for selection in col_assignments:
-        parts = selection.id.split("_")
-        t_idx = int(parts[1])
-        col_idx = int(parts[3])
-        if t_idx < len(doc.tables):
-            table = doc.tables[t_idx]
-            for r_idx, row in enumerate(table.rows):
-                if col_idx < len(row.cells):
-                    cell_id = f"t_{t_idx}_r_{r_idx}_c_{col_idx}"
-                    # Only apply column variable if this specific cell hasn't been overridden
-                    if cell_id not in cell_overrides:
-                        row.cells[col_idx].text = f"{{{{ {selection.variable_name}_{r_idx} }}}}"
-                        # Need to add this specific variable to data_dict to be complete? The user just wanted the column's var.
-                        # We'll stick to the base column variable name mapping to context to keep data.json flat and clean.
-
-    # Then handle individual elements
-    for selection in request.selections:
-        if selection.id.startswith("p_"):
-            p_idx = int(selection.id.split("_")[1])
-            if p_idx < len(doc.paragraphs):
-                doc.paragraphs[p_idx].text = f"{{{{ {selection.variable_name} }}}}"
-        elif selection.id.startswith("t_") and "col" not in selection.id:
-            parts = selection.id.split("_")
-            t_idx, r_idx, c_idx = int(parts[1]), int(parts[3]), int(parts[5])
-            if t_idx < len(doc.tables):
-                table = doc.tables[t_idx]
-                if r_idx < len(table.rows) and c_idx < len(table.rows[r_idx].cells):
-                    table.rows[r_idx].cells[c_idx].text = f"{{{{ {selection.variable_name} }}}}"
+            continue
+        table = document.tables[t_idx]
+        start = 1 if table_header_row(table) is not None else 0
+
+        if t_idx in loop_tables:
+            # Other columns of a looped table read their own name from each entry
+            key = table_row_field(selection.variable_name) or selection.variable_name
+            column_fields[selection.id] = key
+            note = f"Table column, one value per table_rows entry, from its \"{key}\""
+            data_dict[selection.variable_name] = f"{context_val} ({note})" if context_val else note
+            if t_idx not in data_rows:
+                data_rows[t_idx] = table_data_rows(table, index.tables[t_idx], start)
+            continue
+
+        for r_idx in range(start, index.tables[t_idx].num_rows):
+            cell_id = f"t_{t_idx}_r_{r_idx}_c_{col_idx}"
+            if cell_id not in cell_overrides and index.cell_location(t_idx, r_idx, col_idx) is not None:
+                column_cells[cell_id] = f"{selection.variable_name}_{r_idx}"
+                data_dict[column_cells[cell_id]] = context_val
 
     output_path = os.path.join(UPLOAD_DIR, f"{request.doc_id}_templated.docx")
-    doc.save(output_path)
 
     # Save templated document to data folder as doc_template.docx
-    data_dir = os.path.join(os.path.dirname(__file__), "..", "data")
-    os.makedirs(data_dir, exist_ok=True)
-    template_path = os.path.join(data_dir, "doc_template.docx")
-    doc.save(template_path)
+    os.makedirs(os.path.dirname(TEMPLATE_PATH), exist_ok=True)
+
+    await run_document_task(
+        apply_selections, doc_path, [output_path, TEMPLATE_PATH], index,
+        request.selections, column_fields, column_cells, cell_overrides, data_rows)
 
     # Save data.json in the web folder
     data_json_path = os.path.join(
@@ -377,7 +828,199 @@ async def download_document(doc_id: str):
     output_path = os.path.join(UPLOAD_DIR, f"{doc_id}_templated.docx")
     if not os.path.exists(output_path):
         raise HTTPException(status_code=404, detail="File not found")
-    return FileResponse(output_path, media_type="application/vnd.openxmlformats-officedocument.wordprocessingml.document", filename="templated_document.docx")
+    return FileResponse(output_path, media_type=DOCX_MEDIA_TYPE, filename="templated_document.docx")
+
+
+@app.post("/render")
+async def render_document(doc_id: Optional[str] = None, project_id: str = DEFAULT_PROJECT_ID):
+    """
+    Fill a processed template with the stored template context.
+
+    Renders ``data/doc_template.docx``, or the templated copy of ``doc_id``
+    when given, using ``build_template_context`` for ``project_id``.
+    Templates are compiled once per worker and cached by content hash, so
+    repeat renders only evaluate the Jinja parts and write the archive.
+    """
+    if not PROJECT_ID_PATTERN.match(project_id):
+        raise HTTPException(status_code=400, detail="Invalid project_id")
+    if doc_id is None:
+        template_path = TEMPLATE_PATH
+    else:
+        template_path = os.path.join(UPLOAD_DIR, f"{doc_id}_templated.docx")
+    if not os.path.exists(template_path):
+        raise HTTPException(status_code=404, detail="Template not found")
+
+    try:
+        context = await asyncio.to_thread(build_template_context, project_id)
+        data = await run_document_task(render_docx, template_path, context)
+    except jinja2.TemplateError as e:
+        raise HTTPException(status_code=422, detail=f"Template error: {e}")
+
+    return Response(content=data, media_type=DOCX_MEDIA_TYPE,
+                    headers={"Content-Disposition": 'attachment; filename="rendered_document.docx"'})
+
+
+class BulkRenderRequest(BaseModel):
+    doc_id: Optional[str] = None
+    # Each entry has the shape returned by build_template_context
+    contexts: List[Dict[str, Any]]
+    filenames: Optional[List[str]] = None
+
+
+class ZipStreamBuffer:
+    """Write-only file object that lets ``zipfile`` stream an archive out in pieces."""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self._offset = 0
+
+    def write(self, data: bytes) -> int:
+        self._chunks.append(bytes(data))
+        self._offset += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._offset
+
+    def flush(self) -> None:
+        pass
+
+    def take(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def bulk_render_filenames(count: int, filenames: Optional[List[str]]) -> List[str]:
+    """Return one unique, path-free ``.docx`` name per document."""
+    names = []
+    seen = set()
+    for i in range(count):
+        name = os.path.basename(filenames[i]) if filenames and filenames[i] else ""
+        stem = os.path.splitext(name)[0] or f"document_{i + 1:04d}"
+        name = f"{stem}.docx"
+        if name in seen:
+            name = f"{stem}_{i + 1}.docx"
+        seen.add(name)
+        names.append(name)
+    return names
+
+
+async def render_on_pool(template_path: str, context: Dict[str, Any]) -> bytes:
+    # Concurrent bulk requests share the pool; wait for room instead of failing mid-stream
+    async with render_slots:
+        return await render_pool.run(render_docx, template_path, context)
+
+
+async def stream_bulk_render(template_path: str, contexts: List[Dict[str, Any]], names: List[str]):
+    """
+    Render every context and yield the ZIP archive of the results as it is built.
+
+    At most ``render_pool.max_workers`` documents are in flight; each finished
+    document is written to the archive (stored, it is already compressed) and
+    flushed to the client before the next one is collected, so memory holds a
+    window of documents rather than the whole batch. The archive ends with a
+    ``manifest.json`` giving per-document errors and the throughput.
+    """
+    buffer = ZipStreamBuffer()
+    archive = zipfile.ZipFile(buffer, "w", zipfile.ZIP_STORED)
+    date_time = time.localtime()[:6]
+    window = render_pool.max_workers
+    pending: "deque[Tuple[int, asyncio.Future]]" = deque()
+    errors = {}
+    rendered = 0
+    start = time.perf_counter()
+
+    try:
+        next_idx = 0
+        while next_idx < len(contexts) or pending:
+            while next_idx < len(contexts) and len(pending) < window:
+                task = asyncio.ensure_future(render_on_pool(template_path, contexts[next_idx]))
+                pending.append((next_idx, task))
+                next_idx += 1
+
+            idx, task = pending.popleft()
+            try:
+                data = await task
+            except Exception as e:
+                errors[names[idx]] = str(e)
+                continue
+            archive.writestr(zipfile.ZipInfo(names[idx], date_time), data)
+            rendered += 1
+            yield buffer.take()
+
+        elapsed = time.perf_counter() - start
+        docs_per_second = rendered / elapsed if elapsed > 0 else 0.0
+        manifest = {
+            "documents": rendered,
+            "failed": len(errors),
+            "errors": errors,
+            "seconds": round(elapsed, 3),
+            "docs_per_second": round(docs_per_second, 2),
+        }
+        archive.writestr(zipfile.ZipInfo("manifest.json", date_time), json.dumps(manifest, indent=2))
+        archive.close()
+        yield buffer.take()
+
+        bulk_render_counts["documents"] += rendered
+        bulk_render_counts["failed"] += len(errors)
+        bulk_render_counts["seconds"] += elapsed
+        bulk_render_counts["last_docs_per_second"] = docs_per_second
+    finally:
+        for _, task in pending:
+            task.cancel()
+
+
+@app.post("/render/bulk")
+async def render_documents_bulk(request: BulkRenderRequest):
+    """
+    Render one template with many contexts and stream the documents back as a ZIP.
+
+    Documents are rendered in parallel on ``render_pool`` from the compiled
+    template. The archive's ``manifest.json`` reports failures and docs per
+    second; ``/stats`` keeps running totals.
+    """
+    if request.doc_id is None:
+        template_path = TEMPLATE_PATH
+    else:
+        template_path = os.path.join(UPLOAD_DIR, f"{request.doc_id}_templated.docx")
+    if not os.path.exists(template_path):
+        raise HTTPException(status_code=404, detail="Template not found")
+    if not request.contexts:
+        raise HTTPException(status_code=400, detail="contexts must not be empty")
+    if len(request.contexts) > MAX_BULK_RENDER:
+        raise HTTPException(
+            status_code=413, detail=f"At most {MAX_BULK_RENDER} documents per request")
+    if request.filenames is not None and len(request.filenames) != len(request.contexts):
+        raise HTTPException(status_code=400, detail="filenames must match contexts in length")
+
+    # Compile up front so template errors surface as a status code, not a broken stream
+    try:
+        await run_document_task(check_template, template_path)
+    except jinja2.TemplateError as e:
+        raise HTTPException(status_code=422, detail=f"Template error: {e}")
+
+    contexts = [template_context_from_payload(c) for c in request.contexts]
+    names = bulk_render_filenames(len(contexts), request.filenames)
+    return StreamingResponse(
+        stream_bulk_render(template_path, contexts, names),
+        media_type="application/zip",
+        headers={"Content-Disposition": 'attachment; filename="rendered_documents.zip"'})
+
+
+@app.get("/stats")
+async def get_stats():
+    """Report store footprints, worker pool load and suggestion cache hit rates."""
+    return {
+        "structure_store": structure_store.stats(),
+        "doc_pool": doc_pool.stats(),
+        "suggestion_cache": suggestion_cache.stats(),
+        "local_suggester": local_suggestion_counts,
+        # Only this process's cache; process-pool workers keep their own
+        "render_cache": template_cache.stats(),
+        "render_pool": render_pool.stats(),
+        "bulk_render": bulk_render_counts,
+    }
 
 
 @app.get("/")
@@ -1,19 +1,31 @@
-from fastapi import APIRouter, HTTPException
+import os
+from typing import List, Literal, Union
+
+from fastapi import APIRouter, Depends, HTTPException
 from fastapi.requests import Request
+from fastapi.responses import Response
 from fastapi.templating import Jinja2Templates
 from pydantic import BaseModel, Field
+from typing_extensions import Annotated
 
 from tools.user_input_jinja import (
     ALLOWED_TEXT_SECTIONS,
+    DEFAULT_PROJECT_ID,
+    PROJECT_ID_PATTERN,
     add_input,
     add_table_row,
     add_template_text_entry,
-    build_template_context,
+    apply_template_operations,
     list_to_dict,
-    load_template_input_data,
     set_template_metadata_value,
+    template_json,
 )
 
+# Upper bound on operations in one batch request
+MAX_BATCH_OPERATIONS = 1000
+# Template data changes at any time, so clients must revalidate (cheaply, via ETag) before reuse
+TEMPLATE_CACHE_CONTROL = os.getenv("TEMPLATE_CACHE_CONTROL", "no-cache")
+
 router = APIRouter()
 templates = Jinja2Templates(directory="web")  # note this directory will need to be changed.
 
@@ -53,6 +65,71 @@ class TableRowPayload(BaseModel):
     hazard: str = Field(..., min_length=1, description="Hazard text for the table row.")
     mitigation: str = Field(..., min_length=1, description="Mitigation text for the table row.")
 
+
+class StepOperation(TextEntryPayload):
+    op: Literal["add_step"]
+
+
+class HazardOperation(TextEntryPayload):
+    op: Literal["add_hazard"]
+
+
+class MitigationOperation(TextEntryPayload):
+    op: Literal["add_mitigation"]
+
+
+class MetadataOperation(MetadataPayload):
+    op: Literal["set_metadata"]
+
+
+class TableRowOperation(TableRowPayload):
+    op: Literal["add_table_row"]
+
+
+TemplateOperation = Annotated[
+    Union[StepOperation, HazardOperation, MitigationOperation, MetadataOperation, TableRowOperation],
+    Field(discriminator="op"),
+]
+
+# Section each text operation appends to
+TEXT_OPERATION_SECTIONS = {"add_step": "steps", "add_hazard": "hazards", "add_mitigation": "mitigations"}
+
+
+class BatchPayload(BaseModel):
+    """
+    Request model for applying many template mutations in one request.
+
+    Each operation carries an ``op`` discriminator plus the same fields as the
+    matching single-item route, and operations are applied in list order.
+    """
+
+    operations: List[TemplateOperation] = Field(
+        ..., min_length=1, max_length=MAX_BATCH_OPERATIONS,
+        description="Ordered operations to apply atomically.")
+
+def template_project(project_id: str = DEFAULT_PROJECT_ID) -> str:
+    """
+    Resolve the project a template route reads or writes.
+
+    Routes under ``/api/projects/{project_id}/template`` take it from the
+    path. The original ``/api/template`` routes use the default project
+    unless a ``project_id`` query parameter names another one. Each project
+    has its own storage, so writes to different projects run in parallel.
+
+    :param project_id: Project or session identifier.
+    :type project_id: str
+
+    :return: Validated project id.
+    :raises HTTPException: When the project id is not 1-64 letters, digits, ``_`` or ``-``.
+    """
+    if not PROJECT_ID_PATTERN.match(project_id):
+        raise HTTPException(
+            status_code=400,
+            detail="Invalid project_id. Use 1-64 letters, digits, '_' or '-'.",
+        )
+    return project_id
+
+
 @router.post("/api/add-user-input")
 def add_item(entry: str):
     """
@@ -88,7 +165,8 @@ def get_input(request: Request):
 
 
 @router.post("/api/template/steps")
-def add_step(payload: TextEntryPayload):
+@router.post("/api/projects/{project_id}/template/steps")
+def add_step(payload: TextEntryPayload, project: str = Depends(template_project)):
     """
     Append one project step entry for later AI hazard analysis and document output.
 
@@ -98,15 +176,18 @@ def add_step(payload: TextEntryPayload):
 
     :param payload: JSON body containing the step text to append.
     :type payload: TextEntryPayload
+    :param project: Project to use, from the path or ``project_id`` query parameter.
+    :type project: str
 
     :return: Dictionary containing updated ordered ``steps`` values.
     """
-    updated_steps = add_template_text_entry("steps", payload.entry)
+    updated_steps = add_template_text_entry("steps", payload.entry, project)
     return {"steps": updated_steps}
 
 
 @router.post("/api/template/hazards")
-def add_hazard(payload: TextEntryPayload):
+@router.post("/api/projects/{project_id}/template/hazards")
+def add_hazard(payload: TextEntryPayload, project: str = Depends(template_project)):
     """
     Append one hazard entry to the hazards section used by Jinja document output.
 
@@ -115,15 +196,18 @@ def add_hazard(payload: TextEntryPayload):
 
     :param payload: JSON body containing the hazard text to append.
     :type payload: TextEntryPayload
+    :param project: Project to use, from the path or ``project_id`` query parameter.
+    :type project: str
 
     :return: Dictionary containing updated ordered ``hazards`` values.
     """
-    updated_hazards = add_template_text_entry("hazards", payload.entry)
+    updated_hazards = add_template_text_entry("hazards", payload.entry, project)
     return {"hazards": updated_hazards}
 
 
 @router.post("/api/template/mitigations")
-def add_mitigation(payload: TextEntryPayload):
+@router.post("/api/projects/{project_id}/template/mitigations")
+def add_mitigation(payload: TextEntryPayload, project: str = Depends(template_project)):
     """
     Append one mitigation entry to the mitigations section for template rendering.
 
@@ -132,15 +216,18 @@ def add_mitigation(payload: TextEntryPayload):
 
     :param payload: JSON body containing the mitigation text to append.
     :type payload: TextEntryPayload
+    :param project: Project to use, from the path or ``project_id`` query parameter.
+    :type project: str
 
     :return: Dictionary containing updated ordered ``mitigations`` values.
     """
-    updated_mitigations = add_template_text_entry("mitigations", payload.entry)
+    updated_mitigations = add_template_text_entry("mitigations", payload.entry, project)
     return {"mitigations": updated_mitigations}
 
 
 @router.post("/api/template/metadata")
-def set_metadata_value(payload: MetadataPayload):
+@router.post("/api/projects/{project_id}/template/metadata")
+def set_metadata_value(payload: MetadataPayload, project: str = Depends(template_project)):
     """
     Set a single metadata field/value pair for named Jinja placeholders.
 
@@ -149,15 +236,18 @@ def set_metadata_value(payload: MetadataPayload):
 
     :param payload: JSON body with the metadata key and value.
     :type payload: MetadataPayload
+    :param project: Project to use, from the path or ``project_id`` query parameter.
+    :type project: str
 
     :return: Dictionary containing the full updated metadata object.
     """
-    updated_metadata = set_template_metadata_value(payload.field_name, payload.value)
+    updated_metadata = set_template_metadata_value(payload.field_name, payload.value, project)
     return {"metadata": updated_metadata}
 
 
 @router.post("/api/template/table-rows")
-def add_template_table_row(payload: TableRowPayload):
+@router.post("/api/projects/{project_id}/template/table-rows")
+def add_template_table_row(payload: TableRowPayload, project: str = Depends(template_project)):
     """
     Append one complete table row containing step, hazard, and mitigation values.
 
@@ -166,23 +256,103 @@ def add_template_table_row(payload: TableRowPayload):
 
     :param payload: JSON body containing all three table column values.
     :type payload: TableRowPayload
+    :param project: Project to use, from the path or ``project_id`` query parameter.
+    :type project: str
 
     :return: Dictionary containing the updated ``table_rows`` list.
     """
-    updated_rows = add_table_row(payload.step, payload.hazard, payload.mitigation)
+    updated_rows = add_table_row(payload.step, payload.hazard, payload.mitigation, project)
     return {"table_rows": updated_rows}
 
 
+@router.post("/api/template/batch")
+@router.post("/api/projects/{project_id}/template/batch")
+def apply_template_batch(payload: BatchPayload, project: str = Depends(template_project)):
+    """
+    Apply an ordered list of step, hazard, mitigation, metadata and table-row operations at once.
+
+    Agents filling a document in one pass should prefer this route over many
+    single-item calls: all operations are stored in one transaction, so the
+    batch costs one request and one write, and either every operation is
+    applied or none is.
+
+    :param payload: JSON body with the ordered ``operations`` list.
+    :type payload: BatchPayload
+    :param project: Project to use, from the path or ``project_id`` query parameter.
+    :type project: str
+
+    :return: Dictionary mapping every section touched by the batch to its updated value.
+    """
+    operations = []
+    for operation in payload.operations:
+        if operation.op in TEXT_OPERATION_SECTIONS:
+            operations.append((TEXT_OPERATION_SECTIONS[operation.op], operation.entry))
+        elif operation.op == "set_metadata":
+            operations.append(("metadata", (operation.field_name, operation.value)))
+        else:
+            operations.append(("table_rows", {
+                "step": operation.step,
+                "hazard": operation.hazard,
+                "mitigation": operation.mitigation,
+            }))
+
+    return apply_template_operations(operations, project)
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """
+    Check an ``If-None-Match`` header value against ``etag``.
+
+    The header may list several tags or be ``*``; ``W/`` prefixes are ignored
+    because ``If-None-Match`` uses weak comparison.
+    """
+    if if_none_match.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
+
+
+def conditional_json_response(request: Request, name: str, project: str) -> Response:
+    """
+    Build a JSON response for ``template_json(name)`` that honours ``If-None-Match``.
+
+    The ETag is the SHA-256 of the exact body, so it is strong and identical
+    across worker processes. A matching request gets an empty 304.
+
+    :param request: Incoming request carrying the optional ``If-None-Match`` header.
+    :type request: Request
+    :param name: ``"context"`` or a section name, as accepted by ``template_json``.
+    :type name: str
+    :param project: Project whose data is returned.
+    :type project: str
+
+    :return: 200 response with the body, or 304 when the client copy is current.
+    """
+    body, digest = template_json(name, project)
+    etag = f'"{digest}"'
+    headers = {"ETag": etag, "Cache-Control": TEMPLATE_CACHE_CONTROL}
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
 @router.get("/api/template/section/{section_name}")
-def get_template_section(section_name: str):
+@router.get("/api/projects/{project_id}/template/section/{section_name}")
+def get_template_section(section_name: str, request: Request, project: str = Depends(template_project)):
     """
     Return one stored section by name from the persisted template data payload.
 
     Supported section names are: ``metadata``, ``steps``, ``hazards``,
-    ``mitigations``, and ``table_rows``.
+    ``mitigations``, and ``table_rows``. The response carries an ``ETag``;
+    sending it back in ``If-None-Match`` returns 304 while the section is
+    unchanged.
 
     :param section_name: Name of the section to retrieve.
     :type section_name: str
+    :param request: FastAPI request object used for conditional headers.
+    :type request: Request
+    :param project: Project to use, from the path or ``project_id`` query parameter.
+    :type project: str
 
     :return: Dictionary containing the requested section and its current value.
     :raises HTTPException: When the requested section name is not recognized.
@@ -197,12 +367,12 @@ def get_template_section(section_name: str):
             ),
         )
 
-    payload = load_template_input_data()
-    return {section_name: payload[section_name]}
+    return conditional_json_response(request, section_name, project)
 
 
 @router.get("/api/template/context")
-def get_template_context():
+@router.get("/api/projects/{project_id}/template/context")
+def get_template_context(request: Request, project: str = Depends(template_project)):
     """
     Return the consolidated context object for Jinja-based Word document rendering.
 
@@ -211,6 +381,14 @@ def get_template_context():
     - indexed dictionaries for templates that use explicit index placeholders
     - metadata key/value fields
 
+    Like the section route it carries an ``ETag`` and answers a matching
+    ``If-None-Match`` with 304, so polling clients only download changes.
+
+    :param request: FastAPI request object used for conditional headers.
+    :type request: Request
+    :param project: Project to use, from the path or ``project_id`` query parameter.
+    :type project: str
+
     :return: Complete template context dictionary ready for Jinja rendering.
     """
-    return build_template_context()
+    return conditional_json_response(request, "context", project)
@@ -0,0 +1,73 @@
+import os
+from typing import Optional
+
+import httpx
+import openai
+
+
+class OpenAIClientManager:
+    """
+    Application-scoped ``AsyncOpenAI`` client shared by every request.
+
+    One client means one connection pool, so TLS sessions are set up once and
+    kept alive between suggestion calls, and because the client is async a
+    single worker can have many LLM round trips in flight at once.
+
+    The client is created on startup (or lazily on first use) and closed on
+    shutdown. ``client`` is ``None`` when no API key is configured.
+    """
+
+    def __init__(self, timeout: float = 60.0, connect_timeout: float = 10.0, max_retries: int = 2,
+                 max_connections: int = 100, max_keepalive: int = 20, keepalive_expiry: float = 30.0):
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self.max_retries = max_retries
+        self.max_connections = max_connections
+        self.max_keepalive = max_keepalive
+        self.keepalive_expiry = keepalive_expiry
+        self._client: Optional[openai.AsyncOpenAI] = None
+
+    def start(self) -> None:
+        if self._client is not None:
+            return
+        api_key = os.getenv("OPEN_AI_KEY") or os.getenv("OPENAI_API_KEY")
+        if not api_key:
+            return
+
+        http_client = openai.DefaultAsyncHttpxClient(
+            limits=httpx.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_keepalive,
+                keepalive_expiry=self.keepalive_expiry,
+            ),
+        )
+        self._client = openai.AsyncOpenAI(
+            api_key=api_key,
+            timeout=httpx.Timeout(self.timeout, connect=self.connect_timeout),
+            max_retries=self.max_retries,
+            http_client=http_client,
+        )
+
+    @property
+    def client(self) -> Optional[openai.AsyncOpenAI]:
+        if self._client is None:
+            self.start()
+        return self._client
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.close()
+            self._client = None
+
+
+def openai_client_from_env() -> OpenAIClientManager:
+    """
+    Build the client manager from ``OPENAI_TIMEOUT``, ``OPENAI_CONNECT_TIMEOUT``,
+    ``OPENAI_MAX_RETRIES`` and ``OPENAI_MAX_CONNECTIONS``.
+    """
+    return OpenAIClientManager(
+        timeout=float(os.getenv("OPENAI_TIMEOUT", "60")),
+        connect_timeout=float(os.getenv("OPENAI_CONNECT_TIMEOUT", "10")),
+        max_retries=int(os.getenv("OPENAI_MAX_RETRIES", "2")),
+        max_connections=int(os.getenv("OPENAI_MAX_CONNECTIONS", "100")),
+    )
@@ -0,0 +1,138 @@
+import errno
+import json
+import os
+import shutil
+import sqlite3
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Any, Dict, Optional, Tuple
+
+
+def link_or_copy(src: str, dst: str) -> None:
+    """
+    Hard-link ``src`` to ``dst``, falling back to a copy where links are not possible.
+
+    The link or copy is made under a temporary name and renamed over ``dst``,
+    so an existing ``dst`` is replaced, never written through; it may be a link
+    shared with another file. Only a link across filesystems (``EXDEV``) or on
+    one without hard links (``EPERM``) falls back to a copy, other errors raise.
+    """
+    tmp = f"{dst}.{uuid.uuid4().hex}.tmp"
+    try:
+        try:
+            os.link(src, tmp)
+        except OSError as e:
+            if e.errno not in (errno.EXDEV, errno.EPERM):
+                raise
+            shutil.copyfile(src, tmp)
+        os.replace(tmp, dst)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+class ParseCache:
+    """
+    Persistent content-addressed cache of parsed DOCX structures.
+
+    Entries are keyed by the SHA-256 of the uploaded bytes. Each entry keeps the
+    parsed structure and its element index as JSON in a small SQLite index
+    plus one stored copy of the original file, so a repeat upload of the same
+    template can skip parsing.
+
+    The cache holds at most ``max_entries`` documents and evicts the least
+    recently used ones beyond that. Entries written under a different
+    ``version`` are treated as misses and purged, so bumping the parser
+    version invalidates everything parsed by older code.
+    """
+
+    def __init__(self, directory: str, version: str, max_entries: int = 256):
+        self.directory = directory
+        self.version = version
+        self.max_entries = max_entries
+        self.db_path = os.path.join(directory, "index.sqlite3")
+        os.makedirs(directory, exist_ok=True)
+
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                "content_hash TEXT PRIMARY KEY, "
+                "version TEXT NOT NULL, "
+                "structure TEXT NOT NULL, "
+                "last_used REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS entries_last_used ON entries (last_used)")
+            stale = conn.execute(
+                "SELECT content_hash FROM entries WHERE version != ?", (version,)).fetchall()
+            self._delete(conn, [row[0] for row in stale])
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def blob_path(self, content_hash: str) -> str:
+        return os.path.join(self.directory, f"{content_hash}.docx")
+
+    def _delete(self, conn: sqlite3.Connection, hashes) -> None:
+        for content_hash in hashes:
+            conn.execute("DELETE FROM entries WHERE content_hash = ?", (content_hash,))
+            try:
+                os.remove(self.blob_path(content_hash))
+            except FileNotFoundError:
+                pass
+
+    def get(self, content_hash: str) -> Optional[Tuple[Dict[str, Any], Dict[str, Any]]]:
+        """
+        Return the cached ``(structure, index)`` for ``content_hash`` or ``None`` on a miss.
+
+        A hit refreshes the entry's LRU timestamp. Entries from another parser
+        version, or whose stored file has gone missing, are dropped.
+        """
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT version, structure FROM entries WHERE content_hash = ?",
+                (content_hash,),
+            ).fetchone()
+            if row is None:
+                return None
+            if row[0] != self.version or not os.path.exists(self.blob_path(content_hash)):
+                self._delete(conn, [content_hash])
+                return None
+            conn.execute(
+                "UPDATE entries SET last_used = ? WHERE content_hash = ?",
+                (time.time(), content_hash),
+            )
+        entry = json.loads(row[1])
+        return entry["structure"], entry["index"]
+
+    def put(self, content_hash: str, filepath: str, structure: Dict[str, Any],
+            index: Dict[str, Any]) -> None:
+        """Store ``structure``, its ``index`` and a copy of ``filepath`` under ``content_hash``."""
+        blob = self.blob_path(content_hash)
+        if not os.path.exists(blob):
+            link_or_copy(filepath, blob)
+
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO entries (content_hash, version, structure, last_used) "
+                "VALUES (?, ?, ?, ?)",
+                (content_hash, self.version,
+                 json.dumps({"structure": structure, "index": index}), time.time()),
+            )
+            evicted = conn.execute(
+                "SELECT content_hash FROM entries ORDER BY last_used DESC LIMIT -1 OFFSET ?",
+                (self.max_entries,),
+            ).fetchall()
+            self._delete(conn, [row[0] for row in evicted])
+
+    def restore(self, content_hash: str, dest: str) -> None:
+        """Place the stored file for ``content_hash`` at ``dest``."""
+        link_or_copy(self.blob_path(content_hash), dest)
@@ -0,0 +1,213 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Dict, Optional, Tuple
+
+from tools.doc_parser.doc_model import DocumentModel
+
+
+class MemoryBackend:
+    """
+    Process-local backend. Only suitable for a single uvicorn worker.
+    """
+
+    def __init__(self):
+        self._entries: Dict[str, Tuple[str, float]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, doc_id: str) -> Optional[Tuple[str, float]]:
+        with self._lock:
+            entry = self._entries.get(doc_id)
+            if entry is None:
+                return None
+            if entry[1] < time.time():
+                del self._entries[doc_id]
+                return None
+            return entry
+
+    def put(self, doc_id: str, payload: str, expires_at: float) -> None:
+        now = time.time()
+        with self._lock:
+            for key in [k for k, (_, exp) in self._entries.items() if exp < now]:
+                del self._entries[key]
+            self._entries[doc_id] = (payload, expires_at)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "backend": "memory",
+                "entries": len(self._entries),
+                "payload_bytes": sum(len(p) for p, _ in self._entries.values()),
+            }
+
+
+class SQLiteBackend:
+    """
+    Backend shared by every worker on the host through one SQLite file.
+
+    The database runs in WAL mode so readers never block the writer, and is
+    read through a memory map so hot pages are served from the OS page cache.
+    """
+
+    def __init__(self, path: str, mmap_size: int = 256 * 1024 * 1024):
+        self.path = path
+        self.mmap_size = mmap_size
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS structures ("
+                "doc_id TEXT PRIMARY KEY, "
+                "payload TEXT NOT NULL, "
+                "expires_at REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS structures_expires_at ON structures (expires_at)")
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute(f"PRAGMA mmap_size={int(self.mmap_size)}")
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def get(self, doc_id: str) -> Optional[Tuple[str, float]]:
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT payload, expires_at FROM structures WHERE doc_id = ? AND expires_at >= ?",
+                (doc_id, time.time()),
+            ).fetchone()
+        return tuple(row) if row else None
+
+    def put(self, doc_id: str, payload: str, expires_at: float) -> None:
+        with self._connect() as conn:
+            conn.execute("DELETE FROM structures WHERE expires_at < ?", (time.time(),))
+            conn.execute(
+                "INSERT OR REPLACE INTO structures (doc_id, payload, expires_at) VALUES (?, ?, ?)",
+                (doc_id, payload, expires_at),
+            )
+
+    def stats(self) -> Dict[str, Any]:
+        with self._connect() as conn:
+            entries, payload_bytes = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(LENGTH(payload)), 0) FROM structures "
+                "WHERE expires_at >= ?",
+                (time.time(),),
+            ).fetchone()
+            page_count = conn.execute("PRAGMA page_count").fetchone()[0]
+            page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+        return {
+            "backend": "sqlite",
+            "entries": entries,
+            "payload_bytes": payload_bytes,
+            "file_bytes": page_count * page_size,
+        }
+
+
+class StructureStore:
+    """
+    Document structure store with a per-worker hot tier in front of a backend.
+
+    Structures are written once at upload time and never modified, so the hot
+    tier is a plain LRU that can't go stale; it only has to honour the same
+    TTL as the backend. The hot tier keeps the compact ``DocumentModel``; the
+    backend keeps the JSON structure and element index. Lookups that miss the
+    hot tier fall through to the backend, which is what lets a follow-up
+    request land on any worker.
+
+    :param backend: ``MemoryBackend`` or ``SQLiteBackend`` instance.
+    :param ttl_seconds: Lifetime of an entry after it is stored.
+    :param hot_size: Maximum number of documents kept decoded in memory.
+    """
+
+    def __init__(self, backend, ttl_seconds: float = 24 * 3600, hot_size: int = 32):
+        self.backend = backend
+        self.ttl_seconds = ttl_seconds
+        self.hot_size = hot_size
+        # doc_id -> (document, expires_at, payload size in bytes)
+        self._hot: "OrderedDict[str, Tuple[DocumentModel, float, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _remember(self, doc_id: str, document: DocumentModel, expires_at: float, size: int) -> None:
+        with self._lock:
+            self._hot[doc_id] = (document, expires_at, size)
+            self._hot.move_to_end(doc_id)
+            while len(self._hot) > self.hot_size:
+                self._hot.popitem(last=False)
+
+    def put(self, doc_id: str, document: DocumentModel) -> None:
+        index = document.index.to_dict() if document.index is not None else None
+        payload = json.dumps({"structure": document.to_dict(), "index": index})
+        expires_at = time.time() + self.ttl_seconds
+        self.backend.put(doc_id, payload, expires_at)
+        self._remember(doc_id, document, expires_at, len(payload))
+
+    def get(self, doc_id: str) -> Optional[DocumentModel]:
+        """Return the document for ``doc_id`` or ``None`` if unknown or expired."""
+        with self._lock:
+            entry = self._hot.get(doc_id)
+            if entry is not None:
+                if entry[1] >= time.time():
+                    self._hot.move_to_end(doc_id)
+                    self.hits += 1
+                    return entry[0]
+                del self._hot[doc_id]
+            self.misses += 1
+
+        entry = self.backend.get(doc_id)
+        if entry is None:
+            return None
+        payload, expires_at = entry
+        data = json.loads(payload)
+        if "structure" in data:
+            document = DocumentModel.from_dict(data["structure"], data["index"])
+        else:
+            # Stored before the element index existed
+            document = DocumentModel.from_dict(data)
+        self._remember(doc_id, document, expires_at, len(payload))
+        return document
+
+    def stats(self) -> Dict[str, Any]:
+        """Report hot-tier and backend footprint for monitoring."""
+        with self._lock:
+            hot = {
+                "entries": len(self._hot),
+                "capacity": self.hot_size,
+                "payload_bytes": sum(size for _, _, size in self._hot.values()),
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+        return {"ttl_seconds": self.ttl_seconds, "hot": hot, "backend": self.backend.stats()}
+
+
+def structure_store_from_env(default_dir: str) -> StructureStore:
+    """
+    Build the store described by ``STRUCTURE_STORE*`` environment variables.
+
+    ``STRUCTURE_STORE`` selects ``sqlite`` (default) or ``memory``;
+    ``STRUCTURE_STORE_PATH``, ``STRUCTURE_STORE_TTL`` and
+    ``STRUCTURE_STORE_HOT_SIZE`` tune the location, lifetime and hot tier.
+    """
+    kind = os.getenv("STRUCTURE_STORE", "sqlite")
+    if kind == "memory":
+        backend = MemoryBackend()
+    elif kind == "sqlite":
+        backend = SQLiteBackend(
+            os.getenv("STRUCTURE_STORE_PATH", os.path.join(default_dir, "structures.sqlite3")))
+    else:
+        raise ValueError(f"Unsupported STRUCTURE_STORE: {kind}")
+
+    return StructureStore(
+        backend,
+        ttl_seconds=float(os.getenv("STRUCTURE_STORE_TTL", str(24 * 3600))),
+        hot_size=int(os.getenv("STRUCTURE_STORE_HOT_SIZE", "32")),
+    )
@@ -0,0 +1,257 @@
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+# A computation returns the suggestion payload and the LLM tokens it consumed
+SuggestionResult = Tuple[Dict[str, Any], int]
+
+
+def normalize_text(text: str) -> str:
+    """Case-fold and collapse whitespace so trivially different field texts share a key."""
+    return " ".join(text.split()).casefold()
+
+
+class SuggestionCache:
+    """
+    Cache of LLM variable-name suggestions keyed on normalized text and model.
+
+    Results live in a small in-memory LRU backed by a SQLite table, so they
+    survive restarts and are shared by all workers on the host. Entries expire
+    ``ttl_seconds`` after they were generated and the table is trimmed to
+    ``max_entries`` by least-recent use.
+
+    Concurrent requests for the same key are coalesced: the first one runs the
+    computation and the others await its result, so a burst of identical
+    highlights costs one LLM call.
+
+    :param path: SQLite database file.
+    :param ttl_seconds: Lifetime of a cached suggestion.
+    :param max_entries: Maximum number of rows kept in SQLite.
+    :param memory_size: Maximum number of entries kept in memory.
+    """
+
+    def __init__(self, path: str, ttl_seconds: float = 30 * 24 * 3600,
+                 max_entries: int = 10000, memory_size: int = 1024):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.memory_size = memory_size
+        # key -> (result, tokens, expires_at)
+        self._memory: "OrderedDict[str, Tuple[Dict[str, Any], int, float]]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.tokens_saved = 0
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS suggestions ("
+                "key TEXT PRIMARY KEY, "
+                "model TEXT NOT NULL, "
+                "text TEXT NOT NULL, "
+                "result TEXT NOT NULL, "
+                "tokens INTEGER NOT NULL, "
+                "expires_at REAL NOT NULL, "
+                "last_used REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS suggestions_last_used ON suggestions (last_used)")
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    @staticmethod
+    def key(text: str, model: str) -> str:
+        return hashlib.sha256(f"{model}\0{normalize_text(text)}".encode("utf-8")).hexdigest()
+
+    def _remember(self, key: str, result: Dict[str, Any], tokens: int, expires_at: float) -> None:
+        with self._lock:
+            self._memory[key] = (result, tokens, expires_at)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_size:
+                self._memory.popitem(last=False)
+
+    def get(self, key: str) -> Optional[Tuple[Dict[str, Any], int]]:
+        """Return ``(result, tokens)`` for ``key`` or ``None`` if absent or expired."""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if entry[2] >= now:
+                    self._memory.move_to_end(key)
+                    return entry[0], entry[1]
+                del self._memory[key]
+
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT result, tokens, expires_at FROM suggestions WHERE key = ? AND expires_at >= ?",
+                (key, now),
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute("UPDATE suggestions SET last_used = ? WHERE key = ?", (now, key))
+
+        result = json.loads(row[0])
+        self._remember(key, result, row[1], row[2])
+        return result, row[1]
+
+    def put(self, key: str, text: str, model: str, result: Dict[str, Any], tokens: int) -> None:
+        now = time.time()
+        expires_at = now + self.ttl_seconds
+        with self._connect() as conn:
+            conn.execute("DELETE FROM suggestions WHERE expires_at < ?", (now,))
+            conn.execute(
+                "INSERT OR REPLACE INTO suggestions "
+                "(key, model, text, result, tokens, expires_at, last_used) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, model, normalize_text(text), json.dumps(result), tokens, expires_at, now),
+            )
+            conn.execute(
+                "DELETE FROM suggestions WHERE key IN ("
+                "SELECT key FROM suggestions ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+        self._remember(key, result, tokens, expires_at)
+
+    async def get_or_compute(self, text: str, model: str,
+                             compute: Callable[[], Awaitable[SuggestionResult]]) -> Dict[str, Any]:
+        """
+        Return the cached suggestion for ``text``, computing it at most once.
+
+        Results containing an ``error`` key are returned but never cached.
+        """
+        key = self.key(text, model)
+        cached = self.get(key)
+        if cached is not None:
+            with self._lock:
+                self.hits += 1
+                self.tokens_saved += cached[1]
+            return dict(cached[0])
+
+        task = self._inflight.get(key)
+        if task is None:
+            with self._lock:
+                self.misses += 1
+            task = asyncio.ensure_future(self._compute_and_store(key, text, model, compute))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+            result, _ = await asyncio.shield(task)
+        else:
+            result, tokens = await asyncio.shield(task)
+            with self._lock:
+                self.coalesced += 1
+                self.tokens_saved += tokens
+        return dict(result)
+
+    async def get_or_compute_many(
+            self, texts: List[str], model: str,
+            compute_batch: Callable[[List[str]], Awaitable[Tuple[Dict[str, Dict[str, Any]], int]]],
+            pack: Callable[[List[str]], List[List[str]]]) -> Dict[str, Dict[str, Any]]:
+        """
+        Resolve many distinct texts, sending only the misses to ``compute_batch``.
+
+        Misses are grouped by ``pack`` and each group is computed concurrently
+        with one ``compute_batch`` call, which returns a result per text and the
+        tokens the call consumed. Every pending text is registered as in flight,
+        so single-text lookups for the same key coalesce onto the batch call.
+        A failed group yields an ``error`` result for each of its texts.
+
+        :return: Mapping of each input text to its suggestion payload.
+        """
+        results: Dict[str, Dict[str, Any]] = {}
+        pending: Dict[str, asyncio.Future] = {}
+        todo = []
+
+        for text in texts:
+            key = self.key(text, model)
+            cached = self.get(key)
+            if cached is not None:
+                with self._lock:
+                    self.hits += 1
+                    self.tokens_saved += cached[1]
+                results[text] = dict(cached[0])
+            elif key in self._inflight:
+                with self._lock:
+                    self.coalesced += 1
+                pending[text] = self._inflight[key]
+            else:
+                with self._lock:
+                    self.misses += 1
+                todo.append(text)
+
+        for batch in pack(todo):
+            batch_task = asyncio.ensure_future(
+                self._compute_batch_and_store(batch, model, compute_batch))
+            for text in batch:
+                key = self.key(text, model)
+                task = asyncio.ensure_future(self._pick(batch_task, text))
+                self._inflight[key] = task
+                task.add_done_callback(lambda _, key=key: self._inflight.pop(key, None))
+                pending[text] = task
+
+        outcomes = await asyncio.gather(
+            *(asyncio.shield(task) for task in pending.values()), return_exceptions=True)
+        for text, outcome in zip(pending, outcomes):
+            if isinstance(outcome, BaseException):
+                results[text] = {"suggestion": "", "error": str(outcome)}
+            else:
+                results[text] = dict(outcome[0])
+        return results
+
+    @staticmethod
+    async def _pick(batch_task: asyncio.Future, text: str) -> SuggestionResult:
+        batch_results, share = await asyncio.shield(batch_task)
+        return batch_results[text], share
+
+    async def _compute_batch_and_store(
+            self, batch: List[str], model: str,
+            compute_batch: Callable[[List[str]], Awaitable[Tuple[Dict[str, Dict[str, Any]], int]]]
+    ) -> Tuple[Dict[str, Dict[str, Any]], int]:
+        batch_results, tokens = await compute_batch(batch)
+        share = tokens // len(batch) if batch else 0
+        for text in batch:
+            result = batch_results.setdefault(
+                text, {"suggestion": "", "error": "No suggestion returned"})
+            if "error" not in result:
+                self.put(self.key(text, model), text, model, result, share)
+        return batch_results, share
+
+    async def _compute_and_store(self, key: str, text: str, model: str,
+                                 compute: Callable[[], Awaitable[SuggestionResult]]) -> SuggestionResult:
+        result, tokens = await compute()
+        if "error" not in result:
+            self.put(key, text, model, result, tokens)
+        return result, tokens
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses + self.coalesced
+            stats = {
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "hit_rate": (self.hits + self.coalesced) / lookups if lookups else 0.0,
+                "tokens_saved": self.tokens_saved,
+                "memory_entries": len(self._memory),
+                "in_flight": len(self._inflight),
+            }
+        with self._connect() as conn:
+            stats["stored_entries"] = conn.execute(
+                "SELECT COUNT(*) FROM suggestions WHERE expires_at >= ?", (time.time(),)).fetchone()[0]
+        return stats
@@ -0,0 +1,176 @@
+import hashlib
+import os
+from typing import Callable, Dict, Optional, Tuple
+
+from fastapi import HTTPException, Request
+from python_multipart.exceptions import MultipartParseError
+from python_multipart.multipart import MultipartParser, parse_options_header
+
+ZIP_LOCAL_HEADER = b"PK\x03\x04"
+ZIP_END_OF_DIRECTORY = b"PK\x05\x06"
+# End-of-central-directory record is 22 bytes plus an optional comment of up to 64 KiB
+ZIP_TAIL_BYTES = 22 + 0xFFFF
+# Room for boundaries, part headers and small form fields around the file itself
+MULTIPART_OVERHEAD = 64 * 1024
+
+
+def _too_large() -> HTTPException:
+    return HTTPException(status_code=413, detail="Uploaded file is too large")
+
+
+def _not_docx() -> HTTPException:
+    return HTTPException(status_code=400, detail="Uploaded file is not a valid .docx archive")
+
+
+class DocxPartWriter:
+    """
+    Write the bytes of one uploaded file part to disk while checking them.
+
+    The SHA-256, the size limit and the zip signatures are checked as the
+    bytes arrive, so a body that is too large or does not start like a zip
+    archive is rejected at the first chunk that shows it. Data goes to
+    ``<dest>.part`` and is renamed into place by ``finish`` only when every
+    check passed.
+    """
+
+    def __init__(self, dest: str, max_bytes: int):
+        self.dest = dest
+        self.partial_path = f"{dest}.part"
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._hasher = hashlib.sha256()
+        self._head = b""
+        self._tail = b""
+        self._file = open(self.partial_path, "wb")
+
+    def write(self, data: bytes) -> None:
+        if self.size < len(ZIP_LOCAL_HEADER):
+            self._head = (self._head + data)[:len(ZIP_LOCAL_HEADER)]
+            if not ZIP_LOCAL_HEADER.startswith(self._head):
+                raise _not_docx()
+        self.size += len(data)
+        if self.size > self.max_bytes:
+            raise _too_large()
+        self._hasher.update(data)
+        self._file.write(data)
+        self._tail = (self._tail + data)[-ZIP_TAIL_BYTES:]
+
+    def finish(self) -> str:
+        """Move the file into place and return its SHA-256 hex digest."""
+        self._file.close()
+        if self._head != ZIP_LOCAL_HEADER or ZIP_END_OF_DIRECTORY not in self._tail:
+            raise _not_docx()
+        os.replace(self.partial_path, self.dest)
+        return self._hasher.hexdigest()
+
+    def discard(self) -> None:
+        self._file.close()
+        if os.path.exists(self.partial_path):
+            os.remove(self.partial_path)
+
+
+class _FileFieldParser:
+    # python-multipart callbacks that route the bytes of one file field to a DocxPartWriter
+
+    def __init__(self, field_name: str, dest: str, max_bytes: int):
+        self.field_name = field_name
+        self.dest = dest
+        self.max_bytes = max_bytes
+        self.filename: Optional[str] = None
+        self.digest: Optional[str] = None
+        # Writer of the part being received, if it is the file field
+        self.writer: Optional[DocxPartWriter] = None
+        self._headers: Dict[bytes, bytes] = {}
+        self._header_name = b""
+
+    def callbacks(self) -> Dict[str, Callable]:
+        return {
+            "on_part_begin": self._headers.clear,
+            "on_header_field": self.on_header_field,
+            "on_header_value": self.on_header_value,
+            "on_header_end": self.on_header_end,
+            "on_headers_finished": self.on_headers_finished,
+            "on_part_data": self.on_part_data,
+            "on_part_end": self.on_part_end,
+        }
+
+    def on_header_field(self, data: bytes, start: int, end: int) -> None:
+        self._header_name += data[start:end]
+
+    def on_header_value(self, data: bytes, start: int, end: int) -> None:
+        name = self._header_name.lower()
+        self._headers[name] = self._headers.get(name, b"") + data[start:end]
+
+    def on_header_end(self) -> None:
+        self._header_name = b""
+
+    def on_headers_finished(self) -> None:
+        _, disposition = parse_options_header(self._headers.get(b"content-disposition", b""))
+        name = disposition.get(b"name", b"").decode("utf-8", "replace")
+        # Only the first file under field_name is kept
+        if name != self.field_name or self.filename is not None:
+            return
+        self.filename = disposition.get(b"filename", b"").decode("utf-8", "replace")
+        if not self.filename.endswith(".docx"):
+            raise HTTPException(status_code=400, detail="Only .docx files are supported")
+        self.writer = DocxPartWriter(self.dest, self.max_bytes)
+
+    def on_part_data(self, data: bytes, start: int, end: int) -> None:
+        if self.writer is not None:
+            self.writer.write(data[start:end])
+
+    def on_part_end(self) -> None:
+        if self.writer is not None:
+            self.digest = self.writer.finish()
+            self.writer = None
+
+
+async def receive_docx_upload(request: Request, field_name: str, dest: str,
+                              max_bytes: int) -> Tuple[str, str]:
+    """
+    Stream the ``.docx`` file field of a multipart request body straight to ``dest``.
+
+    The body is parsed from ``request.stream()`` as it arrives instead of
+    letting the framework spool the whole form first, so every rejection
+    happens as early as it can be known: a declared ``Content-Length`` over
+    the limit before any byte is read; a wrong file name once the part
+    headers are in; a non-zip body at its first bytes; and an oversized body
+    as soon as it crosses ``max_bytes``. Any other form fields are ignored.
+
+    :param request: Request carrying a ``multipart/form-data`` body.
+    :param field_name: Name of the form field holding the file.
+    :param dest: Path the file is written to.
+    :param max_bytes: Largest accepted file.
+
+    :return: The uploaded file name and the SHA-256 hex digest of its bytes.
+    :raises HTTPException: 400 for a missing, misnamed or non-zip file, 413
+        for a body over the limit.
+    """
+    declared = request.headers.get("content-length")
+    if declared and declared.isdigit() and int(declared) > max_bytes + MULTIPART_OVERHEAD:
+        raise _too_large()
+
+    content_type, options = parse_options_header(request.headers.get("content-type", ""))
+    boundary = options.get(b"boundary")
+    if content_type != b"multipart/form-data" or not boundary:
+        raise HTTPException(status_code=400, detail="Expected a multipart/form-data upload")
+
+    upload = _FileFieldParser(field_name, dest, max_bytes)
+    parser = MultipartParser(boundary, upload.callbacks())
+    received = 0
+    try:
+        async for chunk in request.stream():
+            received += len(chunk)
+            if received > max_bytes + MULTIPART_OVERHEAD:
+                raise _too_large()
+            parser.write(chunk)
+        parser.finalize()
+    except MultipartParseError:
+        raise HTTPException(status_code=400, detail="Malformed multipart body")
+    finally:
+        if upload.writer is not None:
+            upload.writer.discard()
+
+    if upload.digest is None:
+        raise HTTPException(status_code=400, detail=f"No complete '{field_name}' file in the upload")
+    return upload.filename, upload.digest
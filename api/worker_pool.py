@@ -0,0 +1,111 @@
+import asyncio
+import os
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+
+class PoolSaturatedError(RuntimeError):
+    """Raised when a task is submitted while the pool's queue is full."""
+
+
+class DocumentWorkerPool:
+    """
+    Bounded executor for CPU-heavy document work (parsing, loading, saving).
+
+    Work is handed to a thread or process pool so the event loop keeps
+    serving cheap endpoints while large documents are being processed. At most
+    ``max_workers`` tasks run at once and at most ``max_queue`` more wait for a
+    free worker; anything beyond that is rejected immediately with
+    ``PoolSaturatedError`` instead of piling up latency for every caller.
+
+    With ``kind="process"`` submitted callables and their arguments must be
+    picklable, i.e. module-level functions and plain data.
+
+    :param kind: ``"thread"`` or ``"process"``.
+    :param max_workers: Number of concurrent workers.
+    :param max_queue: Number of tasks allowed to wait for a worker.
+    """
+
+    def __init__(self, kind: str = "thread", max_workers: Optional[int] = None, max_queue: int = 16):
+        if kind not in ("thread", "process"):
+            raise ValueError(f"Unsupported pool kind: {kind}")
+        self.kind = kind
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.max_queue = max_queue
+        self._executor: Optional[Executor] = None
+        self._lock = threading.Lock()
+        self._pending = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+
+    def _get_executor(self) -> Executor:
+        # Created lazily so importing the app never forks worker processes
+        if self._executor is None:
+            if self.kind == "process":
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            else:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers, thread_name_prefix="doc-worker")
+        return self._executor
+
+    async def run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        """
+        Run ``fn(*args)`` on the pool and await its result.
+
+        :raises PoolSaturatedError: If every worker is busy and the queue is full.
+        """
+        with self._lock:
+            if self._pending >= self.max_workers + self.max_queue:
+                self.rejected += 1
+                raise PoolSaturatedError("Document worker queue is full")
+            self._pending += 1
+
+        try:
+            loop = asyncio.get_running_loop()
+            result = await loop.run_in_executor(self._get_executor(), fn, *args)
+        except Exception:
+            with self._lock:
+                self.failed += 1
+            raise
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+        with self._lock:
+            self.completed += 1
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            busy = min(self._pending, self.max_workers)
+            return {
+                "kind": self.kind,
+                "max_workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "busy_workers": busy,
+                "queue_depth": self._pending - busy,
+                "utilization": busy / self.max_workers,
+                "completed": self.completed,
+                "failed": self.failed,
+                "rejected": self.rejected,
+            }
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+
+def worker_pool_from_env(prefix: str = "DOC_POOL", default_kind: str = "thread") -> DocumentWorkerPool:
+    """
+    Build the pool described by ``<prefix>_KIND`` (``thread`` or ``process``),
+    ``<prefix>_WORKERS`` and ``<prefix>_MAX_QUEUE``, e.g. ``DOC_POOL_KIND``.
+    """
+    workers = os.getenv(f"{prefix}_WORKERS")
+    return DocumentWorkerPool(
+        kind=os.getenv(f"{prefix}_KIND", default_kind),
+        max_workers=int(workers) if workers else None,
+        max_queue=int(os.getenv(f"{prefix}_MAX_QUEUE", "16")),
+    )
@@ -0,0 +1,13 @@
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+# The API resolves its upload directory relative to the repo root
+os.chdir(ROOT)
+
+# Keep template input written by API tests out of data/
+_store_dir = tempfile.mkdtemp(prefix="template_input_")
+os.environ.setdefault("TEMPLATE_INPUT_DB", os.path.join(_store_dir, "default.sqlite3"))
+os.environ.setdefault("TEMPLATE_INPUT_SHARD_DIR", os.path.join(_store_dir, "shards"))
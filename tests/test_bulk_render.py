@@ -0,0 +1,100 @@
+import asyncio
+import io
+import json
+import os
+import uuid
+import zipfile
+
+import docx
+import pytest
+from fastapi.testclient import TestClient
+
+import api.frontend as frontend
+from api.worker_pool import DocumentWorkerPool
+
+
+@pytest.fixture
+def client():
+    with TestClient(frontend.app) as client:
+        yield client
+
+
+@pytest.fixture
+def doc_id():
+    doc_id = f"test-{uuid.uuid4().hex}"
+    document = docx.Document()
+    document.add_paragraph("Company: {{ metadata.company_name }}")
+    document.add_paragraph("Site: {{ metadata.site.name }}")
+    path = os.path.join(frontend.UPLOAD_DIR, f"{doc_id}_templated.docx")
+    document.save(path)
+    yield doc_id
+    os.remove(path)
+
+
+def context(company, site=None):
+    metadata = {"company_name": company}
+    if site is not None:
+        metadata["site"] = {"name": site}
+    return {"metadata": metadata}
+
+
+def test_bulk_render_streams_documents_and_manifest(client, doc_id):
+    contexts = [context("ACME", "North"), context("Beta", "South"), context("Gamma", "East"),
+                context("Delta")]
+    response = client.post("/render/bulk", json={
+        "doc_id": doc_id,
+        "contexts": contexts,
+        "filenames": ["../north.docx", "report", "report.docx", "delta"],
+    })
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/zip"
+
+    archive = zipfile.ZipFile(io.BytesIO(response.content))
+    # Paths are stripped, extensions added and duplicates numbered; the failed render is left out
+    assert archive.namelist() == ["north.docx", "report.docx", "report_3.docx", "manifest.json"]
+    texts = {name: [p.text for p in docx.Document(io.BytesIO(archive.read(name))).paragraphs]
+             for name in archive.namelist()[:-1]}
+    assert texts == {
+        "north.docx": ["Company: ACME", "Site: North"],
+        "report.docx": ["Company: Beta", "Site: South"],
+        "report_3.docx": ["Company: Gamma", "Site: East"],
+    }
+
+    manifest = json.loads(archive.read("manifest.json"))
+    assert manifest["documents"] == 3
+    assert manifest["failed"] == 1
+    assert list(manifest["errors"]) == ["delta.docx"]
+    assert manifest["docs_per_second"] > 0
+
+
+def test_bulk_render_names_unnamed_documents(client, doc_id):
+    response = client.post("/render/bulk", json={"doc_id": doc_id, "contexts": [context("A", "x")] * 2})
+    names = zipfile.ZipFile(io.BytesIO(response.content)).namelist()
+    assert names == ["document_0001.docx", "document_0002.docx", "manifest.json"]
+
+
+def test_bulk_render_validates_the_request(client, doc_id):
+    assert client.post("/render/bulk", json={"doc_id": doc_id, "contexts": []}).status_code == 400
+    assert client.post("/render/bulk", json={
+        "doc_id": doc_id, "contexts": [context("A")], "filenames": ["a", "b"]}).status_code == 400
+    assert client.post("/render/bulk", json={"doc_id": "missing", "contexts": [context("A")]}).status_code == 404
+
+
+def test_renders_wait_for_a_pool_slot_instead_of_being_rejected(monkeypatch, doc_id):
+    pool = DocumentWorkerPool(kind="thread", max_workers=1, max_queue=0)
+    monkeypatch.setattr(frontend, "render_pool", pool)
+    template_path = os.path.join(frontend.UPLOAD_DIR, f"{doc_id}_templated.docx")
+
+    async def render_many():
+        monkeypatch.setattr(frontend, "render_slots", asyncio.Semaphore(pool.max_workers + pool.max_queue))
+        return await asyncio.gather(*(
+            frontend.render_on_pool(template_path, frontend.template_context_from_payload(context("A", "x")))
+            for _ in range(4)))
+
+    try:
+        results = asyncio.run(render_many())
+    finally:
+        pool.shutdown()
+    assert len(results) == 4
+    assert pool.rejected == 0
+    assert pool.completed == 4
@@ -0,0 +1,118 @@
+import math
+import random
+from collections import Counter
+
+import pytest
+
+from tools.web_crawler.chunk_index import ChunkIndex, tokenize
+
+WORDS = [f"w{i}" for i in range(300)]
+WEIGHTS = [1 / (rank + 1) for rank in range(len(WORDS))]
+
+
+def make_chunks(rng, url, count=2):
+    return [{"text": " ".join(rng.choices(WORDS, WEIGHTS, k=rng.randint(5, 80))), "source_url": url}
+            for _ in range(count)]
+
+
+def reference_scores(chunks, query, k1=1.2, b=0.75):
+    """Plain BM25 over every live chunk, independent of the index structures."""
+    counts = [Counter(tokenize(chunk["text"])) for chunk in chunks]
+    avgdl = sum(sum(c.values()) for c in counts) / len(counts)
+    scores = [0.0] * len(chunks)
+    for term, weight in Counter(tokenize(query)).items():
+        df = sum(term in c for c in counts)
+        if not df:
+            continue
+        idf = weight * math.log(1 + (len(chunks) - df + 0.5) / (df + 0.5))
+        for i, c in enumerate(counts):
+            tf = c[term]
+            if tf:
+                norm = k1 * (1 - b + b * sum(c.values()) / avgdl)
+                scores[i] += idf * tf * (k1 + 1) / (tf + norm)
+    return scores
+
+
+def assert_matches_reference(index, live_chunks, queries, k=5):
+    for query in queries:
+        scores = reference_scores(live_chunks, query)
+        expected = sorted((s for s in scores if s > 0), reverse=True)[:k]
+        got = index.search(query, k)
+        assert [score for score, _ in got] == pytest.approx(expected, rel=1e-9)
+        # Every returned chunk really has the score it was returned with
+        for score, chunk in got:
+            assert scores[live_chunks.index(chunk)] == pytest.approx(score, rel=1e-9)
+
+
+def random_queries(rng, count=40):
+    # Mix of common head words and rare tail words, like job step queries
+    return [" ".join(rng.choices(WORDS[:10], k=2) + rng.sample(WORDS[10:], 3)) for _ in range(count)]
+
+
+def live_df(chunks):
+    return Counter(term for chunk in chunks for term in set(tokenize(chunk["text"])))
+
+
+def test_early_termination_returns_the_exhaustive_top_k():
+    rng = random.Random(3)
+    index = ChunkIndex()
+    chunks = []
+    for page in range(150):
+        page_chunks = make_chunks(rng, f"https://example.test/{page}")
+        index.add_chunks(page_chunks)
+        chunks += page_chunks
+
+    assert_matches_reference(index, chunks, random_queries(rng))
+    assert_matches_reference(index, chunks, random_queries(rng, 10), k=1)
+    assert index.search("", 5) == [] and index.search("w1", 0) == []
+
+
+def test_readding_a_source_replaces_its_chunks():
+    index = ChunkIndex()
+    index.add_chunks([{"text": "extension ladder roof edge", "source_url": "a"},
+                      {"text": "ladder feet secured", "source_url": "a"},
+                      {"text": "trench shoring", "source_url": "b"}])
+    index.add_chunks([{"text": "scaffold guardrail platform", "source_url": "a"}])
+
+    assert len(index) == 2
+    assert index.search("ladder", 5) == []
+    assert [chunk["text"] for _, chunk in index.search("scaffold ladder", 5)] == ["scaffold guardrail platform"]
+    assert "ladder" not in {term for term, df in index._df.items() if df}
+
+
+def test_removal_and_compaction_keep_results_and_document_frequencies():
+    rng = random.Random(5)
+    index = ChunkIndex()
+    pages = {f"https://example.test/{page}": make_chunks(rng, f"https://example.test/{page}") for page in range(40)}
+    for page_chunks in pages.values():
+        index.add_chunks(page_chunks)
+    queries = random_queries(rng, 20)
+
+    def live_chunks():
+        return [chunk for page_chunks in pages.values() for chunk in page_chunks]
+
+    def check():
+        assert len(index) == len(live_chunks())
+        assert {term: df for term, df in index._df.items() if df} == live_df(live_chunks())
+        assert_matches_reference(index, live_chunks(), queries)
+
+    # Few enough removals to stay below compaction: removed chunks are skipped at query time
+    for url in list(pages)[:4]:
+        assert index.remove_source(url) == 2
+        del pages[url]
+    assert index.stats()["removed_pending"] == 8
+    check()
+
+    # Crossing a quarter of the index compacts it
+    for url in list(pages)[:7]:
+        index.remove_source(url)
+        del pages[url]
+    assert index.stats()["removed_pending"] == 0
+    assert index.stats()["postings"] == sum(live_df(live_chunks()).values())
+    check()
+
+    assert index.remove_source("https://example.test/unknown") == 0
+    new_page = make_chunks(rng, "https://example.test/new")
+    index.add_chunks(new_page)
+    pages["https://example.test/new"] = new_page
+    check()
@@ -0,0 +1,84 @@
+import io
+import os
+import uuid
+
+import docx
+import pytest
+from fastapi.testclient import TestClient
+
+from api.frontend import UPLOAD_DIR, app
+from tools.user_input_jinja import get_template_input_store, set_template_metadata_value
+
+
+@pytest.fixture
+def client():
+    with TestClient(app) as client:
+        yield client
+
+
+@pytest.fixture
+def templated_doc():
+    """
+    Write a templated upload with the given paragraphs and yield its doc_id.
+
+    A paragraph is a string, or a list of strings written as separate runs.
+    """
+    paths = []
+
+    def make(*paragraphs):
+        doc_id = f"test-{uuid.uuid4().hex}"
+        document = docx.Document()
+        for text in paragraphs:
+            paragraph = document.add_paragraph()
+            for run in [text] if isinstance(text, str) else text:
+                paragraph.add_run(run)
+        path = os.path.join(UPLOAD_DIR, f"{doc_id}_templated.docx")
+        document.save(path)
+        paths.append(path)
+        return doc_id
+
+    yield make
+    for path in paths:
+        os.remove(path)
+
+
+@pytest.fixture
+def project_id():
+    project_id = "test-render"
+    get_template_input_store(project_id).replace({})
+    set_template_metadata_value("company_name", "ACME Roofing", project_id)
+    return project_id
+
+
+def rendered_paragraphs(client, doc_id, project_id):
+    response = client.post("/render", params={"doc_id": doc_id, "project_id": project_id})
+    assert response.status_code == 200
+    return [p.text for p in docx.Document(io.BytesIO(response.content)).paragraphs]
+
+
+def test_render_fills_placeholders(client, templated_doc, project_id):
+    doc_id = templated_doc("Company: {{ metadata.company_name }}", "Site: {{ metadata.site | default('TBD') }}")
+    assert rendered_paragraphs(client, doc_id, project_id) == ["Company: ACME Roofing", "Site: TBD"]
+
+
+@pytest.mark.parametrize("runs", [
+    ["Company: {{ metadata.", "company", "_name }}"],
+    ["Company: {", "{ metadata.company_name }", "}"],
+    ["Company: ", "{{", " metadata.company_name ", "}}", "."],
+])
+def test_render_fills_placeholders_split_across_runs(client, templated_doc, project_id, runs):
+    doc_id = templated_doc(runs)
+    expected = "Company: ACME Roofing" + ("." if runs[-1] == "." else "")
+    assert rendered_paragraphs(client, doc_id, project_id) == [expected]
+
+
+@pytest.mark.parametrize("expression", [
+    "{{ cycler.__init__.__globals__.os.getcwd() }}",
+    "{{ ''.__class__.__mro__[1].__subclasses__() }}",
+    "{{ lipsum.__globals__['os'].popen('id').read() }}",
+])
+def test_render_rejects_sandbox_escapes(client, templated_doc, expression):
+    doc_id = templated_doc(f"Header {expression}")
+    response = client.post("/render", params={"doc_id": doc_id})
+    assert response.status_code == 422
+    assert os.getcwd().encode() not in response.content
@@ -0,0 +1,221 @@
+import asyncio
+import hashlib
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from tools.web_crawler import page_fetcher
+from tools.web_crawler.page_cache import PageCache
+from tools.web_crawler.page_fetcher import PageFetcher, fetch_plain_texts
+
+LATENCY = 0.05
+LAST_MODIFIED = "Mon, 06 Jan 2025 00:00:0{} GMT"
+
+
+class StubServer(ThreadingHTTPServer):
+    """
+    One host; records when each request started, how many overlapped and each status.
+
+    ``/etag/...`` pages carry an ETag and ``/modified/...`` pages a
+    Last-Modified date, and both answer a matching conditional request with
+    304. ``/mirror/...`` pages all share one body. Bumping ``revision``
+    changes every body.
+    """
+
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), StubHandler)
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.starts = []
+        self.statuses = []
+        self.revision = 0
+
+    def url(self, path):
+        return f"http://127.0.0.1:{self.server_port}{path}"
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.starts.append(time.monotonic())
+            server.in_flight += 1
+            server.max_in_flight = max(server.max_in_flight, server.in_flight)
+        try:
+            if self.path == "/slow":
+                time.sleep(1.5)
+            else:
+                time.sleep(LATENCY)
+            if self.path == "/missing":
+                self.send_error(404)
+                return
+            if self.path == "/big":
+                body = b"x" * 4096
+            else:
+                text = "mirrored" if self.path.startswith("/mirror/") else self.path
+                revision = f" rev {server.revision}" if server.revision else ""
+                body = f"<p>{text}{revision}</p>".encode()
+            headers = {}
+            if self.path.startswith("/etag/"):
+                headers["ETag"] = f'"{hashlib.sha256(body).hexdigest()}"'
+                not_modified = self.headers.get("If-None-Match") == headers["ETag"]
+            elif self.path.startswith("/modified/"):
+                headers["Last-Modified"] = LAST_MODIFIED.format(server.revision)
+                not_modified = self.headers.get("If-Modified-Since") == headers["Last-Modified"]
+            else:
+                not_modified = False
+            server.statuses.append((self.path, 304 if not_modified else 200))
+            self.send_response(304 if not_modified else 200)
+            for name, value in headers.items():
+                self.send_header(name, value)
+            if not_modified:
+                self.end_headers()
+                return
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        finally:
+            with server.lock:
+                server.in_flight -= 1
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def servers():
+    servers = [StubServer() for _ in range(2)]
+    for server in servers:
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield servers
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.fixture(autouse=True)
+def echo_extract(monkeypatch):
+    # Stand in for trafilatura: the "extracted text" is the decoded body
+    monkeypatch.setattr(page_fetcher, "extract_page", lambda html: html.decode() if html else None)
+
+
+def crawl(fetcher, urls):
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        return asyncio.run(fetcher.fetch_and_extract(urls, executor))
+
+
+def test_results_keep_url_order_and_failures_are_none(servers):
+    a, b = servers
+    urls = [a.url("/page/1"), b.url("/page/2"), a.url("/missing"), None, "http://127.0.0.1:9/closed",
+            a.url("/page/3")]
+    results = crawl(PageFetcher(per_host_delay=0), urls)
+    assert results == ["<p>/page/1</p>", "<p>/page/2</p>", None, None, None, "<p>/page/3</p>"]
+
+
+def test_malformed_urls_are_none(servers, cache):
+    a, _ = servers
+    urls = [a.url("/page/1"), "http://exa\x00mple.com/", "http://[::1/", a.url("/page/\x00")]
+    assert crawl(PageFetcher(per_host_delay=0), urls) == ["<p>/page/1</p>", None, None, None]
+    assert crawl(PageFetcher(per_host_delay=0, cache=cache), urls) == ["<p>/page/1</p>", None, None, None]
+
+
+def test_per_host_concurrency_is_bounded(servers):
+    a, b = servers
+    urls = [server.url(f"/page/{i}") for i in range(12) for server in servers]
+    crawl(PageFetcher(max_concurrency=8, per_host_concurrency=2, per_host_delay=0), urls)
+    assert a.max_in_flight == b.max_in_flight == 2
+
+
+def test_requests_to_one_host_are_spaced(servers):
+    a, _ = servers
+    delay = 0.1
+    crawl(PageFetcher(per_host_concurrency=4, per_host_delay=delay), [a.url(f"/page/{i}") for i in range(5)])
+    starts = sorted(a.starts)
+    gaps = [later - earlier for earlier, later in zip(starts, starts[1:])]
+    assert min(gaps) >= delay * 0.9
+
+
+def test_slow_and_oversized_pages_are_dropped(servers):
+    a, _ = servers
+    start = time.monotonic()
+    results = crawl(PageFetcher(timeout=0.5, max_bytes=1024, per_host_delay=0),
+                    [a.url("/slow"), a.url("/big"), a.url("/page/1")])
+    assert results == [None, None, "<p>/page/1</p>"]
+    assert time.monotonic() - start < 1.4
+
+
+def test_fetcher_can_be_reused_across_event_loops(servers, monkeypatch):
+    a, b = servers
+    monkeypatch.setattr(page_fetcher, "ProcessPoolExecutor", ThreadPoolExecutor)
+    fetcher = PageFetcher(max_concurrency=2, per_host_concurrency=1, per_host_delay=0)
+    urls = [server.url(f"/page/{i}") for i in range(4) for server in servers]
+    for _ in range(2):
+        # Contention makes tasks wait on the semaphores, which binds them to the loop
+        assert fetch_plain_texts(urls, fetcher, extract_workers=2) == [f"<p>/page/{i}</p>" for i in range(4)
+                                                                       for _ in servers]
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = PageCache(str(tmp_path / "pages.sqlite3"))
+    yield cache
+    cache.close()
+
+
+@pytest.fixture
+def extractions(monkeypatch):
+    # Bodies actually sent to extraction, so reuse of cached text shows
+    extracted = []
+
+    def counting_extract(html):
+        extracted.append(html)
+        return html.decode() if html else None
+
+    monkeypatch.setattr(page_fetcher, "extract_page", counting_extract)
+    return extracted
+
+
+def test_unchanged_pages_are_revalidated_with_304(servers, cache, extractions):
+    a, _ = servers
+    urls = [a.url("/etag/1"), a.url("/modified/2")]
+    first = crawl(PageFetcher(per_host_delay=0, cache=cache), urls)
+    assert first == ["<p>/etag/1</p>", "<p>/modified/2</p>"]
+
+    a.statuses.clear()
+    assert crawl(PageFetcher(per_host_delay=0, cache=cache), urls) == first
+    assert sorted(a.statuses) == [("/etag/1", 304), ("/modified/2", 304)]
+    # The stored extraction is reused, nothing is parsed again
+    assert len(extractions) == 2
+
+    a.revision = 1
+    a.statuses.clear()
+    assert crawl(PageFetcher(per_host_delay=0, cache=cache), urls) == ["<p>/etag/1 rev 1</p>",
+                                                                       "<p>/modified/2 rev 1</p>"]
+    assert sorted(a.statuses) == [("/etag/1", 200), ("/modified/2", 200)]
+    assert len(extractions) == 4
+
+
+def test_offline_crawl_serves_cached_pages_without_requests(servers, cache, extractions):
+    a, _ = servers
+    crawl(PageFetcher(per_host_delay=0, cache=cache), [a.url("/page/1"), a.url("/etag/2")])
+    requests = len(a.starts)
+
+    results = crawl(PageFetcher(cache=cache, offline=True), [a.url("/page/1"), a.url("/etag/2"), a.url("/page/3")])
+    assert results == ["<p>/page/1</p>", "<p>/etag/2</p>", None]
+    assert len(a.starts) == requests
+    assert len(extractions) == 2
+
+
+def test_identical_bodies_are_extracted_once(servers, cache, extractions):
+    a, b = servers
+    assert crawl(PageFetcher(per_host_delay=0, cache=cache), [a.url("/mirror/1")]) == ["<p>mirrored</p>"]
+    assert crawl(PageFetcher(per_host_delay=0, cache=cache), [b.url("/mirror/2")]) == ["<p>mirrored</p>"]
+    assert len(extractions) == 1
+    assert cache.stats()["pages"] == 2
+    assert cache.stats()["bodies"] == 1
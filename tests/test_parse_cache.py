@@ -0,0 +1,115 @@
+import errno
+import os
+
+import pytest
+
+import api.frontend as frontend
+from api import parse_cache
+from api.parse_cache import ParseCache, link_or_copy
+
+
+def write(path, data):
+    with open(path, "wb") as f:
+        f.write(data)
+
+
+def read(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def test_replaces_a_linked_destination_without_writing_through_it(tmp_path):
+    old, shared, new = tmp_path / "old", tmp_path / "shared", tmp_path / "new"
+    write(old, b"old output")
+    os.link(old, shared)
+    write(new, b"new output")
+
+    link_or_copy(str(new), str(shared))
+
+    assert read(shared) == b"new output"
+    assert read(old) == b"old output"
+    assert os.path.samefile(new, shared)
+    assert sorted(os.listdir(tmp_path)) == ["new", "old", "shared"]
+
+
+@pytest.mark.parametrize("code", [errno.EXDEV, errno.EPERM])
+def test_copies_when_links_are_not_possible(tmp_path, monkeypatch, code):
+    def refuse(src, dst):
+        raise OSError(code, os.strerror(code))
+
+    monkeypatch.setattr(parse_cache.os, "link", refuse)
+    write(tmp_path / "src", b"template")
+    write(tmp_path / "dst", b"stale")
+
+    link_or_copy(str(tmp_path / "src"), str(tmp_path / "dst"))
+
+    assert read(tmp_path / "dst") == b"template"
+    assert not os.path.samefile(tmp_path / "src", tmp_path / "dst")
+    assert sorted(os.listdir(tmp_path)) == ["dst", "src"]
+
+
+def test_other_errors_raise_and_leave_nothing_behind(tmp_path):
+    write(tmp_path / "dst", b"kept")
+    with pytest.raises(FileNotFoundError):
+        link_or_copy(str(tmp_path / "missing"), str(tmp_path / "dst"))
+    assert read(tmp_path / "dst") == b"kept"
+    assert os.listdir(tmp_path) == ["dst"]
+
+
+def put(cache, tmp_path, content_hash):
+    upload = tmp_path / f"{content_hash}-upload.docx"
+    write(upload, content_hash.encode())
+    cache.put(content_hash, str(upload), {"paragraphs": [content_hash]}, {"tables": []})
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = ParseCache(str(tmp_path / "cache"), version="1", max_entries=2)
+    put(cache, tmp_path, "a")
+    put(cache, tmp_path, "b")
+    assert cache.get("a") is not None
+    put(cache, tmp_path, "c")
+
+    assert cache.get("b") is None
+    assert not os.path.exists(cache.blob_path("b"))
+    assert cache.get("a") == ({"paragraphs": ["a"]}, {"tables": []})
+    assert cache.get("c") is not None
+
+
+def test_entries_of_another_version_are_purged(tmp_path):
+    directory = str(tmp_path / "cache")
+    put(ParseCache(directory, version="1"), tmp_path, "a")
+
+    cache = ParseCache(directory, version="2")
+    assert not os.path.exists(cache.blob_path("a"))
+    assert cache.get("a") is None
+
+
+def test_entry_without_its_stored_file_is_dropped(tmp_path):
+    cache = ParseCache(str(tmp_path / "cache"), version="1")
+    put(cache, tmp_path, "a")
+    os.remove(cache.blob_path("a"))
+
+    assert cache.get("a") is None
+    # Dropped, not only missed: storing it again works as for a new entry
+    put(cache, tmp_path, "a")
+    assert cache.get("a") is not None
+    assert read(cache.blob_path("a")) == b"a"
+
+
+def test_eviction_between_lookup_and_restore_is_a_miss(tmp_path, monkeypatch):
+    cache = ParseCache(str(tmp_path / "cache"), version="1")
+    put(cache, tmp_path, "a")
+    get = cache.get
+
+    def get_then_evict(content_hash):
+        entry = get(content_hash)
+        os.remove(cache.blob_path(content_hash))
+        return entry
+
+    monkeypatch.setattr(cache, "get", get_then_evict)
+    monkeypatch.setattr(frontend, "parse_cache", cache)
+    upload = tmp_path / "upload.docx"
+    write(upload, b"uploaded")
+
+    assert frontend.restore_cached_parse("a", str(upload)) is None
+    assert read(upload) == b"uploaded"
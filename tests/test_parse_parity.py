@@ -0,0 +1,42 @@
+import glob
+
+import docx
+import pytest
+
+from api.frontend import parse_docx
+from tools.doc_parser.docx_stream import parse_docx_stream
+
+SAMPLES = sorted(set(glob.glob(".build/test_data/*.docx") + glob.glob("tools/*/*.docx")))
+
+
+def merged_document(path):
+    """A document exercising gridSpan, vMerge, a nested table and a checkbox."""
+    document = docx.Document()
+    document.add_paragraph("Job Safety Analysis", style="Title")
+    document.add_paragraph("☐ Permit required")
+    table = document.add_table(rows=4, cols=4)
+    for r_idx, row in enumerate(table.rows):
+        for c_idx, cell in enumerate(row.cells):
+            cell.text = f"r{r_idx}c{c_idx}"
+    # gridSpan across the header, vMerge down the first column
+    table.cell(0, 0).merge(table.cell(0, 2)).text = "Spanning header"
+    table.cell(1, 0).merge(table.cell(3, 0)).text = "Merged step"
+    nested = table.cell(2, 3).add_table(rows=2, cols=2)
+    nested.cell(0, 0).text = "Nested"
+    nested.cell(1, 1).text = "☒ Done"
+    run = document.add_paragraph().add_run("Bold trailing text")
+    run.bold = True
+    document.save(path)
+    return str(path)
+
+
+@pytest.mark.parametrize("path", SAMPLES)
+def test_engines_agree_on_samples(path):
+    assert parse_docx_stream(path) == parse_docx(path)
+
+
+def test_engines_agree_on_merged_and_nested_cells(tmp_path):
+    path = merged_document(tmp_path / "merged.docx")
+    structure, index = parse_docx_stream(path)
+    assert (structure, index) == parse_docx(path)
+    assert structure["tables"] and any(t["rows"] for t in structure["tables"])
@@ -0,0 +1,137 @@
+import glob
+import io
+import os
+
+import docx
+import pytest
+from fastapi.testclient import TestClient
+
+import api.frontend as frontend
+from tools.user_input_jinja import add_table_row, apply_template_operations, get_template_input_store
+
+DATA_JSON = os.path.join("web", "data.json")
+HEADERS = ("Job Steps", "Potential Hazards", "Hazard Controls")
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    # /process also writes the shared template and web/data.json; keep the tree as it was
+    monkeypatch.setattr(frontend, "TEMPLATE_PATH", str(tmp_path / "doc_template.docx"))
+    with open(DATA_JSON, "rb") as f:
+        data_json = f.read()
+    doc_ids = []
+    with TestClient(frontend.app) as client:
+        client.doc_ids = doc_ids
+        yield client
+    with open(DATA_JSON, "wb") as f:
+        f.write(data_json)
+    for doc_id in doc_ids:
+        for path in glob.glob(os.path.join(frontend.UPLOAD_DIR, f"{doc_id}*")):
+            os.remove(path)
+
+
+def jsa_docx(headers=HEADERS, signature_row=True) -> bytes:
+    """A table with a header row, three blank data rows and, by default, a merged signature row."""
+    document = docx.Document()
+    table = document.add_table(rows=5 if signature_row else 4, cols=len(headers))
+    for cell, text in zip(table.rows[0].cells, headers):
+        cell.text = text
+    if signature_row:
+        signature = table.rows[4].cells[0].merge(table.rows[4].cells[-1])
+        signature.text = "Supervisor signature:"
+    buffer = io.BytesIO()
+    document.save(buffer)
+    return buffer.getvalue()
+
+
+def upload(client, data=None) -> str:
+    data = data or jsa_docx()
+    response = client.post("/upload", files={"file": ("jsa.docx", data, frontend.DOCX_MEDIA_TYPE)})
+    assert response.status_code == 200
+    doc_id = response.json()["doc_id"]
+    client.doc_ids.append(doc_id)
+    return doc_id
+
+
+def process(client, doc_id, columns):
+    selections = [{"id": f"t_0_col_{c}", "variable_name": name, "description": ""} for c, name in columns]
+    return client.post("/process", json={"doc_id": doc_id, "selections": selections})
+
+
+def rendered_rows(client, doc_id, project_id):
+    response = client.post("/render", params={"doc_id": doc_id, "project_id": project_id})
+    assert response.status_code == 200
+    table = docx.Document(io.BytesIO(response.content)).tables[0]
+    return [[cell.text for cell in row.cells] for row in table.rows]
+
+
+def test_column_loop_renders_stored_table_rows(client):
+    project_id = "test-table-rows"
+    get_template_input_store(project_id).replace({})
+    add_table_row("Set up ladder", "Falls", "Three points of contact", project_id)
+    add_table_row("Cut block", "Silica dust", "Wet cutting", project_id)
+
+    doc_id = upload(client)
+    response = process(client, doc_id, [(0, "job_steps"), (1, "potential_hazards"), (2, "hazard_controls")])
+    assert response.status_code == 200
+
+    rows = rendered_rows(client, doc_id, project_id)
+    assert rows[0] == list(HEADERS)
+    assert rows[1:3] == [
+        ["Set up ladder", "Falls", "Three points of contact"],
+        ["Cut block", "Silica dust", "Wet cutting"],
+    ]
+    # The signature row after the data rows is kept
+    assert rows[3:] == [["Supervisor signature:"] * 3]
+
+
+def test_other_columns_of_a_jsa_read_their_own_key(client):
+    project_id = "test-table-rows-ppe"
+    get_template_input_store(project_id).replace({})
+    apply_template_operations([("table_rows", {"step": "Weld brackets", "hazard": "Burns",
+                                               "mitigation": "Fire watch", "ppe_required": "Welding hood"})],
+                              project_id)
+    add_table_row("Sweep up", "Dust", "Wet sweeping", project_id)
+
+    doc_id = upload(client, jsa_docx(HEADERS + ("PPE Required",)))
+    response = process(client, doc_id, [(0, "job_steps"), (1, "potential_hazards"),
+                                        (2, "hazard_controls"), (3, "ppe_required")])
+    assert response.status_code == 200
+    assert "ppe_required" in response.json()["mapping"]["ppe_required"]
+
+    rows = rendered_rows(client, doc_id, project_id)
+    assert rows[1:3] == [
+        ["Weld brackets", "Burns", "Fire watch", "Welding hood"],
+        ["Sweep up", "Dust", "Wet sweeping", ""],
+    ]
+    assert rows[3:] == [["Supervisor signature:"] * 4]
+
+
+def test_columns_of_other_tables_keep_a_placeholder_per_row(client):
+    project_id = "test-table-rows-signoff"
+    get_template_input_store(project_id).replace({})
+    add_table_row("Set up ladder", "Falls", "Three points of contact", project_id)
+
+    headers = ("Employee Name", "Signature", "Date")
+    doc_id = upload(client, jsa_docx(headers, signature_row=False))
+    response = process(client, doc_id, [(0, "employee_name"), (2, "activity_date")])
+    assert response.status_code == 200
+    assert set(response.json()["mapping"]) == {
+        "employee_name_1", "employee_name_2", "employee_name_3",
+        "activity_date_1", "activity_date_2", "activity_date_3",
+    }
+
+    templated = docx.Document(os.path.join(frontend.UPLOAD_DIR, f"{doc_id}_templated.docx")).tables[0]
+    assert [[cell.text for cell in row.cells] for row in templated.rows] == [
+        list(headers),
+        *[[f"{{{{ employee_name_{r} }}}}", "", f"{{{{ activity_date_{r} }}}}"] for r in (1, 2, 3)],
+    ]
+    # Not looped over table_rows: the table keeps its rows
+    assert len(rendered_rows(client, doc_id, project_id)) == 4
+
+
+def test_out_of_range_column_leaves_table_alone(client):
+    doc_id = upload(client)
+    assert process(client, doc_id, [(99, "job_steps")]).status_code == 200
+    rows = rendered_rows(client, doc_id, "default")
+    assert len(rows) == 5
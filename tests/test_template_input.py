@@ -0,0 +1,56 @@
+import uuid
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import app
+from tools import user_input_jinja
+from tools.user_input_jinja import default_template_payload
+
+
+@pytest.fixture
+def client():
+    with TestClient(app) as client:
+        yield client
+
+
+@pytest.fixture
+def project_id():
+    return f"test-{uuid.uuid4().hex[:12]}"
+
+
+def shard_path(project_id):
+    return user_input_jinja.TEMPLATE_INPUT_SHARD_DIR / f"{project_id}.sqlite3"
+
+
+def test_reads_of_an_unknown_project_create_no_shard(client, project_id):
+    context = client.get(f"/api/projects/{project_id}/template/context")
+    steps = client.get(f"/api/projects/{project_id}/template/section/steps")
+
+    assert context.status_code == steps.status_code == 200
+    assert context.json()["steps"] == [] and context.json()["metadata"] == {}
+    assert steps.json() == {"steps": []}
+    assert user_input_jinja.load_template_input_data(project_id) == default_template_payload()
+    assert user_input_jinja.load_user_input_data(project_id) == []
+    assert not shard_path(project_id).exists()
+
+
+def test_first_write_creates_the_shard_and_reads_see_it(client, project_id):
+    etag = client.get(f"/api/projects/{project_id}/template/section/steps").headers["ETag"]
+
+    response = client.post(f"/api/projects/{project_id}/template/steps", json={"entry": "Set up ladder"})
+    assert response.status_code == 200
+    assert shard_path(project_id).exists()
+
+    steps = client.get(f"/api/projects/{project_id}/template/section/steps", headers={"If-None-Match": etag})
+    assert steps.status_code == 200
+    assert steps.json() == {"steps": ["Set up ladder"]}
+
+
+@pytest.mark.parametrize("name, field", [
+    ("step", "step"), ("Job_Steps", "step"), ("potential_hazards", "hazard"), ("hazard_controls", "mitigation"),
+    ("ppe_required", None), ("responsible_person", None), ("controller_name", None),
+    ("activity_date", None), ("risk_assessment_date", None), ("recommended_action", None),
+])
+def test_table_row_field_matches_whole_names_only(name, field):
+    assert user_input_jinja.table_row_field(name) == field
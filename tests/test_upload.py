@@ -0,0 +1,125 @@
+import asyncio
+import glob
+import io
+import os
+import uuid
+
+import docx
+import pytest
+from fastapi.testclient import TestClient
+
+import api.frontend as frontend
+
+BOUNDARY = "testboundary"
+CHUNK = 64 * 1024
+
+
+@pytest.fixture(autouse=True)
+def remove_uploads():
+    before = set(glob.glob(os.path.join(frontend.UPLOAD_DIR, "*.docx*")))
+    yield
+    leftover = set(glob.glob(os.path.join(frontend.UPLOAD_DIR, "*.docx*"))) - before
+    for path in leftover:
+        os.remove(path)
+    assert not [path for path in leftover if path.endswith(".part")]
+
+
+def docx_bytes() -> bytes:
+    buffer = io.BytesIO()
+    document = docx.Document()
+    document.add_paragraph("Company Name:")
+    document.save(buffer)
+    return buffer.getvalue()
+
+
+def upload(filename, payload_chunks, content_length=None):
+    """
+    Send one file part to /upload straight through ASGI, one message per chunk.
+
+    Returns the response status and how many body messages the app pulled,
+    which shows how early it stopped reading.
+    """
+    head = (f"--{BOUNDARY}\r\nContent-Disposition: form-data; name=\"file\"; "
+            f"filename=\"{filename}\"\r\nContent-Type: application/octet-stream\r\n\r\n").encode()
+    messages = [head, *payload_chunks, f"\r\n--{BOUNDARY}--\r\n".encode()]
+    headers = [(b"content-type", f"multipart/form-data; boundary={BOUNDARY}".encode())]
+    if content_length is not None:
+        headers.append((b"content-length", str(content_length).encode()))
+    scope = {"type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "POST",
+             "scheme": "http", "path": "/upload", "raw_path": b"/upload", "root_path": "",
+             "query_string": b"", "headers": headers, "client": ("127.0.0.1", 1), "server": ("test", 80)}
+    pulled = 0
+    status = []
+
+    async def receive():
+        nonlocal pulled
+        if pulled == len(messages):
+            return {"type": "http.disconnect"}
+        pulled += 1
+        return {"type": "http.request", "body": messages[pulled - 1], "more_body": pulled < len(messages)}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            status.append(message["status"])
+
+    asyncio.run(frontend.app(scope, receive, send))
+    return status[0], pulled
+
+
+def test_upload_parses_docx():
+    with TestClient(frontend.app) as client:
+        response = client.post("/upload", files={"file": ("jsa.docx", docx_bytes(), frontend.DOCX_MEDIA_TYPE)})
+    assert response.status_code == 200
+    assert response.json()["structure"]["paragraphs"][0]["text"] == "Company Name:"
+
+
+def test_repeat_upload_is_served_from_the_parse_cache(monkeypatch):
+    parsed = []
+
+    def counting_parse(filepath):
+        parsed.append(filepath)
+        return frontend.parse_docx(filepath)
+
+    monkeypatch.setitem(frontend.PARSE_ENGINES, "docx", counting_parse)
+    # Unique bytes, so the first upload can't hit an entry left by an earlier run
+    document = docx.Document()
+    document.add_paragraph(f"Company Name: {uuid.uuid4()}")
+    buffer = io.BytesIO()
+    document.save(buffer)
+    data = buffer.getvalue()
+
+    with TestClient(frontend.app) as client:
+        first = client.post("/upload", files={"file": ("jsa.docx", data, frontend.DOCX_MEDIA_TYPE)})
+        assert len(parsed) == 1
+        second = client.post("/upload", files={"file": ("jsa.docx", data, frontend.DOCX_MEDIA_TYPE)})
+    assert len(parsed) == 1
+    assert first.json()["structure"] == second.json()["structure"]
+    second_id = second.json()["doc_id"]
+    assert os.path.exists(os.path.join(frontend.UPLOAD_DIR, f"{second_id}.docx"))
+    assert frontend.structure_store.get(second_id) is not None
+
+
+def test_chunked_upload_parses_docx():
+    data = docx_bytes()
+    chunks = [data[i:i + 1000] for i in range(0, len(data), 1000)]
+    assert upload("jsa.docx", chunks) == (200, len(chunks) + 2)
+
+
+def test_non_zip_upload_is_rejected_at_its_first_chunk():
+    assert upload("notes.docx", [b"not a zip " * 6554] * 100) == (400, 2)
+
+
+def test_wrong_extension_is_rejected_after_the_part_headers():
+    assert upload("notes.txt", [b"PK\x03\x04" + bytes(CHUNK)] * 100) == (400, 1)
+
+
+def test_oversized_upload_is_rejected_when_it_crosses_the_limit(monkeypatch):
+    monkeypatch.setattr(frontend, "MAX_UPLOAD_BYTES", 4 * CHUNK)
+    status, pulled = upload("big.docx", [b"PK\x03\x04" + bytes(CHUNK - 4)] + [bytes(CHUNK)] * 99)
+    assert status == 413
+    assert pulled == 6
+
+
+def test_declared_length_over_the_limit_is_rejected_before_reading(monkeypatch):
+    monkeypatch.setattr(frontend, "MAX_UPLOAD_BYTES", 4 * CHUNK)
+    assert upload("big.docx", [bytes(CHUNK)] * 100, content_length=100 * CHUNK) == (413, 0)
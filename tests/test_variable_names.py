@@ -0,0 +1,79 @@
+import io
+import os
+
+import docx
+import pytest
+from fastapi.testclient import TestClient
+
+import api.frontend as frontend
+from tools.variable_names import suggest_name
+
+THRESHOLD = 0.75
+
+
+@pytest.mark.parametrize("text", [
+    "John Smith\nJane Doe",
+    "ABC Construction Inc",
+    "Wear gloves at all times",
+    "Set up the extension ladder against the roof edge before climbing.",
+])
+def test_values_and_phrases_go_to_the_llm(text):
+    _, confidence = suggest_name(text)
+    assert confidence < THRESHOLD
+
+
+@pytest.mark.parametrize("text, header, expected", [
+    ("Employee Number:", None, "employee_number"),
+    ("1. JSA BY:\nList personnel who developed the JSA.", None, "jsa_by"),
+    ("Set up ladder", "Job Steps", "job_steps"),
+    ("John Smith", "Supervisor:", "supervisor"),
+])
+def test_labels_and_headers_are_named_locally(text, header, expected):
+    name, confidence = suggest_name(text, header)
+    assert name == expected
+    assert confidence >= THRESHOLD
+
+
+class FailingClients:
+    # Stands in for the configured OpenAI clients; any LLM call fails the test
+    client = object()
+
+    def start(self):
+        pass
+
+    async def close(self):
+        pass
+
+
+def test_header_row_is_named_without_the_llm(monkeypatch):
+    async def no_llm(client, chunk):
+        raise AssertionError(f"LLM called for {chunk}")
+
+    monkeypatch.setattr(frontend, "openai_clients", FailingClients())
+    monkeypatch.setattr(frontend, "generate_region_suggestions", no_llm)
+
+    document = docx.Document()
+    table = document.add_table(rows=2, cols=3)
+    for cell, text in zip(table.rows[0].cells, ("Job Step", "Potential Hazards", "Date")):
+        cell.text = text
+    table.rows[1].cells[0].text = "Set up ladder"
+    buffer = io.BytesIO()
+    document.save(buffer)
+
+    with TestClient(frontend.app) as client:
+        doc_id = client.post(
+            "/upload", files={"file": ("jsa.docx", buffer.getvalue(), frontend.DOCX_MEDIA_TYPE)}).json()["doc_id"]
+        try:
+            response = client.get(f"/suggest/{doc_id}")
+        finally:
+            os.remove(os.path.join(frontend.UPLOAD_DIR, f"{doc_id}.docx"))
+
+    assert response.status_code == 200
+    assert "error" not in response.json()
+    names = {s["id"]: s["suggested_name"] for s in response.json()["suggestions"]}
+    assert names == {
+        "t_0_r_0_c_0": "job_step",
+        "t_0_r_0_c_1": "potential_hazards",
+        "t_0_r_0_c_2": "date",
+        "t_0_r_1_c_0": "job_step_1",
+    }
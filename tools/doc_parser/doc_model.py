@@ -0,0 +1,229 @@
+import sys
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from tools.doc_parser.element_index import ElementIndex
+
+CHECKBOX_CHARS = ("☐", "☑", "☒")
+ALIGNMENTS = ("left", "center", "right", "justify")
+ALIGNMENT_CODES = {name: code for code, name in enumerate(ALIGNMENTS)}
+
+# Run formatting is packed into one int. Bold and italic are tri-state
+# (None / False / True) and take two bits each; underline needs the full
+# WD_UNDERLINE range so it takes the bits above them.
+_TRISTATE = (None, False, True)
+BOLD_SHIFT = 0
+ITALIC_SHIFT = 2
+UNDERLINE_SHIFT = 4
+
+
+def _encode_tristate(value: Optional[bool]) -> int:
+    return 0 if value is None else 2 if value else 1
+
+
+def _encode_underline(value) -> int:
+    # 0 inherit, 1 none, 2 single, 3 + n for any other WD_UNDERLINE value n
+    if value is None:
+        return 0
+    if value is True or value is False:
+        return 2 if value else 1
+    return 3 + int(value)
+
+
+def _decode_underline(code: int):
+    if code < 3:
+        return _TRISTATE[code]
+    return code - 3
+
+
+def pack_formatting(formatting: Dict[str, Any]) -> int:
+    """Pack a ``{"bold", "italic", "underline"}`` dict into a bitfield."""
+    return (
+        _encode_tristate(formatting.get("bold")) << BOLD_SHIFT
+        | _encode_tristate(formatting.get("italic")) << ITALIC_SHIFT
+        | _encode_underline(formatting.get("underline")) << UNDERLINE_SHIFT
+    )
+
+
+def unpack_formatting(flags: int) -> Dict[str, Any]:
+    return {
+        "bold": _TRISTATE[(flags >> BOLD_SHIFT) & 3],
+        "italic": _TRISTATE[(flags >> ITALIC_SHIFT) & 3],
+        "underline": _decode_underline(flags >> UNDERLINE_SHIFT),
+    }
+
+
+def _has_checkbox(text: str) -> bool:
+    return any(cb in text for cb in CHECKBOX_CHARS)
+
+
+class Run:
+    __slots__ = ("text", "flags")
+
+    def __init__(self, text: str, flags: int):
+        self.text = text
+        self.flags = flags
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"text": self.text, "formatting": unpack_formatting(self.flags)}
+
+
+class Paragraph:
+    __slots__ = ("text", "style", "alignment_code", "runs")
+
+    def __init__(self, text: str, style: Optional[str], alignment_code: int, runs: Tuple[Run, ...]):
+        self.text = text
+        self.style = style
+        self.alignment_code = alignment_code
+        self.runs = runs
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Paragraph":
+        style = data.get("style")
+        return cls(
+            data.get("text", ""),
+            sys.intern(style) if style is not None else None,
+            ALIGNMENT_CODES.get(data.get("alignment"), 0),
+            tuple(Run(r.get("text", ""), pack_formatting(r.get("formatting", {})))
+                  for r in data.get("runs", [])),
+        )
+
+    @property
+    def alignment(self) -> str:
+        return ALIGNMENTS[self.alignment_code]
+
+    @property
+    def has_checkbox(self) -> bool:
+        return _has_checkbox(self.text)
+
+    @property
+    def is_blank(self) -> bool:
+        return not self.text.strip()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "text": self.text,
+            "style": self.style,
+            "alignment": self.alignment,
+            "runs": [r.to_dict() for r in self.runs],
+        }
+
+
+class Cell:
+    """Table cell; its text is derived from its paragraphs rather than stored twice."""
+
+    __slots__ = ("paragraphs",)
+
+    def __init__(self, paragraphs: Tuple[Paragraph, ...]):
+        self.paragraphs = paragraphs
+
+    @property
+    def text(self) -> str:
+        return "\n".join(p.text for p in self.paragraphs)
+
+    @property
+    def has_checkbox(self) -> bool:
+        return any(p.has_checkbox for p in self.paragraphs)
+
+    @property
+    def is_blank(self) -> bool:
+        return all(p.is_blank for p in self.paragraphs)
+
+
+class Table:
+    __slots__ = ("rows", "num_columns")
+
+    def __init__(self, rows: Tuple[Tuple[Cell, ...], ...], num_columns: int):
+        self.rows = rows
+        self.num_columns = num_columns
+
+
+class DocumentModel:
+    """
+    Compact in-memory form of the ``parse_docx`` structure.
+
+    Every node uses ``__slots__``, style names are interned, run formatting is
+    a packed int and cell text is derived from the cell's paragraphs. Cells
+    repeated by a horizontal merge share one ``Cell`` object. Element ids
+    (``p_i``, ``t_i_r_j_c_k``) are positional and not stored at all.
+
+    Use ``from_dict`` to build it from the JSON structure and ``to_dict`` to
+    produce that structure again at the API boundary. ``index`` is the
+    ``ElementIndex`` produced by the same parse, or ``None`` when unknown.
+    """
+
+    __slots__ = ("paragraphs", "tables", "index")
+
+    def __init__(self, paragraphs: Tuple[Paragraph, ...], tables: Tuple[Table, ...],
+                 index: Optional[ElementIndex] = None):
+        self.paragraphs = paragraphs
+        self.tables = tables
+        self.index = index
+
+    @classmethod
+    def from_dict(cls, structure: Dict[str, Any],
+                  index: Optional[Dict[str, Any]] = None) -> "DocumentModel":
+        paragraphs = tuple(Paragraph.from_dict(p) for p in structure.get("paragraphs", []))
+
+        tables = []
+        for t in structure.get("tables", []):
+            rows = []
+            for row in t.get("rows", []):
+                cells = []
+                prev_data, prev_cell = None, None
+                for c in row:
+                    cell_paragraphs = c.get("paragraphs", [])
+                    if prev_cell is not None and cell_paragraphs == prev_data:
+                        cells.append(prev_cell)
+                        continue
+                    prev_data = cell_paragraphs
+                    prev_cell = Cell(tuple(Paragraph.from_dict(p) for p in cell_paragraphs))
+                    cells.append(prev_cell)
+                rows.append(tuple(cells))
+            tables.append(Table(tuple(rows), t.get("num_columns", 0)))
+
+        return cls(paragraphs, tuple(tables),
+                   ElementIndex.from_dict(index) if index is not None else None)
+
+    def iter_paragraphs(self) -> Iterator[Tuple[str, Paragraph]]:
+        for i, p in enumerate(self.paragraphs):
+            yield f"p_{i}", p
+
+    def iter_cells(self) -> Iterator[Tuple[str, int, int, int, Cell]]:
+        """Yield ``(id, table_idx, row_idx, col_idx, cell)`` for every table cell."""
+        for t_idx, table in enumerate(self.tables):
+            for r_idx, row in enumerate(table.rows):
+                for c_idx, cell in enumerate(row):
+                    yield f"t_{t_idx}_r_{r_idx}_c_{c_idx}", t_idx, r_idx, c_idx, cell
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Serialize back to the ``{"paragraphs": [...], "tables": [...]}`` JSON shape."""
+        paragraphs = []
+        for p_id, p in self.iter_paragraphs():
+            paragraphs.append({
+                "id": p_id,
+                "text": p.text,
+                "style": p.style,
+                "alignment": p.alignment,
+                "runs": [r.to_dict() for r in p.runs],
+                "has_checkbox": p.has_checkbox,
+                "is_blank": p.is_blank,
+            })
+
+        tables: List[Dict[str, Any]] = []
+        for t_idx, table in enumerate(self.tables):
+            rows = []
+            for r_idx, row in enumerate(table.rows):
+                cells = []
+                for c_idx, cell in enumerate(row):
+                    text = cell.text
+                    cells.append({
+                        "id": f"t_{t_idx}_r_{r_idx}_c_{c_idx}",
+                        "text": text,
+                        "paragraphs": [p.to_dict() for p in cell.paragraphs],
+                        "has_checkbox": _has_checkbox(text),
+                        "is_blank": not text.strip(),
+                    })
+                rows.append(cells)
+            tables.append({"id": f"t_{t_idx}", "rows": rows, "num_columns": table.num_columns})
+
+        return {"paragraphs": paragraphs, "tables": tables}
@@ -0,0 +1,169 @@
+import copy
+from typing import Callable, Dict, List, Optional, Tuple
+
+from lxml import etree
+
+from tools.doc_parser.docx_stream import DOCUMENT_PART, W_BODY, W_P, W_R, W_T, W_TC, W_TR, _w
+from tools.doc_parser.element_index import ElementIndex
+from tools.doc_parser.raw_zip import ArchiveWriter, read_members
+
+W_PPR = _w("pPr")
+W_RPR = _w("rPr")
+W_TCPR = _w("tcPr")
+XML_SPACE = "{http://www.w3.org/XML/1998/namespace}space"
+
+
+def _make_run(rpr, text: str):
+    r = etree.Element(W_R)
+    if rpr is not None:
+        r.append(copy.deepcopy(rpr))
+    t = etree.SubElement(r, W_T)
+    t.text = text
+    if text != text.strip():
+        t.set(XML_SPACE, "preserve")
+    return r
+
+
+def _template_run_properties(elem):
+    """Return the ``w:rPr`` of the first run with text under ``elem`` (else the first run)."""
+    first = None
+    for r in elem.iter(W_R):
+        if r.find(W_T) is not None:
+            return r.find(W_RPR)
+        if first is None:
+            first = r
+    return first.find(W_RPR) if first is not None else None
+
+
+def set_paragraph_text(p, text: str) -> None:
+    """
+    Replace the content of a ``w:p`` with one run of ``text``.
+
+    Paragraph properties are kept and the new run takes the formatting of the
+    paragraph's first run, so a placeholder looks like the text it replaces.
+    """
+    rpr = _template_run_properties(p)
+    for child in list(p):
+        if child.tag != W_PPR:
+            p.remove(child)
+    p.append(_make_run(rpr, text))
+
+
+def set_cell_text(tc, text: str) -> None:
+    """
+    Replace the content of a ``w:tc`` with one paragraph holding ``text``.
+
+    Cell properties and the first paragraph's properties are kept and the
+    run takes the formatting of the cell's first run.
+    """
+    rpr = _template_run_properties(tc)
+    first_p = tc.find(W_P)
+    for child in list(tc):
+        if child.tag != W_TCPR and child is not first_p:
+            tc.remove(child)
+    if first_p is None:
+        first_p = etree.SubElement(tc, W_P)
+    for child in list(first_p):
+        if child.tag != W_PPR:
+            first_p.remove(child)
+    first_p.append(_make_run(rpr, text))
+
+
+class RowLoop:
+    """
+    Turn one table row into a Jinja loop body.
+
+    ``loop_row`` is wrapped in ``{%tr for <target> in <iterable> %}`` and
+    ``{%tr endfor %}`` rows, and the ``removed_rows`` it stands in for are
+    dropped. Row numbers are ``w:tr`` positions in the table.
+    """
+
+    __slots__ = ("loop_row", "removed_rows", "target", "iterable")
+
+    def __init__(self, loop_row: int, removed_rows: List[int], target: str = "row",
+                 iterable: str = "table_rows"):
+        self.loop_row = loop_row
+        self.removed_rows = removed_rows
+        self.target = target
+        self.iterable = iterable
+
+
+def _tag_row(tag: str):
+    tr = etree.Element(W_TR)
+    tc = etree.SubElement(tr, W_TC)
+    etree.SubElement(tc, W_P).append(_make_run(None, tag))
+    return tr
+
+
+def template_document_xml(xml: bytes, index: ElementIndex, paragraph_texts: Dict[int, str],
+                          cell_texts: Dict[Tuple[int, int, int], str],
+                          row_loops: Optional[Dict[int, RowLoop]] = None) -> bytes:
+    """
+    Apply text replacements and row loops to a ``word/document.xml`` payload.
+
+    :param paragraph_texts: Paragraph index (``p_i``) to new text.
+    :param cell_texts: ``(table_idx, w:tr position, w:tc position)`` to new text,
+        as given by ``ElementIndex.cell_location``.
+    :param row_loops: Table index to the ``RowLoop`` applied to that table.
+    """
+    root = etree.fromstring(xml, etree.XMLParser(huge_tree=True))
+    body = list(root.find(W_BODY))
+
+    for p_idx, text in paragraph_texts.items():
+        position = index.paragraph_position(p_idx)
+        if position is not None:
+            set_paragraph_text(body[position], text)
+
+    rows: Dict[int, List] = {}
+
+    def table_rows(t_idx: int) -> List:
+        # Captured before any row is added or removed, so positions stay valid
+        if t_idx not in rows:
+            rows[t_idx] = body[index.tables[t_idx].body_index].findall(W_TR)
+        return rows[t_idx]
+
+    for (t_idx, tr_idx, tc_idx), text in cell_texts.items():
+        set_cell_text(table_rows(t_idx)[tr_idx].findall(W_TC)[tc_idx], text)
+
+    for t_idx, loop in (row_loops or {}).items():
+        trs = table_rows(t_idx)
+        loop_tr = trs[loop.loop_row]
+        loop_tr.addprevious(_tag_row(f"{{%tr for {loop.target} in {loop.iterable} %}}"))
+        loop_tr.addnext(_tag_row("{%tr endfor %}"))
+        for tr_idx in loop.removed_rows:
+            trs[tr_idx].getparent().remove(trs[tr_idx])
+
+    return etree.tostring(root, xml_declaration=True, encoding="UTF-8", standalone=True)
+
+
+def replace_part(src: str, dest: str, part: str, transform: Callable[[bytes], bytes]) -> None:
+    """
+    Write a copy of the ZIP ``src`` to ``dest`` with ``part`` passed through ``transform``.
+
+    Every other member is copied as its raw compressed bytes, so the cost is
+    a file copy plus recompressing the one changed part.
+    """
+    with open(src, "rb") as f:
+        members, comment = read_members(f)
+    with open(dest, "wb") as out:
+        writer = ArchiveWriter(out)
+        for member in members:
+            if member.name == part:
+                writer.write(member, transform(member.read()))
+            else:
+                writer.copy(member)
+        writer.close(comment)
+
+
+def patch_docx(src: str, dest: str, index: ElementIndex, paragraph_texts: Dict[int, str],
+               cell_texts: Dict[Tuple[int, int, int], str],
+               row_loops: Optional[Dict[int, RowLoop]] = None) -> None:
+    """
+    Write ``src`` to ``dest`` with the given paragraphs and cells replaced.
+
+    Only ``word/document.xml`` is rewritten, and inside it only the targeted
+    ``w:p``, ``w:tc`` and looped ``w:tr`` nodes change; see
+    ``template_document_xml``.
+    """
+    replace_part(src, dest, DOCUMENT_PART,
+                 lambda xml: template_document_xml(xml, index, paragraph_texts, cell_texts, row_loops))
@@ -0,0 +1,190 @@
+import hashlib
+import io
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, BinaryIO, Dict, List
+
+import jinja2
+from jinja2.sandbox import ImmutableSandboxedEnvironment
+
+from tools.doc_parser.raw_zip import ArchiveWriter, RawMember, read_members
+
+# Parts of a DOCX that may hold user-visible placeholders
+TEMPLATE_PARTS = re.compile(r"^word/(document|header\d*|footer\d*|footnotes|endnotes)\.xml$")
+
+# XML tags wedged between the two characters of a Jinja delimiter, e.g. "{</w:t>...<w:t>{"
+SPLIT_DELIMITER = re.compile(r"(?<=\{)(<[^>]*>)+(?=[\{%#])|(?<=[%\}#])(<[^>]*>)+(?=\})")
+# A Jinja tag up to its closing delimiter, possibly spanning several runs
+JINJA_TAG = re.compile(r"\{%(?:(?!%\}).)*|\{#(?:(?!#\}).)*|\{\{(?:(?!\}\}).)*", re.DOTALL)
+RUN_BREAK = re.compile(r"</w:t>.*?(<w:t>|<w:t [^>]*>)", re.DOTALL)
+TAG_BODY = re.compile(r"(?<=\{[\{%])([^\}%]*)(?=[\}%]\})")
+# "{%tr ... %}", "{%tc ... %}" and "{%p ... %}" replace their whole enclosing element
+STRUCTURAL_TAGS = [
+    re.compile(r"<w:%s[ >](?:(?!<w:%s[ >]).)*(\{%%|\{\{)%s ([^}%%]*(?:%%\}|\}\})).*?</w:%s>"
+               % (tag, tag, tag, tag), re.DOTALL)
+    for tag in ("tr", "tc", "p")
+]
+TAG_UNESCAPES = (
+    ("‘", "'"), ("’", "'"), ("“", '"'), ("”", '"'),
+    ("&quot;", '"'), ("&apos;", "'"), ("&lt;", "<"), ("&gt;", ">"), ("&amp;", "&"),
+)
+
+# Template text comes from uploaded documents, so it is evaluated in the sandbox:
+# attribute access like ``__globals__`` and mutating calls raise SecurityError.
+# Rendered values land inside XML text nodes, so they are always escaped.
+JINJA_ENV = ImmutableSandboxedEnvironment(autoescape=True)
+
+
+def _unescape_tag(match: re.Match) -> str:
+    text = match.group(0)
+    for old, new in TAG_UNESCAPES:
+        text = text.replace(old, new)
+    return text
+
+
+def repair_xml(xml: str) -> str:
+    """
+    Turn Word XML into valid Jinja source.
+
+    Word freely splits typed text into several runs, so ``{{ name }}`` may
+    arrive as ``{{ na</w:t></w:r><w:r><w:t>me }}``. The run boundaries inside
+    each tag are removed, entity-escaped and typographic quotes inside tags
+    are restored to plain characters, and ``{%tr %}``/``{%tc %}``/``{%p %}``
+    tags replace the table row, cell or paragraph that contains them, which
+    is how a loop repeats whole rows.
+    """
+    xml = SPLIT_DELIMITER.sub("", xml)
+    xml = JINJA_TAG.sub(lambda m: RUN_BREAK.sub("", m.group(0)), xml)
+    for pattern in STRUCTURAL_TAGS:
+        xml = pattern.sub(r"\1 \2", xml)
+    return TAG_BODY.sub(_unescape_tag, xml)
+
+
+class CompiledTemplate:
+    """
+    A DOCX template split into static archive members and compiled Jinja parts.
+
+    Static members are kept as raw compressed bytes and written back verbatim,
+    so rendering costs the Jinja evaluation of the templated parts plus
+    compressing their output.
+    """
+
+    __slots__ = ("members", "templates", "comment")
+
+    def __init__(self, members: List[RawMember], templates: Dict[int, jinja2.Template], comment: bytes):
+        self.members = members
+        self.templates = templates
+        self.comment = comment
+
+    @classmethod
+    def compile(cls, f: BinaryIO) -> "CompiledTemplate":
+        """
+        Compile the DOCX read from ``f``.
+
+        :raises jinja2.TemplateSyntaxError: If a part contains malformed Jinja.
+        """
+        members, comment = read_members(f)
+        templates = {}
+        for i, member in enumerate(members):
+            if not TEMPLATE_PARTS.match(member.name):
+                continue
+            xml = member.read().decode("utf-8")
+            if "{" not in xml:
+                continue
+            source = repair_xml(xml)
+            if "{{" in source or "{%" in source:
+                templates[i] = JINJA_ENV.from_string(source)
+        return cls(members, templates, comment)
+
+    def render_to(self, out: BinaryIO, context: Dict[str, Any]) -> None:
+        writer = ArchiveWriter(out)
+        for i, member in enumerate(self.members):
+            template = self.templates.get(i)
+            if template is None:
+                writer.copy(member)
+            else:
+                writer.write(member, template.render(context).encode("utf-8"))
+        writer.close(self.comment)
+
+    def render(self, context: Dict[str, Any]) -> bytes:
+        out = io.BytesIO()
+        self.render_to(out, context)
+        return out.getvalue()
+
+
+class TemplateCache:
+    """
+    LRU of ``CompiledTemplate`` objects keyed by the SHA-256 of the template file.
+
+    Keying on content means an overwritten template is recompiled on its next
+    use while any number of paths holding the same bytes share one entry.
+    """
+
+    def __init__(self, max_entries: int = 16):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, CompiledTemplate]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, path: str) -> CompiledTemplate:
+        with open(path, "rb") as f:
+            data = f.read()
+        key = hashlib.sha256(data).hexdigest()
+
+        with self._lock:
+            compiled = self._entries.get(key)
+            if compiled is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return compiled
+            self.misses += 1
+
+        compiled = CompiledTemplate.compile(io.BytesIO(data))
+        with self._lock:
+            self._entries[key] = compiled
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return compiled
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+# Per-process cache; every pool worker compiles a template at most once
+template_cache = TemplateCache()
+
+
+def flatten_context(context: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Expose ``context["metadata"]`` entries as top-level names.
+
+    ``/process`` writes bare placeholders such as ``{{ project_name }}`` while
+    ``build_template_context`` nests those values under ``metadata``. The
+    context's own keys win over metadata keys of the same name.
+    """
+    metadata = context.get("metadata")
+    if not isinstance(metadata, dict):
+        return dict(context)
+    return {**metadata, **context}
+
+
+def check_template(template_path: str) -> None:
+    """
+    Compile ``template_path`` into the cache.
+
+    :raises jinja2.TemplateSyntaxError: If the template contains malformed Jinja.
+    """
+    template_cache.get(template_path)
+
+
+def render_docx(template_path: str, context: Dict[str, Any]) -> bytes:
+    """
+    Render ``template_path`` with ``context`` and return the DOCX bytes.
+
+    :raises jinja2.exceptions.SecurityError: If the template reaches for
+        attributes or calls the sandbox does not allow.
+    """
+    return template_cache.get(template_path).render(flatten_context(context))
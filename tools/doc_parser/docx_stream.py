@@ -0,0 +1,316 @@
+import zipfile
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from docx.enum.text import WD_UNDERLINE
+from lxml import etree
+
+from tools.doc_parser.element_index import CellLocation, ElementIndex
+
+W_NS = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+DOCUMENT_PART = "word/document.xml"
+STYLES_PART = "word/styles.xml"
+
+CHECKBOX_CHARS = ("☐", "☑", "☒")
+ALIGNMENT_NAMES = {"center": "center", "right": "right", "both": "justify"}
+STYLE_ALIASES = {f"heading {i}": f"Heading {i}" for i in range(1, 10)}
+STYLE_ALIASES.update({"caption": "Caption", "footer": "Footer", "header": "Header"})
+
+
+def _w(tag: str) -> str:
+    return f"{{{W_NS}}}{tag}"
+
+
+W_BODY = _w("body")
+W_P = _w("p")
+W_R = _w("r")
+W_T = _w("t")
+W_TBL = _w("tbl")
+W_TR = _w("tr")
+W_TC = _w("tc")
+W_VAL = _w("val")
+W_HYPERLINK = _w("hyperlink")
+
+# Run children that contribute to text, mirroring python-docx ``CT_R.text``.
+RUN_TEXT = {
+    _w("tab"): "\t",
+    _w("ptab"): "\t",
+    _w("cr"): "\n",
+    _w("noBreakHyphen"): "-",
+}
+
+
+def _on_off(elem) -> Optional[bool]:
+    """
+    Read a ``w:b``/``w:i`` style toggle the same way python-docx does.
+
+    :return: ``None`` when the element is absent, otherwise its boolean value.
+    """
+    if elem is None:
+        return None
+    return elem.get(W_VAL, "true") in ("1", "true", "on")
+
+
+def load_style_names(zf: zipfile.ZipFile) -> Tuple[Dict[str, str], Optional[str]]:
+    """
+    Read paragraph style names from ``word/styles.xml``.
+
+    :param zf: Open DOCX archive.
+    :type zf: zipfile.ZipFile
+
+    :return: Mapping of paragraph style id to UI style name, and the default
+        paragraph style name.
+    :rtype: tuple
+    """
+    if STYLES_PART not in zf.namelist():
+        return {}, None
+
+    with zf.open(STYLES_PART) as f:
+        root = etree.parse(f).getroot()
+
+    names = {}
+    default_name = None
+    for style in root.iterchildren(_w("style")):
+        if style.get(_w("type")) != "paragraph":
+            continue
+        name_elem = style.find(_w("name"))
+        name = name_elem.get(W_VAL) if name_elem is not None else None
+        if name is not None:
+            name = STYLE_ALIASES.get(name, name)
+        style_id = style.get(_w("styleId"))
+        if style_id is not None and style_id not in names:
+            names[style_id] = name
+        if style.get(_w("default")) in ("1", "true", "on"):
+            default_name = name
+    return names, default_name
+
+
+def run_text(r) -> str:
+    parts = []
+    for child in r.iterchildren():
+        if child.tag == W_T:
+            parts.append(child.text or "")
+        elif child.tag == _w("br"):
+            if child.get(_w("type"), "textWrapping") == "textWrapping":
+                parts.append("\n")
+        elif child.tag in RUN_TEXT:
+            parts.append(RUN_TEXT[child.tag])
+    return "".join(parts)
+
+
+def run_formatting(r) -> Dict[str, Any]:
+    rPr = r.find(_w("rPr"))
+    if rPr is None:
+        return {"bold": None, "italic": None, "underline": None}
+
+    underline = None
+    u = rPr.find(_w("u"))
+    if u is not None and u.get(W_VAL) is not None:
+        val = WD_UNDERLINE.from_xml(u.get(W_VAL))
+        if val == WD_UNDERLINE.SINGLE:
+            underline = True
+        elif val == WD_UNDERLINE.NONE:
+            underline = False
+        elif val != WD_UNDERLINE.INHERITED:
+            underline = val
+
+    return {
+        "bold": _on_off(rPr.find(_w("b"))),
+        "italic": _on_off(rPr.find(_w("i"))),
+        "underline": underline,
+    }
+
+
+def paragraph_payload(p, style_names: Dict[str, str], default_style: Optional[str]) -> Dict[str, Any]:
+    """
+    Convert one ``w:p`` element into the paragraph shape used by ``parse_docx``.
+
+    :return: Dictionary with ``text``, ``style``, ``alignment`` and ``runs``.
+    :rtype: dict
+    """
+    style = default_style
+    alignment = "left"
+    pPr = p.find(_w("pPr"))
+    if pPr is not None:
+        pStyle = pPr.find(_w("pStyle"))
+        if pStyle is not None and pStyle.get(W_VAL) in style_names:
+            style = style_names[pStyle.get(W_VAL)]
+        jc = pPr.find(_w("jc"))
+        if jc is not None:
+            alignment = ALIGNMENT_NAMES.get(jc.get(W_VAL), "left")
+
+    text_parts = []
+    runs = []
+    for child in p.iterchildren(W_R, W_HYPERLINK):
+        if child.tag == W_R:
+            text = run_text(child)
+            runs.append({"text": text, "formatting": run_formatting(child)})
+            text_parts.append(text)
+        else:
+            text_parts.extend(run_text(r) for r in child.iterchildren(W_R))
+
+    return {
+        "text": "".join(text_parts),
+        "style": style,
+        "alignment": alignment,
+        "runs": runs,
+    }
+
+
+def _int_val(parent, tag: str, default: int) -> int:
+    if parent is None:
+        return default
+    elem = parent.find(_w(tag))
+    if elem is None or elem.get(W_VAL) is None:
+        return default
+    return int(elem.get(W_VAL))
+
+
+def _clear(elem) -> None:
+    """Free an element that has been fully processed, plus earlier siblings."""
+    elem.clear()
+    parent = elem.getparent()
+    if parent is not None:
+        while elem.getprevious() is not None:
+            del parent[0]
+
+
+def iter_row_cells(tr, r_idx: int, above: Dict[int, Tuple[Dict[str, Any], CellLocation]],
+                   style_names, default_style) -> Iterator[Tuple[Optional[int], Dict[str, Any], CellLocation]]:
+    """
+    Yield ``(grid_offset, cell_content, location)`` for each layout-grid cell of a row.
+
+    Horizontal spans repeat the same content once per spanned grid column and
+    vertical merge continuations reuse the content of the cell above, which is
+    how python-docx ``_Row.cells`` reports them. ``location`` is the
+    ``(w:tr, w:tc)`` position of the element holding the content.
+    """
+    offset = _int_val(tr.find(_w("trPr")), "gridBefore", 0)
+    for tc_idx, tc in enumerate(tr.iterchildren(W_TC)):
+        tcPr = tc.find(_w("tcPr"))
+        span = _int_val(tcPr, "gridSpan", 1)
+        v_merge = tcPr.find(_w("vMerge")) if tcPr is not None else None
+
+        origin = None
+        if v_merge is not None and v_merge.get(W_VAL, "continue") == "continue":
+            origin = above.get(offset)
+
+        if origin is None:
+            paragraphs = [
+                paragraph_payload(cp, style_names, default_style)
+                for cp in tc.iterchildren(W_P)
+            ]
+            text = "\n".join(cp["text"] for cp in paragraphs)
+            origin = {
+                "text": text,
+                "paragraphs": paragraphs,
+                "has_checkbox": any(cb in text for cb in CHECKBOX_CHARS),
+                "is_blank": not text.strip(),
+            }, (r_idx, tc_idx)
+
+        content, location = origin
+        yield offset, content, location
+        for _ in range(span - 1):
+            yield None, content, location
+        offset += span
+
+
+def parse_docx_stream(filepath: str) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """
+    Parse a DOCX into the ``{"paragraphs": [...], "tables": [...]}`` structure
+    and its serialized ``ElementIndex``.
+
+    This is a drop-in alternative to the python-docx based ``parse_docx``. It
+    streams ``word/document.xml`` out of the archive with ``iterparse`` and
+    builds each body paragraph and table row as soon as its closing tag is
+    seen, then discards the XML, so memory stays bounded by the largest row
+    rather than the whole document. Element ids (``p_i`` and
+    ``t_i_r_j_c_k``) match the python-docx engine exactly.
+
+    :param filepath: Path to the ``.docx`` file.
+    :type filepath: str
+
+    :return: Document structure with paragraph and table entries, and the
+        element index as a dict.
+    :rtype: tuple
+    """
+    paragraphs: List[Dict[str, Any]] = []
+    tables: List[Dict[str, Any]] = []
+    # Body children are cleared once handled, so positions are counted here
+    body_position = 0
+    paragraph_positions: List[int] = []
+    table_positions: List[int] = []
+    cell_locations: List[List[List[CellLocation]]] = []
+
+    with zipfile.ZipFile(filepath) as zf:
+        style_names, default_style = load_style_names(zf)
+
+        with zf.open(DOCUMENT_PART) as f:
+            body = None
+            table = None
+            above: Dict[int, Tuple[Dict[str, Any], CellLocation]] = {}
+
+            for event, elem in etree.iterparse(f, events=("start", "end")):
+                if event == "start":
+                    if elem.tag == W_BODY:
+                        body = elem
+                    elif elem.tag == W_TBL and body is not None and elem.getparent() is body:
+                        table = {"id": f"t_{len(tables)}", "rows": [], "num_columns": 0}
+                        table_locations = []
+                        above = {}
+                    continue
+
+                parent = elem.getparent()
+                if body is None:
+                    continue
+
+                if parent is body:
+                    if elem.tag == W_P:
+                        payload = paragraph_payload(elem, style_names, default_style)
+                        text = payload["text"]
+                        paragraph_positions.append(body_position)
+                        paragraphs.append({
+                            "id": f"p_{len(paragraphs)}",
+                            "text": text,
+                            "style": payload["style"],
+                            "alignment": payload["alignment"],
+                            "runs": payload["runs"],
+                            "has_checkbox": any(cb in text for cb in CHECKBOX_CHARS),
+                            "is_blank": not text.strip(),
+                        })
+                    elif elem.tag == W_TBL:
+                        tables.append(table)
+                        table_positions.append(body_position)
+                        cell_locations.append(table_locations)
+                        table = None
+                    body_position += 1
+                    _clear(elem)
+
+                elif table is not None and parent is not None and parent.getparent() is body:
+                    if elem.tag == _w("tblGrid"):
+                        table["num_columns"] = len(elem.findall(_w("gridCol")))
+                    elif elem.tag == W_TR:
+                        t_idx = len(tables)
+                        r_idx = len(table["rows"])
+                        cells = []
+                        locations = []
+                        current = {}
+                        for offset, content, location in iter_row_cells(
+                                elem, r_idx, above, style_names, default_style):
+                            if offset is not None:
+                                current[offset] = (content, location)
+                            locations.append(location)
+                            cells.append({
+                                "id": f"t_{t_idx}_r_{r_idx}_c_{len(cells)}",
+                                "text": content["text"],
+                                "paragraphs": content["paragraphs"],
+                                "has_checkbox": content["has_checkbox"],
+                                "is_blank": content["is_blank"],
+                            })
+                        table["rows"].append(cells)
+                        table_locations.append(locations)
+                        above = current
+                        _clear(elem)
+
+    structure = {"paragraphs": paragraphs, "tables": tables}
+    index = ElementIndex.from_parse(structure, paragraph_positions, table_positions, cell_locations)
+    return structure, index.to_dict()
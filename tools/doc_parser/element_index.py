@@ -0,0 +1,114 @@
+from typing import Any, Dict, FrozenSet, List, Optional, Sequence, Tuple
+
+# (w:tr position in its table, w:tc position in that row) of the element that
+# holds a grid cell's content; merged cells point at their origin w:tc
+CellLocation = Tuple[int, int]
+
+
+def parse_element_id(element_id: str) -> Optional[Tuple[int, ...]]:
+    """
+    Split an element id into its integer parts.
+
+    :return: ``(p,)`` for ``p_i``, ``(t, r, c)`` for ``t_i_r_j_c_k``, ``(t, c)``
+        for a column id ``t_i_col_k``, or ``None`` if the id is malformed.
+    """
+    parts = element_id.split("_")
+    try:
+        if len(parts) == 2 and parts[0] == "p":
+            return (int(parts[1]),)
+        if len(parts) == 6 and parts[0] == "t" and parts[2] == "r" and parts[4] == "c":
+            return int(parts[1]), int(parts[3]), int(parts[5])
+        if len(parts) == 4 and parts[0] == "t" and parts[2] == "col":
+            return int(parts[1]), int(parts[3])
+    except ValueError:
+        pass
+    return None
+
+
+class TableIndex:
+    __slots__ = ("body_index", "num_columns", "cells")
+
+    def __init__(self, body_index: int, num_columns: int, cells: Tuple[Tuple[CellLocation, ...], ...]):
+        self.body_index = body_index
+        self.num_columns = num_columns
+        self.cells = cells
+
+    @property
+    def num_rows(self) -> int:
+        return len(self.cells)
+
+
+class ElementIndex:
+    """
+    Map from element ids to their place in ``word/document.xml``.
+
+    Built by the parse engines in the same pass as the structure and stored
+    with it, so ``/process`` can resolve each selection with a couple of list
+    lookups instead of re-walking the document or the python-docx object
+    model. Paragraph ``p_i`` lives at ``paragraphs[i]`` among the children of
+    ``w:body``; cell ``t_i_r_j_c_k`` lives in the body child
+    ``tables[i].body_index`` at the ``(w:tr, w:tc)`` positions in
+    ``tables[i].cells[j][k]``.
+    """
+
+    __slots__ = ("paragraphs", "tables", "checkboxes")
+
+    def __init__(self, paragraphs: Tuple[int, ...], tables: Tuple[TableIndex, ...],
+                 checkboxes: FrozenSet[str]):
+        self.paragraphs = paragraphs
+        self.tables = tables
+        self.checkboxes = checkboxes
+
+    @classmethod
+    def from_parse(cls, structure: Dict[str, Any], paragraph_positions: Sequence[int],
+                   table_positions: Sequence[int],
+                   cell_locations: Sequence[Sequence[Sequence[CellLocation]]]) -> "ElementIndex":
+        """Combine the positions recorded while parsing with the parsed ``structure``."""
+        checkboxes = {p["id"] for p in structure["paragraphs"] if p["has_checkbox"]}
+        tables = []
+        for table, body_index, rows in zip(structure["tables"], table_positions, cell_locations):
+            for row in table["rows"]:
+                checkboxes.update(c["id"] for c in row if c["has_checkbox"])
+            tables.append(TableIndex(
+                body_index, table["num_columns"], tuple(tuple(row) for row in rows)))
+        return cls(tuple(paragraph_positions), tuple(tables), frozenset(checkboxes))
+
+    def paragraph_position(self, p_idx: int) -> Optional[int]:
+        if 0 <= p_idx < len(self.paragraphs):
+            return self.paragraphs[p_idx]
+        return None
+
+    def cell_location(self, t_idx: int, r_idx: int, c_idx: int) -> Optional[CellLocation]:
+        if not 0 <= t_idx < len(self.tables):
+            return None
+        rows = self.tables[t_idx].cells
+        if not 0 <= r_idx < len(rows) or not 0 <= c_idx < len(rows[r_idx]):
+            return None
+        return rows[r_idx][c_idx]
+
+    def row_count(self, t_idx: int) -> int:
+        return self.tables[t_idx].num_rows if 0 <= t_idx < len(self.tables) else 0
+
+    def is_checkbox(self, element_id: str) -> bool:
+        return element_id in self.checkboxes
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "paragraphs": list(self.paragraphs),
+            "tables": [
+                {"body_index": t.body_index, "num_columns": t.num_columns,
+                 "cells": [[list(loc) for loc in row] for row in t.cells]}
+                for t in self.tables
+            ],
+            "checkboxes": sorted(self.checkboxes),
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "ElementIndex":
+        tables: List[TableIndex] = [
+            TableIndex(t["body_index"], t["num_columns"],
+                       tuple(tuple((loc[0], loc[1]) for loc in row) for row in t["cells"]))
+            for t in data.get("tables", [])
+        ]
+        return cls(tuple(data.get("paragraphs", [])), tuple(tables),
+                   frozenset(data.get("checkboxes", [])))
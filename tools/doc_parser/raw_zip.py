@@ -0,0 +1,145 @@
+import os
+import struct
+import zipfile
+import zlib
+from typing import BinaryIO, List, Tuple
+
+LOCAL_HEADER = struct.Struct("<4s5H3L2H")
+CENTRAL_HEADER = struct.Struct("<4s6H3L5H2L")
+END_OF_DIRECTORY = struct.Struct("<4s4H2LH")
+LOCAL_SIG = b"PK\x03\x04"
+CENTRAL_SIG = b"PK\x01\x02"
+END_SIG = b"PK\x05\x06"
+DESCRIPTOR_SIG = b"PK\x07\x08"
+FLAG_DATA_DESCRIPTOR = 0x08
+FLAG_UTF8 = 0x800
+
+
+class RawMember:
+    """
+    One archive member kept as its central directory record and raw local entry.
+
+    ``fields`` are the unpacked central directory header, ``variable`` the
+    name, extra and comment bytes that follow it, and ``raw`` the local
+    header, compressed data and data descriptor exactly as stored.
+    """
+
+    __slots__ = ("fields", "variable", "raw")
+
+    def __init__(self, fields: tuple, variable: bytes, raw: bytes):
+        self.fields = fields
+        self.variable = variable
+        self.raw = raw
+
+    @property
+    def name(self) -> str:
+        name = self.variable[:self.fields[10]]
+        return name.decode("utf-8" if self.fields[3] & FLAG_UTF8 else "cp437")
+
+    def read(self) -> bytes:
+        """Return the member's uncompressed bytes."""
+        local = LOCAL_HEADER.unpack_from(self.raw)
+        start = LOCAL_HEADER.size + local[9] + local[10]
+        data = self.raw[start:start + self.fields[8]]
+        if self.fields[4] == zipfile.ZIP_DEFLATED:
+            return zlib.decompress(data, -zlib.MAX_WBITS)
+        if self.fields[4] != zipfile.ZIP_STORED:
+            raise zipfile.BadZipFile(f"Unsupported compression method {self.fields[4]}")
+        return data
+
+
+def read_members(f: BinaryIO) -> Tuple[List[RawMember], bytes]:
+    """
+    Read every member of a ZIP file without decompressing anything.
+
+    :return: Members in central directory order and the archive comment.
+    :raises zipfile.BadZipFile: If the archive structure is invalid.
+    :raises zipfile.LargeZipFile: For ZIP64 archives, which DOCX files never need.
+    """
+    f.seek(0, os.SEEK_END)
+    size = f.tell()
+    tail_size = min(size, END_OF_DIRECTORY.size + 0xFFFF)
+    f.seek(size - tail_size)
+    tail = f.read()
+    pos = tail.rfind(END_SIG)
+    if pos < 0:
+        raise zipfile.BadZipFile("End of central directory not found")
+    end = END_OF_DIRECTORY.unpack_from(tail, pos)
+    count, cd_size, cd_offset = end[4], end[5], end[6]
+    if count == 0xFFFF or cd_offset == 0xFFFFFFFF:
+        raise zipfile.LargeZipFile("ZIP64 archives are not supported")
+    comment = tail[pos + END_OF_DIRECTORY.size:pos + END_OF_DIRECTORY.size + end[7]]
+
+    f.seek(cd_offset)
+    directory = f.read(cd_size)
+    members = []
+    offset = 0
+    for _ in range(count):
+        fields = CENTRAL_HEADER.unpack_from(directory, offset)
+        if fields[0] != CENTRAL_SIG:
+            raise zipfile.BadZipFile("Bad central directory record")
+        start = offset + CENTRAL_HEADER.size
+        variable = directory[start:start + sum(fields[10:13])]
+        offset = start + len(variable)
+
+        f.seek(fields[16])
+        local = LOCAL_HEADER.unpack(f.read(LOCAL_HEADER.size))
+        if local[0] != LOCAL_SIG:
+            raise zipfile.BadZipFile("Bad local file header")
+        length = LOCAL_HEADER.size + local[9] + local[10] + fields[8]
+        if local[2] & FLAG_DATA_DESCRIPTOR:
+            f.seek(fields[16] + length)
+            length += 16 if f.read(4) == DESCRIPTOR_SIG else 12
+        f.seek(fields[16])
+        members.append(RawMember(fields, variable, f.read(length)))
+    return members, comment
+
+
+class ArchiveWriter:
+    """
+    Write a ZIP file member by member from ``RawMember`` sources.
+
+    ``copy`` writes a member's stored bytes unchanged, ``write`` stores new
+    content under an existing member's name and attributes. Call ``close``
+    to write the central directory.
+    """
+
+    def __init__(self, out: BinaryIO, compresslevel: int = 6):
+        self.out = out
+        self.compresslevel = compresslevel
+        self._directory: List[bytes] = []
+        self._offset = 0
+
+    def _emit(self, data: bytes) -> None:
+        self.out.write(data)
+        self._offset += len(data)
+
+    def copy(self, member: RawMember) -> None:
+        self._directory.append(
+            CENTRAL_HEADER.pack(*member.fields[:16], self._offset) + member.variable)
+        self._emit(member.raw)
+
+    def write(self, member: RawMember, data: bytes) -> None:
+        fields = member.fields
+        name = member.variable[:fields[10]]
+        compressor = zlib.compressobj(self.compresslevel, zlib.DEFLATED, -zlib.MAX_WBITS)
+        packed = compressor.compress(data) + compressor.flush()
+        crc = zlib.crc32(data)
+        flags = fields[3] & ~FLAG_DATA_DESCRIPTOR
+
+        self._directory.append(CENTRAL_HEADER.pack(
+            CENTRAL_SIG, fields[1], 20, flags, zipfile.ZIP_DEFLATED, fields[5], fields[6],
+            crc, len(packed), len(data), len(name), 0, fields[12], fields[13], fields[14],
+            fields[15], self._offset) + name + member.variable[fields[10] + fields[11]:])
+        self._emit(LOCAL_HEADER.pack(
+            LOCAL_SIG, 20, flags, zipfile.ZIP_DEFLATED, fields[5], fields[6],
+            crc, len(packed), len(data), len(name), 0) + name)
+        self._emit(packed)
+
+    def close(self, comment: bytes = b"") -> None:
+        cd_offset = self._offset
+        for record in self._directory:
+            self._emit(record)
+        self._emit(END_OF_DIRECTORY.pack(
+            END_SIG, 0, 0, len(self._directory), len(self._directory),
+            self._offset - cd_offset, cd_offset, len(comment)) + comment)
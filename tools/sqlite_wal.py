@@ -0,0 +1,33 @@
+import sqlite3
+from contextlib import contextmanager
+
+
+@contextmanager
+def wal_connection(path: str):
+    """
+    Open a short-lived connection to a WAL database, committing on success.
+
+    The connection is closed on exit either way.
+    """
+    conn = sqlite3.connect(path, timeout=30)
+    # WAL keeps committed data across application crashes without a sync per commit
+    conn.execute("PRAGMA synchronous=NORMAL")
+    try:
+        with conn:
+            yield conn
+    finally:
+        conn.close()
+
+
+def open_keepalive(path: str) -> sqlite3.Connection:
+    """
+    Open the connection a store holds for its lifetime next to ``wal_connection``.
+
+    While it is open, no short-lived connection is the last one, whose close
+    would checkpoint and delete the WAL on each write. It only counts once it
+    has read, which maps the WAL index, hence the initial query. It can be
+    used from any thread.
+    """
+    conn = sqlite3.connect(path, check_same_thread=False)
+    conn.execute("PRAGMA data_version").fetchone()
+    return conn
@@ -0,0 +1,221 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from tools.sqlite_wal import open_keepalive, wal_connection
+
+# Ordered list sections of the template payload, each stored as rows of ``entries``
+LIST_SECTIONS = ("steps", "hazards", "mitigations", "table_rows")
+
+# Insert after the section's last position; the MAX is a single primary key seek
+APPEND_ENTRY = (
+    "INSERT INTO entries (section, position, value) "
+    "SELECT ?, COALESCE(MAX(position), 0) + 1, ? FROM entries WHERE section = ?"
+)
+# An upsert keeps the field's rowid, so overwritten fields keep their position
+SET_METADATA = (
+    "INSERT INTO metadata (field_name, value) VALUES (?, ?) "
+    "ON CONFLICT (field_name) DO UPDATE SET value = excluded.value"
+)
+
+
+class TemplateInputStore:
+    """
+    Template and user input kept in one SQLite database.
+
+    Every list entry, metadata field and user input is its own row, so an
+    append is a single-row insert instead of a rewrite of the whole payload.
+    The database runs in WAL mode: readers never block the writer, and
+    concurrent writers are serialized by SQLite instead of overwriting each
+    other's files. Values are stored as JSON text so entries keep whatever
+    shape the client sent.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._watch_lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with wal_connection(self.path) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            # Clustered on (section, position): a section is one contiguous range of the b-tree
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                "section TEXT NOT NULL, "
+                "position INTEGER NOT NULL, "
+                "value TEXT NOT NULL, "
+                "PRIMARY KEY (section, position)) WITHOUT ROWID"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS metadata ("
+                "field_name TEXT PRIMARY KEY, "
+                "value TEXT NOT NULL)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS user_inputs ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, "
+                "value TEXT NOT NULL)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS migrations ("
+                "source TEXT PRIMARY KEY, "
+                "imported_at REAL NOT NULL)"
+            )
+        # Held for the store's lifetime, see open_keepalive; it also serves data_version
+        self._watch = open_keepalive(self.path)
+
+    def data_version(self) -> int:
+        """
+        Return a number that changes whenever any connection commits a write.
+
+        The value comes from ``PRAGMA data_version`` on a long-lived connection
+        that never writes, so every commit made by ``append``, ``replace`` and
+        the other methods, from any thread or process, changes it. Checking it
+        reads only the WAL index in shared memory.
+        """
+        with self._watch_lock:
+            if self._watch is None:
+                self._watch = open_keepalive(self.path)
+            return self._watch.execute("PRAGMA data_version").fetchone()[0]
+
+    def close(self) -> None:
+        """Close the long-lived connection; ``data_version`` reopens it if the store is used again."""
+        with self._watch_lock:
+            if self._watch is not None:
+                self._watch.close()
+                self._watch = None
+
+    @staticmethod
+    def _section(conn: sqlite3.Connection, section: str) -> List[Any]:
+        # Concatenate the stored JSON in SQL and decode the section with one json.loads
+        row = conn.execute(
+            "SELECT '[' || COALESCE(GROUP_CONCAT(value, ','), '') || ']' FROM "
+            "(SELECT value FROM entries WHERE section = ? ORDER BY position)",
+            (section,),
+        ).fetchone()
+        return json.loads(row[0])
+
+    @staticmethod
+    def _metadata(conn: sqlite3.Connection) -> Dict[str, Any]:
+        rows = conn.execute("SELECT field_name, value FROM metadata ORDER BY rowid").fetchall()
+        return {field_name: json.loads(value) for field_name, value in rows}
+
+    @staticmethod
+    def _user_inputs(conn: sqlite3.Connection) -> List[Any]:
+        row = conn.execute(
+            "SELECT '[' || COALESCE(GROUP_CONCAT(value, ','), '') || ']' FROM "
+            "(SELECT value FROM user_inputs ORDER BY id)"
+        ).fetchone()
+        return json.loads(row[0])
+
+    @staticmethod
+    def _insert_payload(conn: sqlite3.Connection, payload: Dict[str, Any]) -> None:
+        # Fields already stored win over imported ones
+        conn.executemany(
+            "INSERT OR IGNORE INTO metadata (field_name, value) VALUES (?, ?)",
+            [(str(k), json.dumps(v)) for k, v in payload.get("metadata", {}).items()],
+        )
+        for section in LIST_SECTIONS:
+            conn.executemany(APPEND_ENTRY, [(section, json.dumps(v), section) for v in payload.get(section, [])])
+
+    def append(self, section: str, value: Any) -> List[Any]:
+        """Append ``value`` to a list section and return the section after the write."""
+        with wal_connection(self.path) as conn:
+            conn.execute(APPEND_ENTRY, (section, json.dumps(value), section))
+            return self._section(conn, section)
+
+    def section(self, section: str) -> List[Any]:
+        with wal_connection(self.path) as conn:
+            return self._section(conn, section)
+
+    def set_metadata(self, field_name: str, value: Any) -> Dict[str, Any]:
+        """Set one metadata field and return the metadata after the write."""
+        with wal_connection(self.path) as conn:
+            conn.execute(SET_METADATA, (field_name, json.dumps(value)))
+            return self._metadata(conn)
+
+    def apply(self, operations: List[Tuple[str, Any]]) -> Dict[str, Any]:
+        """
+        Apply ``(section, value)`` operations in order in one transaction.
+
+        ``value`` is appended to a list section, or for ``"metadata"`` is a
+        ``(field_name, value)`` pair to set. Either every operation is stored
+        or, if one fails, none is.
+
+        :return: Each touched section as of the end of the transaction.
+        """
+        with wal_connection(self.path) as conn:
+            for section, value in operations:
+                if section == "metadata":
+                    field_name, field_value = value
+                    conn.execute(SET_METADATA, (field_name, json.dumps(field_value)))
+                else:
+                    conn.execute(APPEND_ENTRY, (section, json.dumps(value), section))
+            return {
+                section: self._metadata(conn) if section == "metadata" else self._section(conn, section)
+                for section in dict.fromkeys(section for section, _ in operations)
+            }
+
+    def load(self) -> Dict[str, Any]:
+        """Return the whole template payload from one consistent snapshot."""
+        with wal_connection(self.path) as conn:
+            conn.execute("BEGIN")
+            payload = {"metadata": self._metadata(conn)}
+            for section in LIST_SECTIONS:
+                payload[section] = self._section(conn, section)
+        return payload
+
+    def replace(self, payload: Dict[str, Any]) -> None:
+        """Atomically replace the whole template payload."""
+        with wal_connection(self.path) as conn:
+            conn.execute("DELETE FROM metadata")
+            conn.execute("DELETE FROM entries")
+            self._insert_payload(conn, payload)
+
+    def add_user_input(self, value: Any) -> List[Any]:
+        """Append one user input and return all user inputs after the write."""
+        with wal_connection(self.path) as conn:
+            conn.execute("INSERT INTO user_inputs (value) VALUES (?)", (json.dumps(value),))
+            return self._user_inputs(conn)
+
+    def user_inputs(self) -> List[Any]:
+        with wal_connection(self.path) as conn:
+            return self._user_inputs(conn)
+
+    def migrate(self, source: str, payload: Optional[Dict[str, Any]] = None,
+                user_inputs: Optional[List[Any]] = None) -> bool:
+        """
+        Import legacy data once, keyed by ``source``.
+
+        The data is appended after anything already stored. Concurrent callers
+        are serialized by the write lock taken by the ``migrations`` insert, so
+        exactly one of them imports.
+
+        :return: ``True`` if this call imported the data, ``False`` if ``source``
+            had already been imported.
+        """
+        with wal_connection(self.path) as conn:
+            cursor = conn.execute(
+                "INSERT OR IGNORE INTO migrations (source, imported_at) VALUES (?, ?)",
+                (source, time.time()),
+            )
+            if cursor.rowcount == 0:
+                return False
+            if payload is not None:
+                self._insert_payload(conn, payload)
+            if user_inputs is not None:
+                conn.executemany(
+                    "INSERT INTO user_inputs (value) VALUES (?)",
+                    [(json.dumps(v),) for v in user_inputs],
+                )
+            return True
+
+    def stats(self) -> Dict[str, Any]:
+        with wal_connection(self.path) as conn:
+            sections = dict(conn.execute(
+                "SELECT section, COUNT(*) FROM entries GROUP BY section").fetchall())
+            metadata = conn.execute("SELECT COUNT(*) FROM metadata").fetchone()[0]
+            user_inputs = conn.execute("SELECT COUNT(*) FROM user_inputs").fetchone()[0]
+        return {"sections": sections, "metadata": metadata, "user_inputs": user_inputs}
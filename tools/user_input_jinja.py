@@ -1,12 +1,40 @@
+import hashlib
 import json
+import os
+import re
+import threading
+from collections import OrderedDict
 from pathlib import Path
+from typing import Optional
+
+from tools.template_input_store import TemplateInputStore
 
 #File paths
 USER_INPUT_PATH = Path(__file__).resolve().parents[1] / "data" / "user_input.json"
 TEMPLATE_INPUT_PATH = Path(__file__).resolve().parents[1] / "data" / "template_input.json"
+TEMPLATE_INPUT_DB_PATH = Path(
+    os.getenv("TEMPLATE_INPUT_DB", Path(__file__).resolve().parents[1] / "data" / "template_input.sqlite3"))
+# One database per project other than the default one
+TEMPLATE_INPUT_SHARD_DIR = Path(
+    os.getenv("TEMPLATE_INPUT_SHARD_DIR", Path(__file__).resolve().parents[1] / "data" / "template_input"))
+MAX_OPEN_SHARDS = int(os.getenv("TEMPLATE_INPUT_MAX_OPEN_SHARDS", "256"))
+
+# Project used when callers do not name one; it keeps the original storage location
+DEFAULT_PROJECT_ID = "default"
+PROJECT_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
 
 #define me
 ALLOWED_TEXT_SECTIONS = {"steps", "hazards", "mitigations"}
+# Keys of every ``table_rows`` entry, and the column variable names that mean each one
+TABLE_ROW_FIELDS = {
+    "step": ("step", "steps", "job_step", "job_steps", "basic_job_steps", "task", "tasks",
+             "job_task", "job_tasks", "task_steps", "sequence_of_steps", "work_steps"),
+    "hazard": ("hazard", "hazards", "potential_hazard", "potential_hazards", "identified_hazards",
+               "hazard_description", "hazards_identified", "risk", "risks", "potential_risks"),
+    "mitigation": ("mitigation", "mitigations", "control", "controls", "hazard_control", "hazard_controls",
+                   "control_measures", "controls_measures", "recommended_controls", "preventive_measures",
+                   "safety_measures", "precautions", "safe_job_procedures", "safe_work_procedures"),
+}
 
 
 def default_template_payload() -> dict:
@@ -65,57 +93,148 @@ def force_template_payload_format(data: dict) -> dict:
     return base
 
 
-def load_user_input_data() -> list:
+def _read_json_file(path: Path):
     """
-    Safely load user input data from json file.
-
-    Returns an empty list when the file is missing, empty, invalid JSON,
-    or not a list.
+    Read a legacy JSON store, returning ``None`` when it is missing, empty or invalid.
     """
-    if not USER_INPUT_PATH.exists():
-        return []
-
-    if USER_INPUT_PATH.stat().st_size == 0:
-        return []
+    if not path.exists() or path.stat().st_size == 0:
+        return None
 
-    with USER_INPUT_PATH.open("r", encoding="utf-8") as f:
+    with path.open("r", encoding="utf-8") as f:
         try:
-            data = json.load(f)
+            return json.load(f)
         except json.JSONDecodeError:
-            return []
+            return None
 
-    if isinstance(data, list):
-        return data
 
-    return []
+_stores: "OrderedDict[str, TemplateInputStore]" = OrderedDict()
+_stores_lock = threading.Lock()
+
+
+def get_template_input_store(project_id: str = DEFAULT_PROJECT_ID,
+                             create: bool = True) -> Optional[TemplateInputStore]:
+    """
+    Return the SQLite input store of one project, opening it on first use.
+
+    Every project is a separate database file, so it has its own SQLite write
+    lock: writes to different projects never wait on each other, in this
+    process or any other worker. The default project lives at
+    ``TEMPLATE_INPUT_DB_PATH`` and, when first opened, imports
+    ``user_input.json`` and ``template_input.json`` once; the JSON files are
+    left in place but no longer read or written. Other projects live in
+    ``TEMPLATE_INPUT_SHARD_DIR``. At most ``MAX_OPEN_SHARDS`` stores are kept
+    open, least recently used first out.
+
+    A shard file is only created for a write. Readers pass ``create=False``
+    and get ``None`` for a project that has no shard yet, so requests for
+    arbitrary project ids leave nothing behind on disk.
+
+    :param project_id: Project or session identifier made of letters, digits, ``_`` and ``-``.
+    :type project_id: str
+    :param create: Whether to create the project's shard if it does not exist.
+    :type create: bool
+
+    :return: ``TemplateInputStore`` for the project, or ``None`` if ``create``
+        is false and the project has no shard.
+    :rtype: Optional[TemplateInputStore]
+    :raises ValueError: If the project id is not valid.
+    """
+    if not PROJECT_ID_PATTERN.match(project_id):
+        raise ValueError(f"Invalid project id: {project_id!r}")
+
+    with _stores_lock:
+        store = _stores.get(project_id)
+        if store is not None:
+            _stores.move_to_end(project_id)
+            return store
+
+        if project_id == DEFAULT_PROJECT_ID:
+            store = TemplateInputStore(str(TEMPLATE_INPUT_DB_PATH))
+            user_inputs = _read_json_file(USER_INPUT_PATH)
+            store.migrate(USER_INPUT_PATH.name,
+                          user_inputs=user_inputs if isinstance(user_inputs, list) else [])
+            template_input = _read_json_file(TEMPLATE_INPUT_PATH)
+            store.migrate(TEMPLATE_INPUT_PATH.name,
+                          payload=force_template_payload_format(template_input))
+        else:
+            path = TEMPLATE_INPUT_SHARD_DIR / f"{project_id}.sqlite3"
+            if not create and not path.exists():
+                return None
+            store = TemplateInputStore(str(path))
+
+        _stores[project_id] = store
+        while len(_stores) > MAX_OPEN_SHARDS:
+            _, evicted = _stores.popitem(last=False)
+            evicted.close()
+            _read_cache.pop(evicted.path, None)
+        return store
+
+
+# Normalized payload and built context per store path, for one store data version each
+_read_cache = {}
+_read_cache_lock = threading.Lock()
+
+
+def _cached_read(project_id: str, name: str, build):
+    """
+    Return the project's cached ``name`` value, or build and cache it with ``build(store)``.
+
+    Entries are only valid for the ``data_version`` they were built at, so any
+    committed write, including one from another worker process, invalidates
+    them. A hit costs one ``PRAGMA`` on an open connection and no parsing.
+    A project without a shard is built from ``store=None`` and not cached,
+    since there is no version to tie the entry to.
+    """
+    store = get_template_input_store(project_id, create=False)
+    if store is None:
+        return build(None)
+    version = store.data_version()
+    with _read_cache_lock:
+        entries = _read_cache.setdefault(store.path, {})
+        if entries.get("version") != version:
+            entries.clear()
+            entries["version"] = version
+        elif name in entries:
+            return entries[name]
+
+    value = build(store)
+    with _read_cache_lock:
+        # A newer version may have been seen meanwhile; never cache under it
+        entries = _read_cache.get(store.path)
+        if entries is not None and entries.get("version") == version:
+            entries[name] = value
+    return value
+
+
+def load_user_input_data(project_id: str = DEFAULT_PROJECT_ID) -> list:
+    """
+    Load the stored user inputs in the order they were added.
+    """
+    store = get_template_input_store(project_id, create=False)
+    return store.user_inputs() if store is not None else []
 
 
-def add_input(user_input: str) -> list:
+def add_input(user_input: str, project_id: str = DEFAULT_PROJECT_ID) -> list:
     """
     Appends user input to the user_responses list.
 
     :param user_input: user input for the input field of document
     :type user_input: str
+    :param project_id: Project whose data is used, see ``get_template_input_store``.
+    :type project_id: str
 
     :return: list of user inputs
     """
-   
-    data = load_user_input_data()
-    data.append(user_input)
-
-    with USER_INPUT_PATH.open("w", encoding="utf-8") as f:
-        json.dump(data, f, indent=2)
-    
-    return data
+    return get_template_input_store(project_id).add_user_input(user_input)
 
 
-def list_to_dict() -> dict:
+def list_to_dict(project_id: str = DEFAULT_PROJECT_ID) -> dict:
     """
     Converts the user input list into a dictionary that is keyed to the index of the list items.
 
     :return: Dictionary of user responses.
     """
-    user_responses = load_user_input_data()
+    user_responses = load_user_input_data(project_id)
     input_dictionary = {}
 
     for i, input in enumerate(user_responses):
@@ -125,54 +244,47 @@ def list_to_dict() -> dict:
     return input_dictionary
 
 
-def load_template_input_data() -> dict:
+def load_template_input_data(project_id: str = DEFAULT_PROJECT_ID) -> dict:
     """
-    Load persisted Jinja template input data from json.
+    Load persisted Jinja template input data.
 
-    This loader is fault-tolerant. It returns a default payload when the file
-    does not exist, is empty, contains invalid JSON, or has an unexpected shape.
-    Returning normalized data keeps route handlers simple and predictable.
+    The payload is read from one consistent snapshot of the input store and
+    normalized, so route handlers can rely on the
+    ``default_template_payload`` shape. The result is cached until the next
+    write and shared between callers, so it must not be mutated.
+
+    :param project_id: Project whose data is used, see ``get_template_input_store``.
+    :type project_id: str
 
     :return: Normalized payload dictionary for template data.
     :rtype: dict
     """
-    if not TEMPLATE_INPUT_PATH.exists():
-        return default_template_payload()
+    return _cached_read(
+        project_id, "payload", lambda store: force_template_payload_format(store.load() if store is not None else {}))
 
-    if TEMPLATE_INPUT_PATH.stat().st_size == 0:
-        return default_template_payload()
 
-    with TEMPLATE_INPUT_PATH.open("r", encoding="utf-8") as f:
-        try:
-            raw_data = json.load(f)
-        except json.JSONDecodeError:
-            return default_template_payload()
-
-    return force_template_payload_format(raw_data)
-
-
-def save_template_input_data(data: dict) -> dict:
+def save_template_input_data(data: dict, project_id: str = DEFAULT_PROJECT_ID) -> dict:
     """
-    Persist normalized template payload data to disk and return it.
+    Persist normalized template payload data and return it.
 
     The function always writes schema-safe data by normalizing the incoming
     dictionary before save, which prevents bad payloads from corrupting storage.
+    The stored payload is replaced in a single transaction.
 
     :param data: Candidate payload dictionary to persist.
     :type data: dict
+    :param project_id: Project whose data is used, see ``get_template_input_store``.
+    :type project_id: str
 
-    :return: Normalized dictionary that was written to disk.
+    :return: Normalized dictionary that was written to the store.
     :rtype: dict
     """
     normalized_data = force_template_payload_format(data)
-
-    with TEMPLATE_INPUT_PATH.open("w", encoding="utf-8") as f:
-        json.dump(normalized_data, f, indent=2)
-
+    get_template_input_store(project_id).replace(normalized_data)
     return normalized_data
 
 
-def add_template_text_entry(section: str, entry: str) -> list:
+def add_template_text_entry(section: str, entry: str, project_id: str = DEFAULT_PROJECT_ID) -> list:
     """
     Append a string entry to one of the ordered text sections.
 
@@ -184,6 +296,8 @@ def add_template_text_entry(section: str, entry: str) -> list:
     :type section: str
     :param entry: User- or agent-provided text content.
     :type entry: str
+    :param project_id: Project whose data is used, see ``get_template_input_store``.
+    :type project_id: str
 
     :return: Updated list for the target section after append.
     :rtype: list
@@ -192,13 +306,10 @@ def add_template_text_entry(section: str, entry: str) -> list:
     if section not in ALLOWED_TEXT_SECTIONS:
         raise ValueError(f"Unsupported section: {section}")
 
-    data = load_template_input_data()
-    data[section].append(entry)
-    persisted_data = save_template_input_data(data)
-    return persisted_data[section]
+    return get_template_input_store(project_id).append(section, entry)
 
 
-def set_template_metadata_value(field_name: str, value: str) -> dict:
+def set_template_metadata_value(field_name: str, value: str, project_id: str = DEFAULT_PROJECT_ID) -> dict:
     """
     Set or overwrite one metadata placeholder value used by Jinja templates.
 
@@ -209,17 +320,33 @@ def set_template_metadata_value(field_name: str, value: str) -> dict:
     :type field_name: str
     :param value: Value to store under the given metadata key.
     :type value: str
+    :param project_id: Project whose data is used, see ``get_template_input_store``.
+    :type project_id: str
 
     :return: Updated metadata dictionary after save.
     :rtype: dict
     """
-    data = load_template_input_data()
-    data["metadata"][field_name] = value
-    persisted_data = save_template_input_data(data)
-    return persisted_data["metadata"]
+    return get_template_input_store(project_id).set_metadata(field_name, value)
 
 
-def add_table_row(step: str, hazard: str, mitigation: str) -> list:
+def table_row_field(variable_name: str) -> Optional[str]:
+    """
+    Return the ``table_rows`` key a table column variable is filled from.
+
+    Only exact names count: a key itself or one of its aliases in
+    ``TABLE_ROW_FIELDS``, ignoring case. Names are not split into words,
+    since ``activity_date`` or ``controller_name`` are not JSA columns.
+
+    :return: One of ``TABLE_ROW_FIELDS``, or ``None`` for any other name.
+    """
+    name = variable_name.lower()
+    for field, aliases in TABLE_ROW_FIELDS.items():
+        if name == field or name in aliases:
+            return field
+    return None
+
+
+def add_table_row(step: str, hazard: str, mitigation: str, project_id: str = DEFAULT_PROJECT_ID) -> list:
     """
     Append a fully-formed table row for direct Jinja table rendering.
 
@@ -233,20 +360,47 @@ def add_table_row(step: str, hazard: str, mitigation: str) -> list:
     :type hazard: str
     :param mitigation: Mitigation description for the row.
     :type mitigation: str
+    :param project_id: Project whose data is used, see ``get_template_input_store``.
+    :type project_id: str
 
     :return: Updated list of row dictionaries.
     :rtype: list
     """
-    data = load_template_input_data()
-    data["table_rows"].append(
+    return get_template_input_store(project_id).append(
+        "table_rows",
         {
             "step": step,
             "hazard": hazard,
             "mitigation": mitigation,
-        }
+        },
     )
-    persisted_data = save_template_input_data(data)
-    return persisted_data["table_rows"]
+
+
+def apply_template_operations(operations: list, project_id: str = DEFAULT_PROJECT_ID) -> dict:
+    """
+    Apply an ordered batch of template mutations in one atomic write.
+
+    Each operation is a ``(section, value)`` pair. For ``steps``, ``hazards``
+    and ``mitigations`` the value is the text to append, for ``table_rows``
+    the row dictionary to append, and for ``metadata`` a
+    ``(field_name, value)`` pair to set. Operations run in order, so a later
+    metadata value for the same field wins.
+
+    :param operations: Ordered ``(section, value)`` pairs.
+    :type operations: list
+    :param project_id: Project whose data is used, see ``get_template_input_store``.
+    :type project_id: str
+
+    :return: Dictionary mapping every touched section to its updated value.
+    :rtype: dict
+    :raises ValueError: If an operation names an unsupported section; nothing
+        is written in that case.
+    """
+    for section, _ in operations:
+        if section not in ALLOWED_TEXT_SECTIONS and section not in ("metadata", "table_rows"):
+            raise ValueError(f"Unsupported section: {section}")
+
+    return get_template_input_store(project_id).apply(operations)
 
 
 def indexed_map(values: list) -> dict:
@@ -265,17 +419,20 @@ def indexed_map(values: list) -> dict:
     return {str(i): value for i, value in enumerate(values)}
 
 
-def build_template_context() -> dict:
+def template_context_from_payload(data: dict) -> dict:
     """
-    Build a consolidated Jinja context payload from persisted template input.
+    Build a Jinja context from a template payload.
 
-    The returned object includes raw lists for direct loop rendering and indexed
-    dictionaries for templates that rely on position-based named variables.
+    The payload is normalized first, so this also accepts untrusted data such
+    as a context previously returned by ``build_template_context``.
+
+    :param data: Template payload in the ``default_template_payload`` shape.
+    :type data: dict
 
     :return: Dictionary containing metadata, raw lists, and indexed maps.
     :rtype: dict
     """
-    data = load_template_input_data()
+    data = force_template_payload_format(data)
 
     return {
         "metadata": data["metadata"],
@@ -287,3 +444,51 @@ def build_template_context() -> dict:
         "hazards_dict": indexed_map(data["hazards"]),
         "mitigations_dict": indexed_map(data["mitigations"]),
     }
+
+
+def build_template_context(project_id: str = DEFAULT_PROJECT_ID) -> dict:
+    """
+    Build a consolidated Jinja context payload from persisted template input.
+
+    The returned object includes raw lists for direct loop rendering and indexed
+    dictionaries for templates that rely on position-based named variables.
+    Like ``load_template_input_data`` it is cached until the next write and
+    must not be mutated.
+
+    :param project_id: Project whose data is used, see ``get_template_input_store``.
+    :type project_id: str
+
+    :return: Dictionary containing metadata, raw lists, and indexed maps.
+    :rtype: dict
+    """
+    return _cached_read(
+        project_id, "context", lambda store: template_context_from_payload(load_template_input_data(project_id)))
+
+
+def template_json(name: str, project_id: str = DEFAULT_PROJECT_ID) -> tuple:
+    """
+    Return the JSON body and SHA-256 hex digest for the context or one section.
+
+    ``name`` is ``"context"`` for the ``build_template_context`` result or a
+    payload section name, which is returned wrapped as ``{name: value}``.
+    The encoding matches FastAPI's default JSON response. Both values are
+    cached alongside the payload until the next write, so repeated polls
+    neither re-serialize nor re-hash.
+
+    :param name: ``"context"`` or a section name from the payload.
+    :type name: str
+    :param project_id: Project whose data is used, see ``get_template_input_store``.
+    :type project_id: str
+
+    :return: Tuple of the encoded body and its hex digest.
+    :rtype: tuple
+    """
+    def build(store) -> tuple:
+        if name == "context":
+            value = build_template_context(project_id)
+        else:
+            value = {name: load_template_input_data(project_id)[name]}
+        body = json.dumps(value, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+        return body, hashlib.sha256(body).hexdigest()
+
+    return _cached_read(project_id, f"json:{name}", build)
@@ -0,0 +1,177 @@
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+from tools.doc_parser.doc_model import Cell, DocumentModel, Table
+
+# Words that carry no meaning in a variable name when trimming long text
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "in", "is",
+    "it", "of", "on", "or", "the", "this", "to", "with", "will", "who", "which",
+    "that", "these", "those", "all", "any", "must", "should", "e", "g", "i",
+}
+CHECKBOX_CHARS = "☐☑☒"
+MAX_NAME_WORDS = 4
+MAX_LABEL_WORDS = 6
+
+# Leading outline numbering such as "1.", "1. A.", "4.B1", "2.A" or "a)"
+NUMBERING = re.compile(r"^\s*(?:\d+(?:\s*\.\s*[A-Za-z]?\d*)*\.?|[A-Za-z][.)])\s+")
+
+# Names taken from a header or a "Label:" caption are reliable enough to skip
+# the LLM at the default threshold of 0.75; a bare phrase may just as well be
+# a field value ("John Smith") or an instruction, so it stays below it.
+HEADER_CONFIDENCE = 0.85
+LABEL_CONFIDENCE = 0.9
+PHRASE_CONFIDENCE = 0.6
+
+
+def strip_numbering(text: str) -> str:
+    return NUMBERING.sub("", text, count=1)
+
+
+def to_snake_case(text: str, max_words: int = MAX_NAME_WORDS, drop_stopwords: bool = False) -> str:
+    """
+    Convert free text into a snake_case identifier of at most ``max_words`` words.
+
+    :param text: Label or field text.
+    :type text: str
+    :param max_words: Maximum number of words kept in the name.
+    :type max_words: int
+    :param drop_stopwords: Skip filler words such as "the" or "of".
+    :type drop_stopwords: bool
+
+    :return: snake_case name, or an empty string when nothing usable remains.
+    :rtype: str
+    """
+    words = re.findall(r"[a-z0-9]+", text.replace("&", " and ").lower())
+    if drop_stopwords:
+        words = [w for w in words if w not in STOPWORDS]
+    name = "_".join(words[:max_words])
+    if name and name[0].isdigit():
+        name = f"field_{name}"
+    return name
+
+
+def first_line(text: str) -> str:
+    for line in text.splitlines():
+        cleaned = strip_numbering(line.strip(CHECKBOX_CHARS + " \t")).strip()
+        if cleaned:
+            return cleaned
+    return ""
+
+
+def is_label(text: str) -> bool:
+    """
+    Return ``True`` for short caption-like text such as ``"Employee Number:"``.
+
+    Labels are at most a few words, contain at least one letter and do not read
+    like a sentence.
+    """
+    stripped = text.strip()
+    if not stripped or not re.search(r"[A-Za-z]", stripped):
+        return False
+    if len(stripped.split()) > MAX_LABEL_WORDS:
+        return False
+    return not re.search(r"[.!?]\s|[.!?]$", stripped)
+
+
+def suggest_name(text: str, header: Optional[str] = None) -> Tuple[str, float]:
+    """
+    Suggest a snake_case variable name for one field without calling an LLM.
+
+    The confidence reflects how mechanical the naming is: a known column or
+    row header, or a ``"Label:"`` caption, names the field almost certainly.
+    A short phrase without a colon could be a value rather than a label, and
+    running sentences only yield a keyword guess, so both are scored below
+    the default LLM threshold. Only the first non-empty line is read; for the
+    lines of a column, that is its first cell.
+
+    :param text: Field text, possibly several lines (e.g. a column of cells).
+    :type text: str
+    :param header: Optional column or row header giving the field context.
+    :type header: str
+
+    :return: Tuple of suggested name and confidence between 0 and 1.
+    :rtype: tuple
+    """
+    line = first_line(text)
+    # A field that carries its own "Label:" caption is named by it, not its header
+    if header and not (line.endswith(":") and is_label(line)) and is_label(header):
+        name = to_snake_case(header)
+        if name:
+            return name, HEADER_CONFIDENCE
+
+    if is_label(line):
+        name = to_snake_case(line)
+        if name:
+            confidence = LABEL_CONFIDENCE if line.endswith(":") else PHRASE_CONFIDENCE
+            return name, confidence
+
+    name = to_snake_case(line, drop_stopwords=True)
+    if not name:
+        return "field", 0.0
+    return name, 0.5 if len(line.split()) <= 8 else 0.3
+
+
+def table_header_row(table: Table) -> Optional[Tuple[Cell, ...]]:
+    """Return the first row when it looks like column headers, else ``None``."""
+    rows = table.rows
+    if len(rows) < 2:
+        return None
+    filled = [c for c in rows[0] if not c.is_blank]
+    if len(filled) < 2 or not all(is_label(first_line(c.text)) for c in filled):
+        return None
+    return rows[0]
+
+
+def suggest_structure_names(document: DocumentModel) -> List[Dict[str, Any]]:
+    """
+    Suggest names for every non-blank paragraph and table cell in a document.
+
+    Table cells use their column header when the first row is a header row,
+    or the row's leading label when the row reads ``"Label:" | value``; body
+    cells under a column header get the row number appended so names stay
+    unique. The cells of a header row are headers themselves and are named
+    from their own text.
+
+    :param document: Parsed document.
+    :type document: DocumentModel
+
+    :return: List of ``{"id", "suggested_name", "confidence"}`` objects.
+    :rtype: list
+    """
+    suggestions = []
+    for p_id, p in document.iter_paragraphs():
+        if p.is_blank:
+            continue
+        name, confidence = suggest_name(p.text)
+        suggestions.append({"id": p_id, "suggested_name": name, "confidence": confidence})
+
+    for t_idx, table in enumerate(document.tables):
+        header_row = table_header_row(table)
+        for r_idx, row in enumerate(table.rows):
+            row_label = first_line(row[0].text) if row else ""
+            if not (row_label.endswith(":") and is_label(row_label)):
+                row_label = ""
+
+            for c_idx, cell in enumerate(row):
+                if cell.is_blank:
+                    continue
+                header = None
+                suffix = ""
+                if header_row is not None and r_idx == 0:
+                    header = first_line(cell.text) or None
+                elif header_row is not None and c_idx < len(header_row):
+                    header = first_line(header_row[c_idx].text) or None
+                    suffix = f"_{r_idx}"
+                elif row_label and c_idx > 0:
+                    header = row_label
+
+                name, confidence = suggest_name(cell.text, header)
+                if header and confidence == HEADER_CONFIDENCE:
+                    name += suffix
+                suggestions.append({
+                    "id": f"t_{t_idx}_r_{r_idx}_c_{c_idx}",
+                    "suggested_name": name,
+                    "confidence": confidence,
+                })
+    return suggestions
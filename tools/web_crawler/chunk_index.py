@@ -0,0 +1,226 @@
+import heapq
+import math
+import re
+from array import array
+from bisect import bisect_left
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+# Words that carry no meaning in job steps or regulation text; dropping them
+# keeps the longest posting lists out of every query
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has have if in into is it its of on or "
+    "shall such that the their then there these this to was were which will with".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase `text` and split it into alphanumeric terms, without stopwords."""
+    return [term for term in TOKEN_PATTERN.findall((text or "").lower()) if term not in STOPWORDS]
+
+
+class ChunkIndex:
+    """
+    In-memory BM25 index over chunks produced by `chunk_text`.
+
+    Each term's postings are two parallel `array("I")` columns, document ids
+    in ascending order and term frequencies, so an index over tens of
+    thousands of chunks stays a few compact buffers instead of millions of
+    Python objects. Chunks are added and removed a page at a time by
+    `source_url`. Removed chunks are skipped at query time and purged from the
+    postings once they make up a quarter of the index.
+
+    Queries score terms rarest first and stop admitting new candidates as
+    soon as the k-th best score exceeds what the remaining terms could add to
+    a new chunk. From then on the common terms only update the surviving
+    candidates, looked up by binary search in their postings.
+
+    Args:
+        k1: BM25 term frequency saturation.
+        b: BM25 length normalization.
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        # term -> (doc ids, term frequencies)
+        self._postings: Dict[str, Tuple[array, array]] = {}
+        # Live chunks containing each term, and the highest tf each posting list has held
+        self._df: Dict[str, int] = {}
+        self._max_tf: Dict[str, int] = {}
+        self._chunks: List[Optional[Dict]] = []
+        self._doc_len = array("I")
+        self._by_url: Dict[Optional[str], List[int]] = {}
+        self._live = 0
+        self._removed = 0
+        self._total_len = 0
+        self._min_len = 0
+        self._norm: Optional[array] = None
+
+    def __len__(self) -> int:
+        return self._live
+
+    def add_chunks(self, chunks: Iterable[Dict]) -> None:
+        """
+        Index chunks, replacing any chunks already indexed for the same `source_url`.
+
+        Chunks without a `source_url` are always added.
+        """
+        chunks = list(chunks)
+        for source_url in {chunk.get("source_url") for chunk in chunks}:
+            if source_url is not None:
+                self.remove_source(source_url)
+
+        for chunk in chunks:
+            doc_id = len(self._chunks)
+            counts = Counter(tokenize(chunk.get("text", "")))
+            length = sum(counts.values())
+            self._chunks.append(chunk)
+            self._doc_len.append(length)
+            self._by_url.setdefault(chunk.get("source_url"), []).append(doc_id)
+            self._live += 1
+            self._total_len += length
+            self._min_len = length if self._live == 1 else min(self._min_len, length)
+            for term, tf in counts.items():
+                postings = self._postings.get(term)
+                if postings is None:
+                    postings = self._postings[term] = (array("I"), array("I"))
+                postings[0].append(doc_id)
+                postings[1].append(tf)
+                self._df[term] = self._df.get(term, 0) + 1
+                if tf > self._max_tf.get(term, 0):
+                    self._max_tf[term] = tf
+        self._norm = None
+
+    def remove_source(self, source_url: str) -> int:
+        """Remove every chunk of `source_url` and return how many were removed."""
+        doc_ids = self._by_url.pop(source_url, [])
+        for doc_id in doc_ids:
+            chunk = self._chunks[doc_id]
+            for term in set(tokenize(chunk.get("text", ""))):
+                self._df[term] -= 1
+            self._chunks[doc_id] = None
+            self._live -= 1
+            self._removed += 1
+            self._total_len -= self._doc_len[doc_id]
+        if doc_ids:
+            self._norm = None
+            if self._removed * 4 > len(self._chunks):
+                self._compact()
+        return len(doc_ids)
+
+    def _compact(self) -> None:
+        # Renumber live chunks densely and drop removed ones from every posting list
+        new_ids = array("i", [-1]) * len(self._chunks)
+        chunks, doc_len = [], array("I")
+        for doc_id, chunk in enumerate(self._chunks):
+            if chunk is not None:
+                new_ids[doc_id] = len(chunks)
+                chunks.append(chunk)
+                doc_len.append(self._doc_len[doc_id])
+
+        postings, max_tf = {}, {}
+        for term, (docs, tfs) in self._postings.items():
+            if not self._df[term]:
+                continue
+            kept_docs, kept_tfs = array("I"), array("I")
+            for doc_id, tf in zip(docs, tfs):
+                new_id = new_ids[doc_id]
+                if new_id >= 0:
+                    kept_docs.append(new_id)
+                    kept_tfs.append(tf)
+            postings[term] = (kept_docs, kept_tfs)
+            max_tf[term] = max(kept_tfs)
+
+        self._postings, self._max_tf = postings, max_tf
+        self._df = {term: df for term, df in self._df.items() if df}
+        self._by_url = {url: [new_ids[doc_id] for doc_id in ids] for url, ids in self._by_url.items()}
+        self._chunks, self._doc_len = chunks, doc_len
+        self._removed = 0
+        self._min_len = min(doc_len) if doc_len else 0
+
+    def _length_norms(self) -> array:
+        # k1 * (1 - b + b * len / avgdl) per chunk; recomputed only after the index changes
+        if self._norm is None:
+            avgdl = self._total_len / self._live if self._live else 1.0
+            scale = self.k1 * self.b / (avgdl or 1.0)
+            base = self.k1 * (1 - self.b)
+            self._norm = array("d", (base + scale * length for length in self._doc_len))
+        return self._norm
+
+    def search(self, query: str, k: int = 5) -> List[Tuple[float, Dict]]:
+        """
+        Return the `k` best chunks for `query` as `(score, chunk)`, best first.
+
+        Args:
+            query: Free text, normally a job step description.
+            k: Number of chunks to return.
+        """
+        if k <= 0 or not self._live:
+            return []
+        norms = self._length_norms()
+        k1_plus_1 = self.k1 + 1
+        chunks = self._chunks
+
+        avgdl = self._total_len / self._live
+        # Smallest length norm of any chunk, which bounds each term's contribution from above
+        min_norm = self.k1 * (1 - self.b + self.b * self._min_len / (avgdl or 1.0))
+        terms = []
+        for term, weight in Counter(tokenize(query)).items():
+            df = self._df.get(term, 0)
+            if not df:
+                continue
+            idf = weight * math.log(1 + (self._live - df + 0.5) / (df + 0.5))
+            max_tf = self._max_tf[term]
+            terms.append((idf * max_tf * k1_plus_1 / (max_tf + min_norm), idf, term))
+        # Rarest terms first: short postings with the largest possible contribution
+        terms.sort(key=lambda item: (-item[0], len(self._postings[item[2]][0])))
+
+        # remaining[i]: the most terms i.. can add to any chunk
+        remaining = [0.0] * (len(terms) + 1)
+        for i in range(len(terms) - 1, -1, -1):
+            remaining[i] = remaining[i + 1] + terms[i][0]
+
+        scores: Dict[int, float] = {}
+        admitting = True
+        for i, (_, idf, term) in enumerate(terms):
+            docs, tfs = self._postings[term]
+            if len(scores) > k:
+                threshold = heapq.nlargest(k, scores.values())[-1]
+                if threshold >= remaining[i]:
+                    # No chunk outside the candidates can reach the top k any more,
+                    # and neither can candidates that trail it by more than the rest can add
+                    admitting = False
+                    scores = {doc_id: score for doc_id, score in scores.items()
+                              if score + remaining[i] >= threshold}
+
+            if admitting:
+                for doc_id, tf in zip(docs, tfs):
+                    if chunks[doc_id] is not None:
+                        scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * k1_plus_1 / (tf + norms[doc_id])
+            elif len(scores) * 16 < len(docs):
+                size = len(docs)
+                for doc_id in scores:
+                    pos = bisect_left(docs, doc_id)
+                    if pos < size and docs[pos] == doc_id:
+                        tf = tfs[pos]
+                        scores[doc_id] += idf * tf * k1_plus_1 / (tf + norms[doc_id])
+            else:
+                for doc_id, tf in zip(docs, tfs):
+                    if doc_id in scores:
+                        scores[doc_id] += idf * tf * k1_plus_1 / (tf + norms[doc_id])
+
+        best = heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+        return [(score, chunks[doc_id]) for doc_id, score in best]
+
+    def stats(self) -> Dict:
+        postings = sum(len(docs) for docs, _ in self._postings.values())
+        return {
+            "chunks": self._live,
+            "removed_pending": self._removed,
+            "terms": len(self._postings),
+            "postings": postings,
+            # two 4-byte columns per posting
+            "posting_bytes": postings * 8,
+        }
@@ -1,17 +1,25 @@
-from trafilatura import extract, fetch_url
+import asyncio
 import os
 import json
+from pathlib import Path
 from urllib.parse import urlencode
 from urllib.request import Request, urlopen
 
 import re
 from typing import List, Dict, Optional
 
+import httpx
+
+from tools.web_crawler.chunk_index import ChunkIndex
+from tools.web_crawler.page_cache import PageCache
+from tools.web_crawler.page_fetcher import PageFetcher, fetch_plain_texts
+from tools.web_crawler.search_cache import QuotaExceededError, SearchCache
+
 #TODO 
 # - get the job step 
 # - Find relavent osha pages - bing search api??
 # - Fetch and extract text from the page - trafilatura
-# - RAG - chunk the text, then rank chunks against the job step
+# - RAG - chunk the text, then rank chunks against the job step - rank_regulatory_chunks
 # - Generate mitigations - write mitigations using the keyword and extracted data
 # - out put in a way that can go into each jinja peice
 
@@ -224,6 +232,79 @@ construction_hazards = [
 
 GOOGLE_CSE_URL = "https://www.googleapis.com/customsearch/v1"
 
+# Cached result pages and the daily request counter, shared by every crawler run on the host
+CSE_CACHE_PATH = Path(
+    os.getenv("CSE_CACHE_PATH", Path(__file__).resolve().parents[2] / "data" / "cse_cache.sqlite3"))
+CSE_CACHE_TTL = float(os.getenv("CSE_CACHE_TTL", str(7 * 24 * 3600)))
+# The free Custom Search JSON API tier allows 100 requests per day
+CSE_DAILY_QUOTA = int(os.getenv("CSE_DAILY_QUOTA", "100"))
+
+# Crawled page bodies and their extracted text, revalidated on every crawl
+PAGE_CACHE_PATH = Path(
+    os.getenv("PAGE_CACHE_PATH", Path(__file__).resolve().parents[2] / "data" / "page_cache.sqlite3"))
+# Set CRAWL_OFFLINE=1 to crawl from the search and page caches without any network access
+CRAWL_OFFLINE = os.getenv("CRAWL_OFFLINE", "") == "1"
+
+_search_cache = None
+_page_cache = None
+
+
+def get_search_cache() -> SearchCache:
+    """
+    Return the shared CSE result cache, creating it on first use.
+
+    Returns:
+        SearchCache: Cache at `CSE_CACHE_PATH` with `CSE_CACHE_TTL` and
+        `CSE_DAILY_QUOTA` applied.
+    """
+    global _search_cache
+    if _search_cache is None:
+        _search_cache = SearchCache(str(CSE_CACHE_PATH), ttl_seconds=CSE_CACHE_TTL, daily_quota=CSE_DAILY_QUOTA)
+    return _search_cache
+
+
+def get_page_cache() -> PageCache:
+    """Return the shared crawled page cache at `PAGE_CACHE_PATH`, creating it on first use."""
+    global _page_cache
+    if _page_cache is None:
+        _page_cache = PageCache(str(PAGE_CACHE_PATH))
+    return _page_cache
+
+
+def cse_params(query: str, start: int, num: int) -> dict:
+    """
+    Build the CSE query parameters, reading the API key and engine id from the environment.
+
+    Raises:
+        KeyError: If `GOOGLE_CSE_API_KEY` or `GOOGLE_CSE_CX` is missing from
+            the environment.
+    """
+    return {
+        "key": os.environ["GOOGLE_CSE_API_KEY"],
+        # your programmable search engine id
+        "cx": os.environ["GOOGLE_CSE_CX"],
+        "q": query,
+        # Note: googles indexing starts with 1.
+        "start": start,
+        # maximum of 10 results can be requested.
+        "num": min(num, 10),
+    }
+
+
+def normalize_cse_hits(payload: dict) -> list:
+    """
+    Reduce a CSE response payload to a list of `title`, `url` and `snippet` hits.
+    """
+    hits = []
+    for item in payload.get("items", []):
+        hits.append({
+            "title": item.get("title"),
+            "url": item.get("link"),
+            "snippet": item.get("snippet"),
+        })
+    return hits
+
+
 def google_cse_search(query: str, *, start: int = 1, num: int = 10):
     """
     Run one Google Custom Search API request and normalize the response.
@@ -257,23 +338,9 @@ def google_cse_search(query: str, *, start: int = 1, num: int = 10):
             JSON.
     """
 
-    ## TODO make these call from env variables.
-    api_key = os.environ["GOOGLE_CSE_API_KEY"]
-    cx = os.environ["GOOGLE_CSE_CX"]  # your programmable search engine id
-
-    params = {
-        "key": api_key,
-        "cx": cx,
-        "q": query,
-        # Note: googles indexing starts with 1.
-        "start": start,
-        # maximum of 10 results can be requested.     
-        "num": min(num, 10), 
-    }
-
     # build the HTTP request object - headers are how google identifies debbie
     request = Request(
-        f"{GOOGLE_CSE_URL}?{urlencode(params)}",
+        f"{GOOGLE_CSE_URL}?{urlencode(cse_params(query, start, num))}",
         headers={"User-Agent": "Debbie/1.0"}
     )
 
@@ -283,14 +350,71 @@ def google_cse_search(query: str, *, start: int = 1, num: int = 10):
         payload = json.loads(response.read().decode("utf-8"))
 
     #build into a smaller normalized list - this will return a list of result objects from the search.
-    hits = []
-    for item in payload.get("items", []):
-        hits.append({
-            "title": item.get("title"),
-            "url": item.get("link"),
-            "snippet": item.get("snippet"),
-        })
-    return hits
+    return normalize_cse_hits(payload)
+
+
+def cse_client() -> httpx.AsyncClient:
+    """Build a keep-alive client for CSE requests; one client serves every page of a run."""
+    return httpx.AsyncClient(headers={"User-Agent": "Debbie/1.0"}, timeout=20)
+
+
+async def google_cse_search_async(client: httpx.AsyncClient, query: str, *, start: int = 1, num: int = 10):
+    """
+    Async version of `google_cse_search` that reuses `client`'s connections.
+
+    Raises:
+        KeyError: If the CSE credentials are missing from the environment.
+        httpx.HTTPError: If the request fails, times out or returns an error status.
+        json.JSONDecodeError: If Google returns a response that is not valid JSON.
+    """
+    response = await client.get(GOOGLE_CSE_URL, params=cse_params(query, start, num))
+    response.raise_for_status()
+    return normalize_cse_hits(response.json())
+
+
+async def cached_cse_pages(client: httpx.AsyncClient, query: str, pages: int,
+                           cache: Optional[SearchCache] = None) -> List[List[Dict]]:
+    """
+    Return the hits of the first `pages` result pages of `query`.
+
+    Pages still in the cache cost nothing. The missing ones are claimed from
+    the daily quota together and then fetched concurrently, and their
+    normalized hits are cached. With `CRAWL_OFFLINE`, missing pages come
+    back empty instead.
+
+    Args:
+        client: Client from `cse_client()`.
+        query: Exact search string.
+        pages: Number of 10-hit pages, starting at the first.
+        cache: Result cache; defaults to `get_search_cache()`.
+
+    Returns:
+        list[list[dict]]: Normalized hits of each page, in page order.
+
+    Raises:
+        QuotaExceededError: If fetching the missing pages would exceed the daily quota.
+    """
+    cache = cache or get_search_cache()
+    starts = [1 + i * 10 for i in range(pages)]
+    results = [cache.get(query, start, 10) for start in starts]
+    missing = [i for i, hits in enumerate(results) if hits is None]
+    if not missing or CRAWL_OFFLINE:
+        return [hits or [] for hits in results]
+
+    if not cache.reserve(len(missing)):
+        raise QuotaExceededError(
+            f"{len(missing)} CSE requests for {query!r} would exceed the daily quota of {cache.daily_quota}")
+    fetched = await asyncio.gather(
+        *(google_cse_search_async(client, query, start=starts[i], num=10) for i in missing))
+    for i, hits in zip(missing, fetched):
+        cache.put(query, starts[i], 10, hits)
+        results[i] = hits
+    return results
+
+
+def regulatory_query(hazard_phrase: str) -> str:
+    """Build the regulation-focused search string for a hazard phrase."""
+    return f"{hazard_phrase} regulation requirements"
 
 
 def discover_regulatory_urls(hazard_phrase: str, pages: int = 3):
@@ -304,6 +428,9 @@ def discover_regulatory_urls(hazard_phrase: str, pages: int = 3):
     - Query format is: `"{hazard_phrase} regulation requirements"`.
     - Each page request asks for up to 10 hits.
     - `pages=3` means up to 30 raw hits are checked before deduplication.
+    - Pages are served from the on-disk cache while fresh; the rest are
+      fetched concurrently over one keep-alive connection and count against
+      the daily quota.
 
     Args:
         hazard_phrase: Hazard keyword or short phrase to search for
@@ -313,17 +440,20 @@ def discover_regulatory_urls(hazard_phrase: str, pages: int = 3):
         list[dict]: result objects from `google_cse_search`, in
         the order they were discovered. Each item includes `title`, `url`, and
         `snippet`. No Duplicates.
+
+    Raises:
+        QuotaExceededError: If the uncached pages would exceed the daily quota.
     """
-    # CSE should already be restricted to OSHA + selected domains
-    #builds the search string 
-    q = f"{hazard_phrase} regulation requirements"
+    async def search():
+        async with cse_client() as client:
+            return await cached_cse_pages(client, regulatory_query(hazard_phrase), pages)
+
     # seen is the urls already encountered. out is final list of result objects
     seen, out = set(), []
 
-    # Loop page by page and assumes 10 requests per result. returns a final list of requested pages without any duplicates. 
-    for i in range(pages):
-        start = 1 + i * 10
-        for hit in google_cse_search(q, start=start, num=10):
+    # Walk the pages in order and drop repeated urls
+    for page in asyncio.run(search()):
+        for hit in page:
             url = hit["url"]
 
             #adds seen urls to the seen list 
@@ -332,35 +462,78 @@ def discover_regulatory_urls(hazard_phrase: str, pages: int = 3):
                 out.append(hit)
     return out
 
+
+async def prewarm_searches(hazard_phrases: List[str], pages: int = 3, concurrency: int = 4) -> Dict[str, int]:
+    """
+    Fill the CSE cache for many hazard phrases in one run.
+
+    Phrases whose pages are all cached cost nothing. Once the daily quota is
+    spent, the remaining phrases are skipped, so running the job again the
+    next day continues where it stopped.
+
+    Args:
+        hazard_phrases: Phrases passed to `regulatory_query`.
+        pages: Result pages to cache per phrase.
+        concurrency: Phrases searched at the same time.
+
+    Returns:
+        dict: Counts of `warmed`, `skipped_quota` and `failed` phrases.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    counts = {"warmed": 0, "skipped_quota": 0, "failed": 0}
+
+    async with cse_client() as client:
+        async def warm(phrase: str) -> None:
+            async with semaphore:
+                try:
+                    await cached_cse_pages(client, regulatory_query(phrase), pages)
+                    counts["warmed"] += 1
+                except QuotaExceededError:
+                    counts["skipped_quota"] += 1
+                except (httpx.HTTPError, ValueError):
+                    counts["failed"] += 1
+
+        await asyncio.gather(*(warm(phrase) for phrase in hazard_phrases))
+    return counts
+
+
+def prewarm_hazard_searches(pages: int = 3, concurrency: int = 4) -> Dict[str, int]:
+    """
+    Pre-warm the CSE cache for every entry of `construction_hazards`.
+
+    Run as `python -m tools.web_crawler.crawl_osha` from the repo root.
+    """
+    phrases = [hazard.replace("_", " ") for hazard in construction_hazards]
+    return asyncio.run(prewarm_searches(phrases, pages, concurrency))
+
 def get_plain_text_from_url():
     """
     Fetch search hits and extract plain text content from each result URL.
 
     Current flow:
     1. Calls `discover_regulatory_urls` to get candidate pages.
-    2. Fetches each page with `fetch_url`.
-    3. Extracts readable content with `trafilatura.extract`.
-    4. Collects extracted page text into a list and returns it.
+    2. Fetches the pages concurrently with `fetch_plain_texts`, which bounds
+       requests globally and per host and spaces requests to the same host.
+       Pages in the page cache are revalidated with conditional requests, or
+       only read from the cache when `CRAWL_OFFLINE` is set.
+    3. Extracts readable content with `trafilatura.extract` in a process
+       pool while other pages are still downloading. Text already extracted
+       from an identical page body is reused.
+    4. Returns the extracted page text in search result order.
 
     This function is currently wired with an empty `hazard_phrase` and is
     intended to be updated so hazard selection is dynamic.
 
     Returns:
-        list: Extracted text payloads for each discovered URL.
+        list: Extracted text payloads for each discovered URL (`None` where
+        a page could not be fetched or extracted).
     """
 
     #This is a temporary hazard phrase build a way for it to dynamically select the hazard
     response_list = discover_regulatory_urls(hazard_phrase="slips, trips, and falls")
 
-    all_text = []
-
-    for i in response_list:
-        url = fetch_url(i.get("url"))
-        
-        page_text = extract(url, output_format="json", include_comments=False)
-        all_text.append(page_text)
-    
-    return all_text
+    fetcher = PageFetcher(cache=get_page_cache(), offline=CRAWL_OFFLINE)
+    return fetch_plain_texts([i.get("url") for i in response_list], fetcher)
 
 def chunk_text(
     text: str,
@@ -406,3 +579,49 @@ def chunk_text(
         chunk_id += 1
 
     return chunks
+
+
+def index_extracted_pages(urls: List[Optional[str]], extracted: List[Optional[str]],
+                          index: Optional[ChunkIndex] = None) -> ChunkIndex:
+    """
+    Chunk extracted pages and add them to a BM25 chunk index.
+
+    Args:
+        urls: Page URLs, in the same order as `extracted`.
+        extracted: trafilatura JSON strings from `fetch_plain_texts`; `None`
+            entries are skipped.
+        index: Index to add to, replacing earlier chunks of the same URLs;
+            a new index when `None`.
+
+    Returns:
+        ChunkIndex: The index holding the pages' chunks.
+    """
+    index = index if index is not None else ChunkIndex()
+    for url, payload in zip(urls, extracted):
+        if not payload:
+            continue
+        text = json.loads(payload).get("text") or ""
+        index.add_chunks(chunk_text(text, source_url=url))
+    return index
+
+
+def rank_regulatory_chunks(job_step: str, hazard_phrase: str, top_k: int = 5) -> List[Dict]:
+    """
+    Find the regulation chunks most relevant to one job step.
+
+    Discovers pages for `hazard_phrase`, fetches and extracts them through the
+    page cache, and ranks their chunks against `job_step` with BM25, so only
+    the best `top_k` chunks need to go to the LLM instead of whole pages.
+
+    Returns:
+        list[dict]: Chunks from `chunk_text`, best first, each with an added `score`.
+    """
+    urls = [hit.get("url") for hit in discover_regulatory_urls(hazard_phrase)]
+    fetcher = PageFetcher(cache=get_page_cache(), offline=CRAWL_OFFLINE)
+    index = index_extracted_pages(urls, fetch_plain_texts(urls, fetcher))
+    return [dict(chunk, score=score) for score, chunk in index.search(job_step, top_k)]
+
+
+if __name__ == "__main__":
+    print(json.dumps(prewarm_hazard_searches(), indent=2))
+    print(json.dumps(get_search_cache().stats(), indent=2))
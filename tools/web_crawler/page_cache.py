@@ -0,0 +1,153 @@
+import hashlib
+import os
+import sqlite3
+import time
+import zlib
+from typing import Dict, NamedTuple, Optional, Tuple
+
+from tools.sqlite_wal import open_keepalive, wal_connection
+
+
+class CachedPage(NamedTuple):
+    content_hash: str
+    etag: Optional[str]
+    last_modified: Optional[str]
+    fetched_at: float
+
+    def validators(self) -> Dict[str, str]:
+        """Conditional request headers that let the server answer 304 Not Modified."""
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+def content_hash(body: bytes) -> str:
+    return hashlib.sha256(body).hexdigest()
+
+
+class PageCache:
+    """
+    On-disk cache of crawled pages and their extracted text.
+
+    Each URL maps to the SHA-256 of its last downloaded body together with the
+    ETag and Last-Modified validators the server sent. Bodies are stored once
+    per hash, zlib-compressed, and the extraction of a body is stored under
+    the same hash, so a page that comes back unchanged - from a 304, or as
+    identical bytes from a new URL - is never parsed again.
+
+    Args:
+        path: SQLite database file.
+        max_age: Seconds after a fetch during which a page is served without
+            revalidating it; `0` revalidates on every crawl.
+    """
+
+    def __init__(self, path: str, max_age: float = 0):
+        self.path = path
+        self.max_age = max_age
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with wal_connection(self.path) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS pages ("
+                "url TEXT PRIMARY KEY, "
+                "content_hash TEXT NOT NULL, "
+                "etag TEXT, "
+                "last_modified TEXT, "
+                "fetched_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS pages_content_hash ON pages (content_hash)")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS bodies ("
+                "content_hash TEXT PRIMARY KEY, "
+                "body BLOB NOT NULL) WITHOUT ROWID"
+            )
+            # text is NULL when extraction found no content; the row still records that it ran
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS extractions ("
+                "content_hash TEXT PRIMARY KEY, "
+                "text TEXT) WITHOUT ROWID"
+            )
+        # Held for the cache's lifetime, see open_keepalive
+        self._keepalive = open_keepalive(self.path)
+
+    def close(self) -> None:
+        self._keepalive.close()
+
+    def page(self, url: str) -> Optional[CachedPage]:
+        with wal_connection(self.path) as conn:
+            row = conn.execute(
+                "SELECT content_hash, etag, last_modified, fetched_at FROM pages WHERE url = ?", (url,)
+            ).fetchone()
+        return CachedPage(*row) if row else None
+
+    def is_fresh(self, page: CachedPage) -> bool:
+        return time.time() - page.fetched_at < self.max_age
+
+    def body(self, digest: str) -> Optional[bytes]:
+        with wal_connection(self.path) as conn:
+            row = conn.execute("SELECT body FROM bodies WHERE content_hash = ?", (digest,)).fetchone()
+        return zlib.decompress(row[0]) if row else None
+
+    def store(self, url: str, body: bytes, etag: Optional[str] = None,
+              last_modified: Optional[str] = None) -> str:
+        """
+        Record a freshly downloaded page and return its content hash.
+
+        The body the URL pointed to before is dropped, with its extraction,
+        once no other URL references it.
+        """
+        digest = content_hash(body)
+        with wal_connection(self.path) as conn:
+            previous = conn.execute("SELECT content_hash FROM pages WHERE url = ?", (url,)).fetchone()
+            conn.execute(
+                "INSERT OR IGNORE INTO bodies (content_hash, body) VALUES (?, ?)",
+                (digest, zlib.compress(body, 6)),
+            )
+            conn.execute(
+                "INSERT INTO pages (url, content_hash, etag, last_modified, fetched_at) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (url) DO UPDATE SET content_hash = excluded.content_hash, etag = excluded.etag, "
+                "last_modified = excluded.last_modified, fetched_at = excluded.fetched_at",
+                (url, digest, etag, last_modified, time.time()),
+            )
+            if previous and previous[0] != digest:
+                self._drop_unreferenced(conn, previous[0])
+        return digest
+
+    @staticmethod
+    def _drop_unreferenced(conn: sqlite3.Connection, digest: str) -> None:
+        if conn.execute("SELECT 1 FROM pages WHERE content_hash = ? LIMIT 1", (digest,)).fetchone():
+            return
+        conn.execute("DELETE FROM bodies WHERE content_hash = ?", (digest,))
+        conn.execute("DELETE FROM extractions WHERE content_hash = ?", (digest,))
+
+    def touch(self, url: str) -> None:
+        """Mark a page as revalidated now, after the server answered 304."""
+        with wal_connection(self.path) as conn:
+            conn.execute("UPDATE pages SET fetched_at = ? WHERE url = ?", (time.time(), url))
+
+    def extraction(self, digest: str) -> Tuple[bool, Optional[str]]:
+        """
+        Return `(found, text)` for the body with hash `digest`.
+
+        `found` tells a cached `None` (the page had no extractable content)
+        apart from a body that was never extracted.
+        """
+        with wal_connection(self.path) as conn:
+            row = conn.execute("SELECT text FROM extractions WHERE content_hash = ?", (digest,)).fetchone()
+        return (True, row[0]) if row else (False, None)
+
+    def store_extraction(self, digest: str, text: Optional[str]) -> None:
+        with wal_connection(self.path) as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO extractions (content_hash, text) VALUES (?, ?)", (digest, text))
+
+    def stats(self) -> Dict:
+        with wal_connection(self.path) as conn:
+            pages = conn.execute("SELECT COUNT(*) FROM pages").fetchone()[0]
+            bodies, stored = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(LENGTH(body)), 0) FROM bodies").fetchone()
+            extractions = conn.execute("SELECT COUNT(*) FROM extractions").fetchone()[0]
+        return {"pages": pages, "bodies": bodies, "stored_bytes": stored, "extractions": extractions}
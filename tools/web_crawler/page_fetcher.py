@@ -0,0 +1,265 @@
+import asyncio
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+import httpx
+
+from tools.web_crawler.page_cache import PageCache
+
+USER_AGENT = "Debbie/1.0"
+# Pages larger than this are skipped, like trafilatura's own fetcher does
+MAX_PAGE_BYTES = 20 * 1024 * 1024
+
+
+def extract_page(html: Optional[bytes]) -> Optional[str]:
+    """
+    Extract the readable text of one page as trafilatura JSON.
+
+    Kept at module level so it can run in a process pool. Raw bytes are
+    passed through so trafilatura detects the encoding itself, exactly as it
+    does for pages fetched with `fetch_url`.
+
+    Args:
+        html: Page body, or `None` when the fetch failed.
+
+    Returns:
+        str | None: JSON string from `trafilatura.extract`, or `None`.
+    """
+    if not html:
+        return None
+    # Imported here so fetching works, and can be tested, without the extraction stack
+    from trafilatura import extract
+    return extract(html, output_format="json", include_comments=False)
+
+
+class _HostState:
+    __slots__ = ("semaphore", "next_start")
+
+    def __init__(self, concurrency: int):
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.next_start = 0.0
+
+
+class CrawlLimits:
+    """
+    Concurrency and politeness state shared by the requests of one crawl.
+
+    Semaphores belong to the event loop that first waits on them, so a new
+    `CrawlLimits` is made for every crawl (see `PageFetcher.limits`) instead
+    of living on the fetcher, which `fetch_plain_texts` may reuse across
+    several `asyncio.run` calls.
+    """
+
+    __slots__ = ("per_host_concurrency", "semaphore", "hosts")
+
+    def __init__(self, max_concurrency: int, per_host_concurrency: int):
+        self.per_host_concurrency = per_host_concurrency
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.hosts: Dict[str, _HostState] = {}
+
+    def host(self, host: str) -> _HostState:
+        state = self.hosts.get(host)
+        if state is None:
+            state = self.hosts[host] = _HostState(self.per_host_concurrency)
+        return state
+
+
+class PageFetcher:
+    """
+    Fetch many pages concurrently over one shared HTTP connection pool.
+
+    Requests are bounded globally and per host, and requests to the same host
+    start at least `per_host_delay` seconds apart so a crawl stays polite to
+    osha.gov and the other allowed domains. A page that fails, times out,
+    returns a non-200 status or exceeds `max_bytes` yields `None` instead of
+    raising, matching `trafilatura.fetch_url`.
+
+    With a `cache`, pages are revalidated with conditional requests: a 304
+    reuses the stored body, and text already extracted from a body with the
+    same content hash is reused without parsing. If the site fails, the
+    stored copy is served. With `offline`, no request is made and only cached
+    pages are returned.
+
+    Args:
+        max_concurrency: Pages in flight across all hosts.
+        per_host_concurrency: Pages in flight to any one host.
+        per_host_delay: Minimum seconds between request starts to one host.
+        timeout: Seconds allowed for one page, from connecting to the last byte.
+        max_bytes: Largest page body that is kept.
+        cache: Page cache to revalidate against and fill, or `None`.
+        offline: Serve pages from `cache` only.
+    """
+
+    def __init__(self, max_concurrency: int = 16, per_host_concurrency: int = 4,
+                 per_host_delay: float = 0.25, timeout: float = 20.0,
+                 max_bytes: int = MAX_PAGE_BYTES, cache: Optional[PageCache] = None,
+                 offline: bool = False):
+        self.max_concurrency = max_concurrency
+        self.per_host_concurrency = per_host_concurrency
+        self.per_host_delay = per_host_delay
+        self.timeout = timeout
+        self.max_bytes = max_bytes
+        self.cache = cache
+        self.offline = offline
+
+    def limits(self) -> CrawlLimits:
+        """Build fresh limits for one crawl; pass them to every `fetch` of that crawl."""
+        return CrawlLimits(self.max_concurrency, self.per_host_concurrency)
+
+    def client(self) -> httpx.AsyncClient:
+        """Build the shared client; connections are reused across pages of a host."""
+        return httpx.AsyncClient(
+            headers={"User-Agent": USER_AGENT},
+            timeout=self.timeout,
+            follow_redirects=True,
+            limits=httpx.Limits(max_connections=self.max_concurrency,
+                                max_keepalive_connections=self.max_concurrency),
+        )
+
+    async def _read(self, client: httpx.AsyncClient, url: str,
+                    headers: Optional[Dict[str, str]]) -> Optional[Tuple[int, bytes, httpx.Headers]]:
+        # Returns (status, body, headers), or None if the page is unusable
+        async with client.stream("GET", url, headers=headers) as response:
+            if response.status_code == 304 and headers:
+                return 304, b"", response.headers
+            if response.status_code != 200:
+                return None
+            declared = response.headers.get("content-length")
+            if declared and declared.isdigit() and int(declared) > self.max_bytes:
+                return None
+            body = bytearray()
+            async for chunk in response.aiter_bytes():
+                body += chunk
+                if len(body) > self.max_bytes:
+                    return None
+            return 200, bytes(body), response.headers
+
+    async def fetch_page(self, client: httpx.AsyncClient, url: Optional[str],
+                         limits: Optional[CrawlLimits] = None) -> Tuple[Optional[str], Optional[bytes]]:
+        """
+        Fetch or revalidate one page within the concurrency, politeness and time limits.
+
+        Args:
+            client: Client from `client()`, shared by every page of a crawl.
+            url: Absolute http(s) URL.
+            limits: Limits from `limits()`, shared by every page of a crawl;
+                `None` applies limits to this page alone.
+
+        Returns:
+            tuple: `(content_hash, body)`. `content_hash` is set whenever the
+            page is in the cache, and `body` is `None` when the cached body is
+            current, so callers only load it if they need it. Without a cache,
+            `content_hash` is `None`. Both are `None` if the page could not be fetched.
+        """
+        try:
+            host = urlsplit(url or "").netloc.lower()
+        except ValueError:
+            # e.g. an unbalanced "[" in the host
+            host = ""
+        if not host:
+            return None, None
+        cached = self.cache.page(url) if self.cache else None
+        cached_hash = cached.content_hash if cached else None
+        if self.offline or (cached and self.cache.is_fresh(cached)):
+            return cached_hash, None
+
+        limits = limits or self.limits()
+        state = limits.host(host)
+
+        # Take the host slot first so a page queued behind a busy host holds no global slot
+        async with state.semaphore, limits.semaphore:
+            loop = asyncio.get_running_loop()
+            # Reserve a start time; no await in between, so no lock is needed
+            start_at = max(loop.time(), state.next_start)
+            state.next_start = start_at + self.per_host_delay
+            await asyncio.sleep(start_at - loop.time())
+            # InvalidURL is not an HTTPError; a malformed link must not fail the whole batch
+            try:
+                result = await asyncio.wait_for(
+                    self._read(client, url, cached.validators() if cached else None), self.timeout)
+            except (httpx.HTTPError, httpx.InvalidURL, asyncio.TimeoutError, ValueError):
+                result = None
+
+        if result is None:
+            # Fall back to the stored copy when the site is down or the page is unusable
+            return cached_hash, None
+        status, body, headers = result
+        if status == 304:
+            self.cache.touch(url)
+            return cached_hash, None
+        if self.cache is None:
+            return None, body
+        return self.cache.store(url, body, headers.get("etag"), headers.get("last-modified")), body
+
+    async def fetch(self, client: httpx.AsyncClient, url: Optional[str],
+                    limits: Optional[CrawlLimits] = None) -> Optional[bytes]:
+        """
+        Fetch one page body, from the network or the cache.
+
+        Args:
+            client: Client from `client()`, shared by every page of a crawl.
+            url: Absolute http(s) URL.
+            limits: Limits from `limits()`, shared by every page of a crawl.
+
+        Returns:
+            bytes | None: Page body, or `None` if it could not be fetched.
+        """
+        digest, body = await self.fetch_page(client, url, limits)
+        if body is None and digest is not None:
+            body = self.cache.body(digest)
+        return body
+
+    async def fetch_and_extract(self, urls: List[Optional[str]], executor: Executor) -> List[Optional[str]]:
+        """
+        Fetch every URL and extract its text, overlapping parsing with network I/O.
+
+        Each page is handed to `executor` as soon as its body arrives, so HTML
+        parsing for early pages runs while later pages are still downloading.
+        With a cache, bodies that were already extracted are not sent to the pool.
+
+        Args:
+            urls: Page URLs; `None` entries yield `None`.
+            executor: Pool that runs `extract_page`, normally a `ProcessPoolExecutor`.
+
+        Returns:
+            list: Extracted JSON strings (or `None`) in the order of `urls`.
+        """
+        loop = asyncio.get_running_loop()
+        limits = self.limits()
+
+        async with self.client() as client:
+            async def fetch_one(url: Optional[str]) -> Optional[str]:
+                digest, body = await self.fetch_page(client, url, limits)
+                if digest is not None:
+                    found, text = self.cache.extraction(digest)
+                    if found:
+                        return text
+                    if body is None:
+                        body = self.cache.body(digest)
+                if body is None:
+                    return None
+                text = await loop.run_in_executor(executor, extract_page, body)
+                if digest is not None:
+                    self.cache.store_extraction(digest, text)
+                return text
+
+            return list(await asyncio.gather(*(fetch_one(url) for url in urls)))
+
+
+def fetch_plain_texts(urls: List[Optional[str]], fetcher: Optional[PageFetcher] = None,
+                      extract_workers: Optional[int] = None) -> List[Optional[str]]:
+    """
+    Fetch and extract many pages from synchronous code.
+
+    Args:
+        urls: Page URLs; `None` entries yield `None`.
+        fetcher: Configured `PageFetcher`, or `None` for the defaults.
+        extract_workers: Extraction processes; defaults to the CPU count.
+
+    Returns:
+        list: Extracted JSON strings (or `None`) in the order of `urls`.
+    """
+    fetcher = fetcher or PageFetcher()
+    with ProcessPoolExecutor(max_workers=extract_workers) as executor:
+        return asyncio.run(fetcher.fetch_and_extract(urls, executor))
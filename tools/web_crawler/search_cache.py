@@ -0,0 +1,125 @@
+import json
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+# The Custom Search JSON API quota resets at midnight Pacific time
+QUOTA_TIMEZONE = "America/Los_Angeles"
+
+
+class QuotaExceededError(RuntimeError):
+    """Raised when a search would exceed the daily Custom Search allowance."""
+
+
+def quota_day(now: Optional[float] = None) -> str:
+    """
+    Return the quota day (`YYYY-MM-DD`, Pacific time) for a Unix timestamp.
+
+    Falls back to UTC when the time zone database is unavailable.
+    """
+    moment = datetime.fromtimestamp(time.time() if now is None else now, tz=timezone.utc)
+    try:
+        moment = moment.astimezone(ZoneInfo(QUOTA_TIMEZONE))
+    except ZoneInfoNotFoundError:
+        pass
+    return moment.strftime("%Y-%m-%d")
+
+
+class SearchCache:
+    """
+    On-disk cache of normalized CSE hits plus the daily query counter.
+
+    Each cached page is keyed by the exact `(query, start, num)` sent to
+    Google and expires `ttl_seconds` after it was fetched. The quota table
+    counts API requests per quota day; `reserve` claims requests atomically,
+    so several crawler processes sharing the file cannot overspend together.
+
+    Args:
+        path: SQLite database file.
+        ttl_seconds: Lifetime of a cached result page.
+        daily_quota: Maximum API requests per quota day.
+    """
+
+    def __init__(self, path: str, ttl_seconds: float = 7 * 24 * 3600, daily_quota: int = 100):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.daily_quota = daily_quota
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS results ("
+                "query TEXT NOT NULL, "
+                "start INTEGER NOT NULL, "
+                "num INTEGER NOT NULL, "
+                "hits TEXT NOT NULL, "
+                "expires_at REAL NOT NULL, "
+                "PRIMARY KEY (query, start, num))"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS results_expires_at ON results (expires_at)")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS quota ("
+                "day TEXT PRIMARY KEY, "
+                "used INTEGER NOT NULL)"
+            )
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def get(self, query: str, start: int, num: int) -> Optional[List[Dict]]:
+        """Return the cached hits for one result page, or `None` if absent or expired."""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT hits FROM results WHERE query = ? AND start = ? AND num = ? AND expires_at >= ?",
+                (query, start, num, time.time()),
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put(self, query: str, start: int, num: int, hits: List[Dict]) -> None:
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("DELETE FROM results WHERE expires_at < ?", (now,))
+            conn.execute(
+                "INSERT OR REPLACE INTO results (query, start, num, hits, expires_at) VALUES (?, ?, ?, ?, ?)",
+                (query, start, num, json.dumps(hits), now + self.ttl_seconds),
+            )
+
+    def reserve(self, requests: int = 1) -> bool:
+        """
+        Claim `requests` API calls from today's quota.
+
+        Returns:
+            bool: `True` if the calls were claimed, `False` (claiming nothing)
+            if they would take the day over `daily_quota`.
+        """
+        with self._connect() as conn:
+            # One statement, so the check and the increment cannot interleave with another process
+            cursor = conn.execute(
+                "INSERT INTO quota (day, used) SELECT ?, ? WHERE ? <= ? "
+                "ON CONFLICT (day) DO UPDATE SET used = used + excluded.used "
+                "WHERE used + excluded.used <= ?",
+                (quota_day(), requests, requests, self.daily_quota, self.daily_quota),
+            )
+            return cursor.rowcount == 1
+
+    def used_today(self) -> int:
+        with self._connect() as conn:
+            row = conn.execute("SELECT used FROM quota WHERE day = ?", (quota_day(),)).fetchone()
+        return row[0] if row else 0
+
+    def stats(self) -> Dict:
+        with self._connect() as conn:
+            pages = conn.execute(
+                "SELECT COUNT(*) FROM results WHERE expires_at >= ?", (time.time(),)).fetchone()[0]
+        used = self.used_today()
+        return {"cached_pages": pages, "quota_used": used, "quota_left": max(self.daily_quota - used, 0)}